@@ -0,0 +1,92 @@
+"""Offscreen timing harness for the central grid.
+
+Run ``python -m app.bench`` to time :meth:`DailyGridPanel.rebuild` on a
+synthetic data directory.  The Qt ``offscreen`` platform is used unless
+``QT_QPA_PLATFORM`` is already set, so the harness works without a display.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from pathlib import Path
+from typing import List
+
+from .storage import Storage
+
+
+def make_synthetic_data(base_dir: Path, year: int, works_per_day: int) -> Storage:
+    """Populate ``base_dir`` with a year of month files and return its storage."""
+    storage = Storage(base_dir)
+    for month in range(1, 13):
+        storage.save_json(
+            f"{year}/{month:02d}.json",
+            {
+                str(day): [
+                    {
+                        "name": f"Работа {n}",
+                        "plan": n % 5,
+                        "done": n % 3,
+                        "priority": n % 4 + 1,
+                        "is_adult": n % 7 == 0,
+                        "comment": "",
+                    }
+                    for n in range(works_per_day)
+                ]
+                for day in range(1, 29)
+            },
+        )
+    return storage
+
+
+def _report(label: str, samples: List[float]) -> None:
+    ms = sorted(s * 1000 for s in samples)
+    print(
+        f"{label:<24} n={len(ms):<4} "
+        f"min={ms[0]:7.2f}ms  median={statistics.median(ms):7.2f}ms  max={ms[-1]:7.2f}ms"
+    )
+
+
+def bench_grid_rebuild(storage: Storage, year: int, rounds: int) -> List[float]:
+    """Switch months ``rounds`` times and return the per-switch durations."""
+    from PySide6.QtWidgets import QApplication
+
+    from .central.daily_grid_panel import DailyGridPanel
+
+    app = QApplication.instance() or QApplication([])
+    panel = DailyGridPanel(storage=storage)
+    panel.year.setValue(year)
+    panel.resize(1200, 800)
+    panel.show()
+    app.processEvents()
+
+    samples = []
+    for i in range(rounds):
+        start = time.perf_counter()
+        panel.month.setCurrentIndex(i % 12)
+        panel.scheduler.flush()
+        panel.grid.viewport().repaint()
+        samples.append(time.perf_counter() - start)
+    for name, counts in panel.scheduler.counters().items():
+        print(f"  {name}: requested={counts['requested']} ran={counts['ran']}")
+    panel.close()
+    return samples
+
+
+def main(argv: List[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=48)
+    parser.add_argument("--works", type=int, default=6, help="works per day")
+    parser.add_argument("--year", type=int, default=2024)
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    with tempfile.TemporaryDirectory() as tmp:
+        storage = make_synthetic_data(Path(tmp), args.year, args.works)
+        _report("grid rebuild", bench_grid_rebuild(storage, args.year, args.rounds))
+
+
+if __name__ == "__main__":
+    main()
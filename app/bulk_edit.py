@@ -0,0 +1,185 @@
+"""Bulk edits of a month's plan.
+
+Every operation runs inside :meth:`MonthRepository.batch`, so the panels
+get a single :data:`~app.events.MONTH` change and repaint once, and the
+month is written with one :meth:`MonthRepository.save` at the end.  The
+functions return the number of works added, changed or removed (0 means
+nothing was saved).
+
+Copies carry the plan, priority and 18+ flag of a work but start with
+nothing done and no comment; a work already on the target day with the
+same name only gets its plan updated.
+"""
+from __future__ import annotations
+
+import calendar
+from datetime import date
+from typing import Iterable, List, Optional, Sequence
+
+from .month_repository import MonthRepository, Work
+
+
+def _days_in(year: int, month: int) -> int:
+    return calendar.monthrange(year, month)[1]
+
+
+def _previous(year: int, month: int):
+    return (year - 1, 12) if month == 1 else (year, month - 1)
+
+
+def _apply_pattern(
+    repository: MonthRepository, year: int, month: int, day: int, pattern: Sequence[Work]
+) -> int:
+    """Put copies of ``pattern`` on ``day``; return the number of edits."""
+    existing = {w.name: w for w in repository.get(year, month).get(day, [])}
+    edits = 0
+    for src in pattern:
+        if not src.name:
+            continue
+        target = existing.get(src.name)
+        if target is not None:
+            edits += repository.set_field(year, month, day, target, "plan", src.plan)
+            continue
+        copy = Work(src.name, plan=src.plan, priority=src.priority, is_adult=src.is_adult)
+        repository.add_work(year, month, day, copy)
+        existing[copy.name] = copy
+        edits += 1
+    return edits
+
+
+def _finish(repository: MonthRepository, year: int, month: int, edits: int) -> int:
+    if edits:
+        repository.save(year, month)
+    return edits
+
+
+def copy_days(
+    repository: MonthRepository,
+    year: int,
+    month: int,
+    source: Sequence[int],
+    first: int,
+    last: int,
+) -> int:
+    """Repeat the works of the ``source`` days over ``first``..``last``.
+
+    A single source day is copied to every day of the range; several
+    source days (a week) are copied by weekday, so each target day gets
+    the source day falling on the same weekday, if there is one.
+    """
+    if not source:
+        return 0
+    data = repository.get(year, month)
+    # snapshot first: the range may overlap the source days
+    patterns = {d: list(data.get(d, [])) for d in source}
+    by_weekday = {date(year, month, d).weekday(): d for d in source}
+    edits = 0
+    with repository.batch(year, month):
+        for day in range(max(1, first), min(last, _days_in(year, month)) + 1):
+            if day in patterns:
+                continue
+            if len(source) == 1:
+                src = source[0]
+            else:
+                src = by_weekday.get(date(year, month, day).weekday())
+                if src is None:
+                    continue
+            edits += _apply_pattern(repository, year, month, day, patterns[src])
+    return _finish(repository, year, month, edits)
+
+
+def fill_plan(
+    repository: MonthRepository,
+    year: int,
+    month: int,
+    name: str,
+    plan: int,
+    weekdays: Iterable[int],
+    first: int = 1,
+    last: Optional[int] = None,
+    priority: int = 1,
+) -> int:
+    """Set the plan of ``name`` to ``plan`` on the given weekdays (0 = Mon).
+
+    Days without the work get a new entry with ``priority``.
+    """
+    weekdays = set(weekdays)
+    last = _days_in(year, month) if last is None else min(last, _days_in(year, month))
+    pattern = [Work(name, plan=plan, priority=priority)]
+    edits = 0
+    with repository.batch(year, month):
+        for day in range(max(1, first), last + 1):
+            if date(year, month, day).weekday() in weekdays:
+                edits += _apply_pattern(repository, year, month, day, pattern)
+    return _finish(repository, year, month, edits)
+
+
+def clear_range(
+    repository: MonthRepository,
+    year: int,
+    month: int,
+    first: int,
+    last: int,
+    name: Optional[str] = None,
+) -> int:
+    """Remove the works of ``first``..``last`` (only ``name`` if given)."""
+    data = repository.get(year, month)
+    edits = 0
+    with repository.batch(year, month):
+        for day in range(first, last + 1):
+            for w in list(data.get(day, [])):
+                if name is None or w.name == name:
+                    repository.remove_work(year, month, day, w)
+                    edits += 1
+    return _finish(repository, year, month, edits)
+
+
+def _source_day(day: int, shift: int, length: int) -> int:
+    """Day of the previous month on the same weekday, nearest to ``day``."""
+    for candidate in (day + shift, day + shift - 7, day + shift + 7):
+        if 1 <= candidate <= length:
+            return candidate
+    return 0
+
+
+def clone_previous_month(repository: MonthRepository, year: int, month: int) -> int:
+    """Fill the empty days of a month with the previous month's works.
+
+    Days are matched by weekday so weekly plans keep their shape: each day
+    takes the nearest day of the previous month falling on the same
+    weekday.
+    """
+    prev_year, prev_month = _previous(year, month)
+    prev = repository.get(prev_year, prev_month)
+    prev_length = _days_in(prev_year, prev_month)
+    # weekday offset between the two months, folded to -3..3
+    shift = (date(year, month, 1).weekday() - date(prev_year, prev_month, 1).weekday()) % 7
+    if shift > 3:
+        shift -= 7
+    data = repository.get(year, month)
+    edits = 0
+    with repository.batch(year, month):
+        for day in range(1, _days_in(year, month) + 1):
+            if data.get(day):
+                continue
+            src = _source_day(day, shift, prev_length)
+            if src:
+                edits += _apply_pattern(repository, year, month, day, prev.get(src, []))
+    return _finish(repository, year, month, edits)
+
+
+def week_of(year: int, month: int, day: int) -> List[int]:
+    """Days of the Monday–Sunday week containing ``day`` inside the month."""
+    for week in calendar.monthcalendar(year, month):
+        if day in week:
+            return [d for d in week if d]
+    return []
+
+
+__all__ = [
+    "clear_range",
+    "clone_previous_month",
+    "copy_days",
+    "fill_plan",
+    "week_of",
+]
@@ -1,13 +1,15 @@
-from dataclasses import dataclass, asdict
 from pathlib import Path
 
-from PySide6.QtCore import Qt, QDate
+from PySide6.QtCore import Qt, QDate, QEvent, QRect
+from PySide6.QtGui import QColor, QPainter
 from PySide6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QComboBox, QLabel, QTableWidget,
-    QSpinBox, QFrame, QInputDialog, QMenu
+    QSpinBox, QInputDialog, QMenu, QToolTip
 )
 
 from ..storage import Storage
+from ..month_repository import MonthRepository, MonthData, Work
+from ..events import DAY, MONTH, WorkChange
 from ..priority_service import (
     PriorityFilter,
     color_for,
@@ -17,136 +19,208 @@ from ..priority_service import (
     PriorityLevel,
     PRIORITY_DESCRIPTIONS,
 )
-from ..styles import (
-    ADULT_LABEL_STYLESHEET,
-    DAY_PLACEHOLDER_STYLESHEET,
-    MARK_STYLESHEET_TEMPLATE,
-)
+from ..styles import ADULT_LABEL_COLOR, DAY_PLACEHOLDER_COLOR
+from ..work_filter import WorkFilter
 
 
-@dataclass
-class Work:
-    name: str
-    plan: int = 0
-    done: int = 0
-    priority: int = 1
-    is_adult: bool = False
-    comment: str = ""
 
-    def to_dict(self) -> dict:
-        return asdict(self)
+class CalendarDayWidget(QWidget):
+    """Single painted widget for one calendar day.
 
-    @staticmethod
-    def from_dict(data: dict) -> "Work":
-        return Work(
-            name=data.get("name", ""),
-            plan=int(data.get("plan", 0)),
-            done=int(data.get("done", 0)),
-            priority=int(data.get("priority", 1)),
-            is_adult=bool(data.get("is_adult", False)),
-            comment=data.get("comment", ""),
-        )
+    Priority marks, work labels and "18+" badges are drawn directly in
+    :meth:`paintEvent` instead of being separate styled child widgets;
+    clicks, tooltips and context menus are hit-tested against the row
+    geometry computed in :meth:`_layout`.
+    """
 
+    MARGIN = 2
+    SPACING = 2
+    MARK_SIZE = 8
 
-class PriorityMark(QFrame):
-    def __init__(self, panel: "CalendarPanel", day: int, work: Work):
+    def __init__(self, panel: "CalendarPanel"):
         super().__init__()
         self.panel = panel
+        self.day = 0
+        self.placeholder = False
+        self.works: list[Work] = []
+        self._rows: list[tuple[Work, QRect, QRect, QRect | None]] = []
+        self._layout_width = -1
+        self.setMouseTracking(True)
+
+    # --------------------------------------------------------------
+    def set_day(self, day: int, works: list[Work], placeholder: bool = False):
         self.day = day
-        self.work = work
-        self.setFixedSize(8, 8)
-        self.setCursor(Qt.PointingHandCursor)
-        self._update()
-
-    def _update(self):
-        self.setStyleSheet(
-            MARK_STYLESHEET_TEMPLATE.format(color_for(self.work.priority))
+        self.placeholder = placeholder
+        self.set_works(works)
+
+    def set_works(self, works: list[Work]):
+        self.works = list(works)
+        self._layout_width = -1
+        self.update()
+
+    def _line_height(self) -> int:
+        return self.fontMetrics().height() + 2
+
+    def _layout(self):
+        """Compute (work, mark, label, badge) rects for the current width."""
+        if self._layout_width == self.width():
+            return
+        self._layout_width = self.width()
+        self._rows.clear()
+        fm = self.fontMetrics()
+        lh = self._line_height()
+        left = self.MARGIN
+        right = self.width() - self.MARGIN
+        y = self.MARGIN + lh + self.SPACING
+        badge_w = fm.horizontalAdvance("18+") + 4
+        for work in self.works:
+            mark = QRect(left, y + (lh - self.MARK_SIZE) // 2, self.MARK_SIZE, self.MARK_SIZE)
+            label_left = mark.right() + 1 + self.SPACING
+            badge = None
+            label_right = right
+            if work.is_adult:
+                badge = QRect(right - badge_w, y, badge_w, lh)
+                label_right = badge.left() - self.SPACING
+            text_w = fm.horizontalAdvance(self._label_text(work)) + 6
+            label = QRect(label_left, y, max(0, min(text_w, label_right - label_left)), lh)
+            self._rows.append((work, mark, label, badge))
+            y += lh + self.SPACING
+
+    @staticmethod
+    def _label_text(work: Work) -> str:
+        return f"{work.name} {work.plan}/{work.done}"
+
+    def _hit(self, pos) -> tuple[Work | None, str]:
+        self._layout()
+        for work, mark, label, badge in self._rows:
+            if mark.adjusted(-2, -2, 2, 2).contains(pos):
+                return work, "mark"
+            if label.contains(pos) or (badge is not None and badge.contains(pos)):
+                return work, "label"
+        return None, ""
+
+    # --------------------------------------------------------------
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.Antialiasing)
+        fm = self.fontMetrics()
+        lh = self._line_height()
+        text_color = self.palette().color(self.foregroundRole())
+        painter.setPen(QColor(DAY_PLACEHOLDER_COLOR) if self.placeholder else text_color)
+        painter.drawText(
+            QRect(self.MARGIN, self.MARGIN, self.width() - 2 * self.MARGIN, lh),
+            Qt.AlignLeft | Qt.AlignVCenter,
+            str(self.day),
         )
-        desc = PRIORITY_DESCRIPTIONS.get(PriorityLevel(self.work.priority), "")
-        tip = f"Приоритет: {self.work.priority}"
-        if desc:
-            tip += f" — {desc}"
-        tip += "\nЛКМ: изменить\nПКМ: выбрать"
-        self.setToolTip(tip)
+        if self.placeholder:
+            return
+        self._layout()
+        for work, mark, label, badge in self._rows:
+            if label.top() > self.height():
+                break
+            color = QColor(color_for(work.priority))
+            painter.setPen(Qt.NoPen)
+            painter.setBrush(color)
+            painter.drawEllipse(mark)
+            painter.setBrush(Qt.NoBrush)
+            painter.setPen(color)
+            painter.drawRect(label.adjusted(0, 0, -1, -1))
+            painter.setPen(text_color)
+            painter.drawText(
+                label.adjusted(3, 0, -3, 0),
+                Qt.AlignLeft | Qt.AlignVCenter,
+                fm.elidedText(self._label_text(work), Qt.ElideRight, label.width() - 6),
+            )
+            if badge is not None:
+                painter.setPen(QColor(ADULT_LABEL_COLOR))
+                painter.drawText(badge, Qt.AlignRight | Qt.AlignVCenter, "18+")
+
+    def resizeEvent(self, event):
+        self._layout_width = -1
+        super().resizeEvent(event)
+
+    def changeEvent(self, event):
+        if event.type() == QEvent.FontChange:
+            self._layout_width = -1
+        super().changeEvent(event)
+
+    # --------------------------------------------------------------
+    def event(self, event):
+        if event.type() == QEvent.ToolTip and not self.placeholder:
+            work, part = self._hit(event.pos())
+            if work is None:
+                QToolTip.hideText()
+                event.ignore()
+                return True
+            desc = PRIORITY_DESCRIPTIONS.get(PriorityLevel(work.priority), "")
+            tip = f"Приоритет: {work.priority}"
+            if desc:
+                tip += f" — {desc}"
+            if part == "mark":
+                tip += "\nЛКМ: изменить\nПКМ: выбрать"
+            elif work.comment:
+                tip += f"\n{work.comment}"
+            QToolTip.showText(event.globalPos(), tip, self)
+            return True
+        return super().event(event)
+
+    def mouseMoveEvent(self, event):
+        _work, part = self._hit(event.position().toPoint())
+        if part == "mark":
+            self.setCursor(Qt.PointingHandCursor)
+        else:
+            self.unsetCursor()
+        super().mouseMoveEvent(event)
 
     def mousePressEvent(self, event):
-        if event.button() == Qt.LeftButton:
-            p = self.work.priority + 1
+        if self.placeholder:
+            return
+        pos = event.position().toPoint()
+        work, part = self._hit(pos)
+        if event.button() == Qt.LeftButton and part == "mark":
+            p = work.priority + 1
             if p > int(PriorityLevel.Four):
                 p = int(PriorityLevel.One)
-            override_priority(self.work, p)
-            self.panel.save_month()
-            self.panel.refresh_day(self.day)
+            self.panel.set_priority(self.day, work, p)
         elif event.button() == Qt.RightButton:
-            menu = QMenu(self)
-            actions = []
-            for lvl in PriorityLevel:
-                act = menu.addAction(f"{int(lvl)}")
-                act.setData(int(lvl))
-                actions.append(act)
-            chosen = menu.exec(self.mapToGlobal(event.pos()))
-            if chosen:
-                p = int(chosen.data())
-                if p != self.work.priority:
-                    override_priority(self.work, p)
-                    self.panel.save_month()
-                    self.panel.refresh_day(self.day)
+            if work is not None:
+                self._show_priority_menu(work, pos)
+            else:
+                self.panel.show_day_menu(self.day, self, pos)
         else:
             super().mousePressEvent(event)
 
+    def mouseDoubleClickEvent(self, event):
+        work, part = self._hit(event.position().toPoint())
+        if part == "label":
+            self.panel.edit_work(self.day, work)
+        else:
+            super().mouseDoubleClickEvent(event)
 
-class WorkLabel(QLabel):
-    def __init__(self, panel: "CalendarPanel", day: int, work: Work):
-        super().__init__()
-        self.panel = panel
-        self.day = day
-        self.work = work
-        self._update_text()
-        self.setContextMenuPolicy(Qt.CustomContextMenu)
-        self.customContextMenuRequested.connect(self._show_menu)
-
-    def _update_text(self):
-        txt = f"{self.work.name} {self.work.plan}/{self.work.done}"
-        self.setText(txt)
-        desc = PRIORITY_DESCRIPTIONS.get(PriorityLevel(self.work.priority), "")
-        tip = f"Приоритет: {self.work.priority} — {desc}" if desc else f"Приоритет: {self.work.priority}"
-        if self.work.comment:
-            tip += f"\n{self.work.comment}"
-        self.setToolTip(tip)
-        # Set border color according to priority
-        color = color_for(self.work.priority)
-        self.setStyleSheet(f"border: 1px solid {color};")
-
-    def _show_menu(self, pos):
+    def _show_priority_menu(self, work: Work, pos):
         menu = QMenu(self)
-        actions = []
         for lvl in PriorityLevel:
             act = menu.addAction(f"{int(lvl)}")
             act.setData(int(lvl))
-            actions.append(act)
         chosen = menu.exec(self.mapToGlobal(pos))
         if chosen:
             p = int(chosen.data())
-            if p != self.work.priority:
-                override_priority(self.work, p)
-                self.panel.save_month()
-                self.panel.refresh_day(self.day)
-                self._update_text()
+            if p != work.priority:
+                self.panel.set_priority(self.day, work, p)
 
-    def mouseDoubleClickEvent(self, event):
-        self.panel.edit_work(self.day, self.work)
-        self._update_text()
-        super().mouseDoubleClickEvent(event)
 
 class CalendarPanel(QWidget):
-    def __init__(self, parent=None):
+    def __init__(self, parent=None, repository: MonthRepository | None = None):
         super().__init__(parent)
         self.scale_percent = 100
         self.scale_edit_mode = False
         self.storage = Storage(Path("data"))
-        self.month_data: dict[int, list[Work]] = {}
+        self.repository = repository or MonthRepository(self.storage)
+        self.repository.events.subscribe(self._on_work_changed)
+        self.month_data: MonthData = {}
         self._day_pos: dict[int, tuple[int, int]] = {}
         self.priority_filter = PriorityFilter.OneToFour
+        self.work_filter = WorkFilter()
 
         lay = QVBoxLayout(self)
         ctrl = QHBoxLayout()
@@ -165,6 +239,12 @@ class CalendarPanel(QWidget):
         self.table.verticalHeader().setVisible(False)
         self.table.setShowGrid(True)
         lay.addWidget(self.table)
+        # One painted widget per grid slot, rebound on every rebuild
+        self._cells: list[CalendarDayWidget] = []
+        for i in range(6 * 7):
+            cell = CalendarDayWidget(self)
+            self._cells.append(cell)
+            self.table.setCellWidget(i // 7, i % 7, cell)
 
         self.rebuild()
 
@@ -192,110 +272,74 @@ class CalendarPanel(QWidget):
         first = QDate(y, m, 1)
         start_col = first.dayOfWeek() - 1  # 0..6 (Mon..Sun)
         days_in_month = first.daysInMonth()
+        prev_days = first.addMonths(-1).daysInMonth()
         self.table.horizontalHeader().setVisible(True)
         self.table.setHorizontalHeaderLabels(["Пн", "Вт", "Ср", "Чт", "Пт", "Сб", "Вс"])
-        # Clear
         self._day_pos.clear()
-        for r in range(6):
-            for c in range(7):
-                self.table.setCellWidget(r, c, QWidget())
-
-        # Previous month days
-        prev = first.addMonths(-1)
-        prev_days = prev.daysInMonth()
-        for c in range(start_col):
-            day_num = prev_days - start_col + c + 1
-            self.table.setCellWidget(0, c, self.build_day_placeholder(day_num))
-
-        # Current month days
-        day = 1
-        r = 0
-        c = start_col
-        while day <= days_in_month and r < 6:
-            self.table.setCellWidget(r, c, self.build_day_widget(day))
-            self._day_pos[day] = (r, c)
-            day += 1
-            c += 1
-            if c >= 7:
-                c = 0
-                r += 1
-
-        # Next month days
-        next_day = 1
-        while r < 6:
-            self.table.setCellWidget(r, c, self.build_day_placeholder(next_day))
-            next_day += 1
-            c += 1
-            if c >= 7:
-                c = 0
-                r += 1
-
-    def build_day_placeholder(self, day: int) -> QWidget:
-        w = QWidget()
-        lay = QVBoxLayout(w)
-        lay.setContentsMargins(2, 2, 2, 2)
-        lay.setSpacing(2)
-        day_lbl = QLabel(str(day))
-        day_lbl.setStyleSheet(DAY_PLACEHOLDER_STYLESHEET)
-        lay.addWidget(day_lbl)
-        lay.addStretch(1)
-        w.setEnabled(False)
-        return w
-
-    def build_day_widget(self, day: int) -> QWidget:
-        w = QWidget()
-        lay = QVBoxLayout(w)
-        lay.setContentsMargins(2, 2, 2, 2)
-        lay.setSpacing(2)
-        day_lbl = QLabel(str(day))
-        lay.addWidget(day_lbl)
-        w.setContextMenuPolicy(Qt.CustomContextMenu)
-        w.customContextMenuRequested.connect(lambda pos, d=day, wid=w: self.show_day_menu(d, wid, pos))
-        works = self.month_data.get(day, [])
-        works = filter_tasks(works, self.priority_filter)
-        for work in sort_tasks(works):
-            hl = QHBoxLayout()
-            mark = PriorityMark(self, day, work)
-            hl.addWidget(mark, alignment=Qt.AlignTop)
-            lbl = WorkLabel(self, day, work)
-            hl.addWidget(lbl, alignment=Qt.AlignTop)
-            hl.addStretch(1)
-            if work.is_adult:
-                adult_lbl = QLabel("18+")
-                adult_lbl.setStyleSheet(ADULT_LABEL_STYLESHEET)
-                hl.addWidget(adult_lbl, alignment=Qt.AlignRight | Qt.AlignTop)
-            lay.addLayout(hl)
-        lay.addStretch(1)
-        return w
+        for i, cell in enumerate(self._cells):
+            r, c = divmod(i, 7)
+            offset = i - start_col + 1
+            if offset < 1:
+                cell.set_day(prev_days + offset, [], placeholder=True)
+            elif offset > days_in_month:
+                cell.set_day(offset - days_in_month, [], placeholder=True)
+            else:
+                cell.set_day(offset, self.visible_works(offset))
+                self._day_pos[offset] = (r, c)
+
+    def visible_works(self, day: int) -> list[Work]:
+        works = filter_tasks(self.month_data.get(day, []), self.priority_filter)
+        return list(sort_tasks(self.work_filter.apply(works)))
 
     def set_priority_filter(self, filt: PriorityFilter):
         self.priority_filter = filt
         for day in list(self.month_data.keys()):
             self.refresh_day(day)
 
+    def set_work_filter(self, filt: WorkFilter):
+        if filt == self.work_filter:
+            return
+        self.work_filter = filt
+        for day in list(self.month_data.keys()):
+            self.refresh_day(day)
+
+    def _current(self) -> tuple[int, int]:
+        return self.year.value(), self.month.currentIndex() + 1
+
+    def set_priority(self, day: int, work: Work, priority: int):
+        old = work.priority
+        override_priority(work, priority)
+        self.repository.note_change(*self._current(), day, work, "priority", old)
+        self.save_month()
+
     def edit_work(self, day: int, work: Work):
+        # the answers of all dialogs are one edit (and one undo step)
+        with self.repository.batch(*self._current()):
+            self._edit_work(day, work)
+        self.save_month()
+
+    def _edit_work(self, day: int, work: Work):
+        y, m = self._current()
         name, ok = QInputDialog.getText(self, "Имя", "Имя", text=work.name)
         if ok and name:
-            work.name = name
+            self.repository.set_field(y, m, day, work, "name", name)
         adult, ok = QInputDialog.getItem(
             self, "Категория", "Категория", ["0+", "18+"], 1 if work.is_adult else 0
         )
         if ok:
-            work.is_adult = adult == "18+"
+            self.repository.set_field(y, m, day, work, "is_adult", adult == "18+")
         comment, ok = QInputDialog.getText(self, "Комментарий", "Комментарий", text=work.comment)
         if ok:
-            work.comment = comment
+            self.repository.set_field(y, m, day, work, "comment", comment)
         plan, ok = QInputDialog.getInt(self, "Plan", "Plan", work.plan, 0, 9999)
         if ok:
-            work.plan = plan
+            self.repository.set_field(y, m, day, work, "plan", plan)
         done, ok = QInputDialog.getInt(self, "Done", "Done", work.done, 0, 9999)
         if ok:
-            work.done = done
+            self.repository.set_field(y, m, day, work, "done", done)
         p, ok = QInputDialog.getInt(self, "Приоритет", "Приоритет (1-4)", work.priority, 1, 4)
         if ok and p != work.priority:
-            override_priority(work, p)
-        self.save_month()
-        self.refresh_day(day)
+            self.set_priority(day, work, p)
 
     def add_work(self, day: int):
         name, ok = QInputDialog.getText(self, "Имя", "Имя")
@@ -326,9 +370,8 @@ class CalendarPanel(QWidget):
             is_adult=(adult == "18+"),
             comment=comment,
         )
-        self.month_data.setdefault(day, []).append(w)
+        self.repository.add_work(*self._current(), day, w)
         self.save_month()
-        self.refresh_day(day)
 
     def show_day_menu(self, day: int, widget: QWidget, pos):
         menu = QMenu(widget)
@@ -337,24 +380,25 @@ class CalendarPanel(QWidget):
         if action == act_add:
             self.add_work(day)
 
+    def _on_work_changed(self, change: WorkChange):
+        if (change.year, change.month) != self._current():
+            return
+        if change.field == MONTH:
+            for day in self._day_pos:
+                self.refresh_day(day)
+            return
+        if change.field == DAY:
+            self.refresh_day(change.old)
+        self.refresh_day(change.day)
+
     def refresh_day(self, day: int):
         pos = self._day_pos.get(day)
         if pos:
             r, c = pos
-            self.table.setCellWidget(r, c, self.build_day_widget(day))
+            self._cells[r * 7 + c].set_works(self.visible_works(day))
 
     def load_month(self, year: int, month: int):
-        data = self.storage.load_json(f"{year}/{month:02d}.json", default={}) or {}
-        self.month_data = {
-            int(d): [Work.from_dict(w) for w in wl]
-            for d, wl in data.items()
-        }
+        self.month_data = self.repository.get(year, month)
 
     def save_month(self):
-        y = self.year.value()
-        m = self.month.currentIndex() + 1
-        data = {
-            str(day): [w.to_dict() for w in works]
-            for day, works in self.month_data.items() if works
-        }
-        self.storage.save_json(f"{y}/{m:02d}.json", data)
+        self.repository.save(*self._current())
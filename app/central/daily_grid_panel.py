@@ -1,164 +1,516 @@
-from dataclasses import dataclass, asdict
 from pathlib import Path
 import calendar
 
-from PySide6.QtCore import Qt, Signal
+from PySide6.QtCore import (
+    Qt,
+    Signal,
+    QAbstractTableModel,
+    QModelIndex,
+    QRect,
+    QEvent,
+)
+from PySide6.QtGui import QColor, QFont, QIntValidator, QPen
 from PySide6.QtWidgets import (
     QWidget,
     QVBoxLayout,
     QHBoxLayout,
     QLabel,
-    QTableWidget,
-    QTableWidgetItem,
+    QTableView,
+    QHeaderView,
+    QAbstractItemView,
+    QStyledItemDelegate,
+    QStyle,
+    QLineEdit,
     QSpinBox,
     QComboBox,
+    QListWidget,
+    QListWidgetItem,
+    QPushButton,
+    QInputDialog,
+    QMenu,
+    QDialog,
+    QDialogButtonBox,
+    QFormLayout,
+    QCheckBox,
 )
 
+from .. import bulk_edit
 from ..storage import Storage
+from ..month_repository import MonthRepository, MonthData, Work
+from ..invalidation import InvalidationScheduler
+from ..events import DAY, MONTH, WorkChange
 from ..priority_service import PriorityFilter, filter_tasks
+from ..profiling import phase
+from ..reconciliation import Reconciler
+from ..search_index import KIND_LABELS, SearchHit, SearchIndex
+from ..styles import ERROR_TEXT_COLOR, SHORTAGE_COLOR
+from ..work_filter import FilterError, FilterPresets, WorkFilter, compile_filter
+from ..posting_rules import WEEKDAY_NAMES
 
 
-@dataclass
-class Work:
-    name: str
-    plan: int = 0
-    done: int = 0
-    priority: int = 1
-    is_adult: bool = False
-    comment: str = ""
-
-    def to_dict(self) -> dict:
-        return asdict(self)
-
-    @staticmethod
-    def from_dict(data: dict) -> "Work":
-        return Work(
-            name=data.get("name", ""),
-            plan=int(data.get("plan", 0)),
-            done=int(data.get("done", 0)),
-            priority=int(data.get("priority", 1)),
-            is_adult=bool(data.get("is_adult", False)),
-            comment=data.get("comment", ""),
-        )
 
+DAY_NAMES = ["ПН", "ВТ", "СР", "ЧТ", "ПТ", "СБ", "ВС"]
 
-class DayCell(QWidget):
-    """Widget representing a single day's list of works."""
 
-    changed = Signal()
+class DailyGridModel(QAbstractTableModel):
+    """Month grid model: one row per week, week number + 7 day columns.
 
-    HEADERS = ["Работа", "План", "Готово"]
+    Day cells expose the day number via :attr:`DayRole`; the delegate asks
+    :meth:`visible_works` for the works passing the priority filter.  The
+    works themselves stay in ``month_data`` so filtered-out entries are never
+    lost on save.
+    """
+
+    DayRole = Qt.UserRole + 1
+    # {work: buffer} of works with more postings than chapters done so far
+    ShortageRole = Qt.UserRole + 2
+
+    COLUMNS = ["Неделя"] + DAY_NAMES
+    FIELDS = ["name", "plan", "done"]
 
-    def __init__(self, rows: int, parent: QWidget | None = None):
+    work_edited = Signal(int)
+
+    def __init__(self, repository: MonthRepository, rows_per_day: int = 6, parent=None):
         super().__init__(parent)
-        self.rows_per_day = rows
-        lay = QVBoxLayout(self)
-        lay.setContentsMargins(0, 0, 0, 0)
-
-        self.caption = QLabel("", self)
-        self.caption.setAlignment(Qt.AlignCenter)
-        lay.addWidget(self.caption)
-
-        self.table = QTableWidget(rows, len(self.HEADERS), self)
-        self.table.setHorizontalHeaderLabels(self.HEADERS)
-        # Center and bold headers
-        for c in range(self.table.columnCount()):
-            h = self.table.horizontalHeaderItem(c)
-            h.setTextAlignment(Qt.AlignCenter)
-            f = h.font()
-            f.setBold(True)
-            h.setFont(f)
-        self.table.setEditTriggers(
-            QTableWidget.DoubleClicked
-            | QTableWidget.SelectedClicked
-            | QTableWidget.EditKeyPressed
-        )
-        lay.addWidget(self.table)
-        self._works: list[Work] = [Work("") for _ in range(rows)]
-        self.table.itemChanged.connect(self._on_item_changed)
+        self.repository = repository
+        self.rows_per_day = rows_per_day
+        self.priority_filter = PriorityFilter.OneToFour
+        self.edit_enabled = True
+        self.year = 0
+        self.month = 0
+        self.month_data: MonthData = {}
+        self._weeks: list[list[int]] = []
+        self._visible: dict[int, list[Work]] = {}
+        self.work_filter = WorkFilter()
+        self.reconciler: Reconciler | None = None
 
     # --------------------------------------------------------------
-    def set_works(self, works: list[Work], priority_filter: PriorityFilter):
-        filtered = list(filter_tasks(works, priority_filter))
-        self._works = filtered + [Work("") for _ in range(self.rows_per_day - len(filtered))]
-        self.table.blockSignals(True)
-        for row, work in enumerate(self._works):
-            self._set_row(row, work)
-        self.table.blockSignals(False)
-
-    def get_works(self) -> list[Work]:
-        return [w for w in self._works if w.name]
-
-    def _set_row(self, row: int, work: Work):
-        def set_item(col: int, text: str, align_left: bool = False):
-            item = QTableWidgetItem(text)
-            if align_left:
-                item.setTextAlignment(Qt.AlignVCenter | Qt.AlignLeft)
-            else:
-                item.setTextAlignment(Qt.AlignCenter)
-            self.table.setItem(row, col, item)
+    def set_month(self, year: int, month: int, month_data: MonthData):
+        """Rebind the grid to another month without resetting the model.
+
+        Week rows are kept and only added or removed at the end when the
+        number of weeks differs, so the view keeps its sections, scroll
+        position and selection and just repaints the day cells.
+        """
+        weeks = calendar.monthcalendar(year, month)
+        old_count = len(self._weeks)
+        new_count = len(weeks)
+        if new_count < old_count:
+            self.beginRemoveRows(QModelIndex(), new_count, old_count - 1)
+            self._weeks = self._weeks[:new_count]
+            self.endRemoveRows()
+        self._weeks[:new_count] = weeks[: min(old_count, new_count)]
+        self.year, self.month = year, month
+        self.month_data = month_data
+        self._visible.clear()
+        if new_count > old_count:
+            self.beginInsertRows(QModelIndex(), old_count, new_count - 1)
+            self._weeks = weeks
+            self.endInsertRows()
+        if old_count:
+            last = min(old_count, new_count) - 1
+            self.dataChanged.emit(self.index(0, 0), self.index(last, len(DAY_NAMES)))
 
-        set_item(0, work.name, align_left=True)
-        set_item(1, str(work.plan))
-        set_item(2, str(work.done))
+    def set_priority_filter(self, filt: PriorityFilter):
+        if filt == self.priority_filter:
+            return
+        self.priority_filter = filt
+        self._visible.clear()
+        self._emit_all_changed()
 
-    def _on_item_changed(self, item: QTableWidgetItem):
-        row = item.row()
-        col = item.column()
-        if row >= len(self._works):
+    def set_work_filter(self, filt: WorkFilter):
+        if filt == self.work_filter:
+            return
+        self.work_filter = filt
+        self._visible.clear()
+        self._emit_all_changed()
+
+    def set_rows_per_day(self, rows: int):
+        if rows == self.rows_per_day:
             return
-        work = self._works[row]
+        self.rows_per_day = rows
+        self._emit_all_changed()
+
+    def on_balances_changed(self, works: set[str]):
+        # shortages of a work may move between days; repaint the day cells
+        self._emit_all_changed()
+
+    def shortages(self, day: int) -> dict[str, int]:
+        if self.reconciler is None:
+            return {}
+        balances = self.reconciler.balances
+        return {
+            name: balances[name].buffer[day - 1]
+            for name in sorted(self.reconciler.short_works(day))
+        }
+
+    def _emit_all_changed(self):
+        if self._weeks:
+            self.dataChanged.emit(
+                self.index(0, 1), self.index(len(self._weeks) - 1, len(DAY_NAMES))
+            )
+
+    # --------------------------------------------------------------
+    def day_at(self, index: QModelIndex) -> int:
+        if not index.isValid() or index.column() == 0:
+            return 0
+        return self._weeks[index.row()][index.column() - 1]
+
+    def index_for_day(self, day: int) -> QModelIndex:
+        for r, week in enumerate(self._weeks):
+            if day in week:
+                return self.index(r, week.index(day) + 1)
+        return QModelIndex()
+
+    def visible_works(self, day: int) -> list[Work]:
+        works = self._visible.get(day)
+        if works is None:
+            works = self.work_filter.apply(
+                filter_tasks(self.month_data.get(day, []), self.priority_filter)
+            )
+            self._visible[day] = works
+        return works
+
+    def field_text(self, day: int, row: int, col: int) -> str:
+        works = self.visible_works(day)
+        if row >= len(works):
+            return ""
+        value = getattr(works[row], self.FIELDS[col])
+        return str(value)
+
+    def set_work_field(self, day: int, row: int, col: int, text: str) -> bool:
+        """Write ``text`` into the visible work at ``row`` of ``day``.
+
+        Editing an empty slot with a name appends a new work to the day.
+        The change goes through the repository; the repaint follows from
+        the published change event (see :meth:`on_work_changed`).
+        """
         try:
-            if col == 0:
-                work.name = item.text()
-            elif col == 1:
-                work.plan = int(item.text() or 0)
-            elif col == 2:
-                work.done = int(item.text() or 0)
+            value = text if col == 0 else int(text or 0)
         except ValueError:
-            pass
-        self.changed.emit()
+            return False
+        works = self.visible_works(day)
+        if row < len(works):
+            changed = self.repository.set_field(
+                self.year, self.month, day, works[row], self.FIELDS[col], value
+            )
+        elif col == 0 and text:
+            self.repository.add_work(self.year, self.month, day, Work(text))
+            changed = True
+        else:
+            return False
+        if changed:
+            self.work_edited.emit(day)
+        return changed
+
+    def on_work_changed(self, change: WorkChange):
+        if (change.year, change.month) != (self.year, self.month):
+            return
+        if change.field == MONTH:
+            self._visible.clear()
+            self._emit_all_changed()
+            return
+        days = (change.old, change.new) if change.field == DAY else (change.day,)
+        for day in days:
+            self._visible.pop(day, None)
+            index = self.index_for_day(day)
+            if index.isValid():
+                self.dataChanged.emit(index, index)
 
     # --------------------------------------------------------------
-    def set_scale(self, percent: int):
-        f = self.font()
-        f.setPointSize(int(12 * percent / 100))
-        self.caption.setFont(f)
-        self.table.setFont(f)
-        self.caption.setFixedHeight(int(24 * percent / 100))
-        for r in range(self.table.rowCount()):
-            self.table.setRowHeight(r, int(24 * percent / 100))
-
-    def set_caption(self, text: str):
-        self.caption.setText(text)
-
-    def set_edit_mode(self, enabled: bool):
-        trigger = (
-            QTableWidget.DoubleClicked
-            | QTableWidget.SelectedClicked
-            | QTableWidget.EditKeyPressed
-            if enabled
-            else QTableWidget.NoEditTriggers
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._weeks)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.COLUMNS[section]
+        return None
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.NoItemFlags
+        if not self.day_at(index):
+            return Qt.ItemIsEnabled
+        flags = Qt.ItemIsEnabled | Qt.ItemIsSelectable
+        if self.edit_enabled:
+            flags |= Qt.ItemIsEditable
+        return flags
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if index.column() == 0:
+            if role == Qt.DisplayRole:
+                return str(index.row() + 1)
+            if role == Qt.TextAlignmentRole:
+                return int(Qt.AlignCenter)
+            return None
+        day = self.day_at(index)
+        if not day:
+            return None
+        if role == Qt.DisplayRole:
+            return f"{DAY_NAMES[index.column() - 1]} {day}"
+        if role == self.DayRole:
+            return day
+        if role == self.ShortageRole:
+            return self.shortages(day)
+        if role == Qt.ToolTipRole:
+            short = self.shortages(day)
+            if short:
+                lines = (f"{name}: {buffer}" for name, buffer in short.items())
+                return "Постов больше, чем готово глав:\n" + "\n".join(lines)
+        return None
+
+
+class DayDelegate(QStyledItemDelegate):
+    """Paints a day's work list and edits a single sub-cell in place."""
+
+    HEADERS = ["Работа", "План", "Готово"]
+    COLUMN_RATIOS = (0.6, 0.2, 0.2)
+
+    # (day, row) of a pressed work sub-cell
+    work_pressed = Signal(int, int)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.scale_percent = 100
+        self.rows_per_day = 6
+        self._target: tuple[int, int] = (0, 0)
+
+    # --------------------------------------------------------------
+    def line_height(self) -> int:
+        return int(24 * self.scale_percent / 100)
+
+    def cell_height(self) -> int:
+        # caption + header + work rows
+        return self.line_height() * (self.rows_per_day + 2)
+
+    def _column_rects(self, rect: QRect, top: int, height: int) -> list[QRect]:
+        rects = []
+        x = rect.left()
+        for i, ratio in enumerate(self.COLUMN_RATIOS):
+            if i == len(self.COLUMN_RATIOS) - 1:
+                w = rect.right() - x + 1
+            else:
+                w = int(rect.width() * ratio)
+            rects.append(QRect(x, top, w, height))
+            x += w
+        return rects
+
+    def subcell_rect(self, rect: QRect, row: int, col: int) -> QRect:
+        lh = self.line_height()
+        top = rect.top() + lh * (row + 2)
+        return self._column_rects(rect, top, lh)[col]
+
+    def subcell_at(self, rect: QRect, pos) -> tuple[int, int] | None:
+        lh = self.line_height()
+        row = (pos.y() - rect.top()) // lh - 2
+        if row < 0 or row >= self.rows_per_day:
+            return None
+        for col, r in enumerate(self._column_rects(rect, rect.top(), rect.height())):
+            if r.left() <= pos.x() <= r.right():
+                return row, col
+        return None
+
+    # --------------------------------------------------------------
+    def paint(self, painter, option, index):
+        model = index.model()
+        day = index.data(DailyGridModel.DayRole)
+        if not day:
+            super().paint(painter, option, index)
+            return
+        painter.save()
+        if option.state & QStyle.State_Selected:
+            painter.fillRect(option.rect, option.palette.highlight())
+        rect = option.rect
+        lh = self.line_height()
+        text_color = option.palette.color(
+            option.palette.ColorRole.HighlightedText
+            if option.state & QStyle.State_Selected
+            else option.palette.ColorRole.Text
+        )
+        grid_pen = QPen(option.palette.color(option.palette.ColorRole.Mid))
+
+        painter.setFont(option.font)
+        short = index.data(DailyGridModel.ShortageRole)
+        painter.setPen(QColor(SHORTAGE_COLOR) if short else text_color)
+        painter.drawText(
+            QRect(rect.left(), rect.top(), rect.width(), lh),
+            Qt.AlignCenter,
+            index.data(Qt.DisplayRole),
         )
-        self.table.setEditTriggers(trigger)
+
+        bold = QFont(option.font)
+        bold.setBold(True)
+        painter.setFont(bold)
+        metrics = painter.fontMetrics()
+        for col, r in enumerate(self._column_rects(rect, rect.top() + lh, lh)):
+            text = metrics.elidedText(self.HEADERS[col], Qt.ElideRight, r.width() - 2)
+            painter.drawText(r, Qt.AlignCenter, text)
+        painter.setFont(option.font)
+
+        metrics = painter.fontMetrics()
+        works = model.visible_works(day)
+        for row in range(self.rows_per_day):
+            top = rect.top() + lh * (row + 2)
+            painter.setPen(grid_pen)
+            painter.drawLine(rect.left(), top, rect.right(), top)
+            if row >= len(works):
+                continue
+            painter.setPen(text_color)
+            cols = self._column_rects(rect, top, lh)
+            for col in range(3):
+                r = cols[col].adjusted(3, 0, -3, 0)
+                text = metrics.elidedText(
+                    model.field_text(day, row, col), Qt.ElideRight, r.width()
+                )
+                align = (Qt.AlignVCenter | Qt.AlignLeft) if col == 0 else Qt.AlignCenter
+                painter.drawText(r, align, text)
+        painter.restore()
+
+    def sizeHint(self, option, index):
+        size = super().sizeHint(option, index)
+        size.setHeight(self.cell_height())
+        return size
+
+    # --------------------------------------------------------------
+    def editorEvent(self, event, model, option, index):
+        if event.type() in (QEvent.MouseButtonPress, QEvent.MouseButtonDblClick):
+            hit = self.subcell_at(option.rect, event.position().toPoint())
+            if hit is None:
+                # caption/header area: select the day, but never edit it
+                self._target = (0, 0)
+                return event.type() == QEvent.MouseButtonDblClick
+            self._target = hit
+            self.work_pressed.emit(index.data(DailyGridModel.DayRole), hit[0])
+        return super().editorEvent(event, model, option, index)
+
+    def createEditor(self, parent, option, index):
+        editor = QLineEdit(parent)
+        editor.setFrame(False)
+        if self._target[1] != 0:
+            editor.setValidator(QIntValidator(0, 9999, editor))
+            editor.setAlignment(Qt.AlignCenter)
+        return editor
+
+    def setEditorData(self, editor, index):
+        row, col = self._target
+        day = index.data(DailyGridModel.DayRole)
+        editor.setText(index.model().field_text(day, row, col))
+
+    def setModelData(self, editor, model, index):
+        row, col = self._target
+        day = index.data(DailyGridModel.DayRole)
+        if editor.text() != model.field_text(day, row, col):
+            model.set_work_field(day, row, col, editor.text())
+
+    def updateEditorGeometry(self, editor, option, index):
+        row, col = self._target
+        editor.setGeometry(self.subcell_rect(option.rect, row, col))
+
+
+class BulkEditDialog(QDialog):
+    """Day range (and work/plan/weekdays) of a bulk edit of the month."""
+
+    COPY, FILL, CLEAR = "copy", "fill", "clear"
+    TITLES = {
+        COPY: "Копировать на дни",
+        FILL: "Заполнить план",
+        CLEAR: "Очистить дни",
+    }
+
+    def __init__(self, mode: str, days: int, first: int, names: list[str], parent=None):
+        super().__init__(parent)
+        self.mode = mode
+        self.setWindowTitle(self.TITLES[mode])
+        form = QFormLayout(self)
+        self.first_edit = QSpinBox(self)
+        self.first_edit.setRange(1, days)
+        self.first_edit.setValue(first)
+        form.addRow("С дня", self.first_edit)
+        self.last_edit = QSpinBox(self)
+        self.last_edit.setRange(1, days)
+        self.last_edit.setValue(days)
+        form.addRow("По день", self.last_edit)
+        self.work_combo = QComboBox(self)
+        self.weekday_checks: list[QCheckBox] = []
+        if mode == self.CLEAR:
+            self.work_combo.addItem("Все работы", "")
+            for name in names:
+                self.work_combo.addItem(name, name)
+            form.addRow("Работа", self.work_combo)
+        elif mode == self.FILL:
+            self.work_combo.setEditable(True)
+            self.work_combo.addItems(names)
+            form.addRow("Работа", self.work_combo)
+            self.plan_edit = QSpinBox(self)
+            self.plan_edit.setRange(0, 9999)
+            form.addRow("План", self.plan_edit)
+            self.priority_edit = QSpinBox(self)
+            self.priority_edit.setRange(1, 4)
+            form.addRow("Приоритет новых", self.priority_edit)
+            days_box = QWidget(self)
+            days_lay = QHBoxLayout(days_box)
+            days_lay.setContentsMargins(0, 0, 0, 0)
+            for name in WEEKDAY_NAMES:
+                check = QCheckBox(name, days_box)
+                check.setChecked(True)
+                days_lay.addWidget(check)
+                self.weekday_checks.append(check)
+            form.addRow("Дни недели", days_box)
+        buttons = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel, self)
+        buttons.accepted.connect(self.accept)
+        buttons.rejected.connect(self.reject)
+        form.addRow(buttons)
+
+    def day_range(self) -> tuple[int, int]:
+        first, last = self.first_edit.value(), self.last_edit.value()
+        return min(first, last), max(first, last)
+
+    def work(self) -> str:
+        if self.mode == self.CLEAR:
+            return self.work_combo.currentData() or ""
+        return self.work_combo.currentText().strip()
+
+    def weekdays(self) -> list[int]:
+        return [i for i, c in enumerate(self.weekday_checks) if c.isChecked()]
 
 
 class DailyGridPanel(QWidget):
-    """Panel showing month data in grid form with week numbers and day headers."""
+    """Panel showing month data in grid form with week numbers and day headers.
+
+    Month, rows-per-day and filter changes only mark the grid dirty on the
+    :class:`InvalidationScheduler`; the model is updated once per event-loop
+    turn in :meth:`_refresh`.
+    """
+
+    # name of the work the user clicked, "" for an empty row
+    work_selected = Signal(str)
+    # work to rename or merge across the whole archive
+    rename_requested = Signal(str)
 
     def __init__(
         self,
         parent: QWidget | None = None,
         storage: Storage | None = None,
         rows_per_day: int = 6,
+        scheduler: InvalidationScheduler | None = None,
+        repository: MonthRepository | None = None,
+        reconciler: Reconciler | None = None,
+        search_index: SearchIndex | None = None,
     ):
         super().__init__(parent)
         self.storage = storage or Storage(Path("data"))
+        self.repository = repository or MonthRepository(self.storage)
+        self.scheduler = scheduler or InvalidationScheduler(self)
+        self.scheduler.register("grid", self._refresh)
         self.rows_per_day = rows_per_day
-        self.month_data: dict[int, list[Work]] = {}
+        self.month_data: MonthData = {}
         self.priority_filter = PriorityFilter.OneToFour
         self.scale_percent = 100
-        self.day_widgets: dict[int, DayCell] = {}
 
         lay = QVBoxLayout(self)
         title = QLabel("План график")
@@ -179,10 +531,73 @@ class DailyGridPanel(QWidget):
         ctrl.addWidget(QLabel("Месяц"))
         ctrl.addWidget(self.month)
         ctrl.addStretch(1)
+        self.search_edit = QLineEdit(self)
+        self.search_edit.setPlaceholderText("Поиск по архиву…")
+        self.search_edit.setClearButtonEnabled(True)
+        ctrl.addWidget(self.search_edit)
         lay.addLayout(ctrl)
 
-        self.grid = None
-        self._build_grid()
+        # work filter expression with saved presets
+        self.work_filter = WorkFilter()
+        self._filter_valid = True
+        self.presets = FilterPresets(self.storage)
+        filter_row = QHBoxLayout()
+        filter_row.addWidget(QLabel("Фильтр"))
+        self.filter_edit = QLineEdit(self)
+        self.filter_edit.setPlaceholderText('например: priority<=2 and done<plan and name~"Дракон"')
+        self.filter_edit.setClearButtonEnabled(True)
+        filter_row.addWidget(self.filter_edit, 1)
+        self.preset_combo = QComboBox(self)
+        self.preset_combo.setMinimumWidth(120)
+        filter_row.addWidget(self.preset_combo)
+        self.save_preset_btn = QPushButton("Сохранить", self)
+        filter_row.addWidget(self.save_preset_btn)
+        lay.addLayout(filter_row)
+        self._fill_presets()
+        self.filter_edit.textChanged.connect(self._on_filter_text)
+        self.preset_combo.activated.connect(self._on_preset_chosen)
+        self.save_preset_btn.clicked.connect(self._save_preset)
+
+        # full-text search over all months; results jump to their day
+        self.search_index = search_index or SearchIndex(self.storage)
+        self.search_results = QListWidget(self)
+        self.search_results.setMaximumHeight(160)
+        self.search_results.setUniformItemSizes(True)
+        self.search_results.hide()
+        lay.addWidget(self.search_results)
+        self.search_edit.textChanged.connect(self._on_search)
+        self.search_results.itemActivated.connect(self._on_search_hit)
+        self.search_results.itemClicked.connect(self._on_search_hit)
+        # text of the last search; a new one re-stats the archive first
+        self._search_text = ""
+        # day to select once the grid shows the month jumped to
+        self._pending_day = 0
+
+        self.model = DailyGridModel(self.repository, rows_per_day, self)
+        self.repository.events.subscribe(self.model.on_work_changed)
+        self.model.work_edited.connect(self._on_work_edited)
+        # days whose postings exceed chapters done are flagged when given
+        self.reconciler = reconciler
+        self.model.reconciler = reconciler
+        if reconciler is not None:
+            reconciler.subscribe(self.model.on_balances_changed)
+        self.delegate = DayDelegate(self)
+        self.delegate.rows_per_day = rows_per_day
+        self.delegate.work_pressed.connect(self._on_work_pressed)
+        self.model.rows_per_day = rows_per_day
+
+        self.grid = QTableView(self)
+        self.grid.setModel(self.model)
+        self.grid.setItemDelegate(self.delegate)
+        self.grid.verticalHeader().setVisible(False)
+        self.grid.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.grid.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.grid.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeToContents)
+        self.grid.setSelectionMode(QAbstractItemView.SingleSelection)
+        self.grid.setVerticalScrollMode(QAbstractItemView.ScrollPerPixel)
+        self._set_edit_triggers(True)
+        self.grid.setContextMenuPolicy(Qt.CustomContextMenu)
+        self.grid.customContextMenuRequested.connect(self._on_grid_menu)
         lay.addWidget(self.grid)
 
         self.year.valueChanged.connect(self.rebuild)
@@ -190,103 +605,225 @@ class DailyGridPanel(QWidget):
         self.rebuild()
 
     # --------------------------------------------------------------
-    def _build_grid(self):
-        if self.grid is not None:
-            self.grid.deleteLater()
-            self.day_widgets.clear()
-        # 7 rows (header + 6 weeks) x 8 columns (week + 7 days)
-        self.grid = QTableWidget(7, 8, self)
-        self.grid.verticalHeader().setVisible(False)
-        self.grid.setEditTriggers(QTableWidget.NoEditTriggers)
-        self.grid.setHorizontalHeaderLabels([
-            "Неделя", "ПН", "ВТ", "СР", "ЧТ", "ПТ", "СБ", "ВС"
-        ])
-        self.grid.setRowHidden(0, True)
+    def _set_edit_triggers(self, enabled: bool):
+        self.model.edit_enabled = enabled
+        self.grid.setEditTriggers(
+            QAbstractItemView.DoubleClicked
+            | QAbstractItemView.SelectedClicked
+            | QAbstractItemView.EditKeyPressed
+            if enabled
+            else QAbstractItemView.NoEditTriggers
+        )
 
-        for week in range(1, 7):
-            item = QTableWidgetItem(str(week))
-            item.setTextAlignment(Qt.AlignCenter)
-            item.setFlags(Qt.ItemIsEnabled)
-            self.grid.setItem(week, 0, item)
+    def _update_row_heights(self):
+        self.grid.verticalHeader().setDefaultSectionSize(self.delegate.cell_height())
 
     # --------------------------------------------------------------
     def set_rows_per_day(self, rows: int):
         if rows == self.rows_per_day:
             return
         self.rows_per_day = rows
-        self._build_grid()
-        self.rebuild()
+        self.scheduler.invalidate("grid", "rows")
 
     def set_scale(self, percent: int):
         self.scale_percent = max(50, min(200, percent))
         f = self.font()
         f.setPointSize(int(12 * self.scale_percent / 100))
         self.setFont(f)
-        for cell in self.day_widgets.values():
-            cell.set_scale(self.scale_percent)
-        for r in range(self.grid.rowCount()):
-            base = 0 if r == 0 else self.rows_per_day * 24
-            self.grid.setRowHeight(r, int(base * self.scale_percent / 100))
+        self.delegate.scale_percent = self.scale_percent
+        self._update_row_heights()
+        self.grid.viewport().update()
 
     def set_scale_edit_mode(self, enabled: bool):
-        for cell in self.day_widgets.values():
-            cell.set_edit_mode(enabled)
+        self._set_edit_triggers(enabled)
 
     def set_priority_filter(self, filt: PriorityFilter):
+        if filt == self.priority_filter:
+            return
         self.priority_filter = filt
-        self.rebuild()
+        self.scheduler.invalidate("grid", "filter")
+
+    def set_work_filter(self, filt: WorkFilter):
+        if filt == self.work_filter:
+            return
+        self.work_filter = filt
+        self.scheduler.invalidate("grid", "filter")
+
+    def _on_filter_text(self, text: str):
+        """Compile the expression on every keystroke; keep the last valid one."""
+        try:
+            filt = compile_filter(text)
+        except FilterError as e:
+            self._filter_valid = False
+            self.filter_edit.setStyleSheet(f"color: {ERROR_TEXT_COLOR};")
+            self.filter_edit.setToolTip(str(e))
+            return
+        self._filter_valid = True
+        self.filter_edit.setStyleSheet("")
+        self.filter_edit.setToolTip("")
+        self.set_work_filter(filt)
+
+    def _fill_presets(self):
+        self.preset_combo.clear()
+        self.preset_combo.addItem("Пресеты…", "")
+        for name in self.presets.names():
+            self.preset_combo.addItem(name, name)
+
+    def _on_preset_chosen(self, index: int):
+        name = self.preset_combo.itemData(index)
+        if name:
+            self.filter_edit.setText(self.presets.get(name))
+
+    def _save_preset(self):
+        text = self.filter_edit.text().strip()
+        if not text or not self._filter_valid:
+            return
+        name, ok = QInputDialog.getText(self, "Пресет фильтра", "Название")
+        if ok and name.strip():
+            self.presets.set(name.strip(), text)
+            self._fill_presets()
+            self.preset_combo.setCurrentIndex(self.preset_combo.findData(name.strip()))
 
     # --------------------------------------------------------------
     def rebuild(self):
-        y = self.year.value()
-        m = self.month.currentIndex() + 1
-        self.load_month(y, m)
-
-        weeks = calendar.monthcalendar(y, m)
-        day_names = ["ПН", "ВТ", "СР", "ЧТ", "ПТ", "СБ", "ВС"]
-
-        # Clear previous day widgets
-        for r in range(1, 7):
-            for c in range(1, 8):
-                w = self.grid.cellWidget(r, c)
-                if w:
-                    w.deleteLater()
-                self.grid.setCellWidget(r, c, None)
-        self.day_widgets.clear()
-
-        # Hide unused week rows
-        for r in range(1, 7):
-            self.grid.setRowHidden(r, r > len(weeks))
-
-        for w_index, week in enumerate(weeks):
-            for d_index, day in enumerate(week):
-                if day == 0:
-                    continue
-                cell = DayCell(self.rows_per_day, self.grid)
-                cell.changed.connect(self.save_month)
-                cell.set_caption(f"{day_names[d_index]} {day}")
-                works = self.month_data.get(day, [])
-                cell.set_works(works, self.priority_filter)
-                self.grid.setCellWidget(w_index + 1, d_index + 1, cell)
-                self.day_widgets[day] = cell
-
-        self.set_scale(self.scale_percent)
+        self.scheduler.invalidate("grid", "month")
+
+    def _refresh(self, reasons: set[str]):
+        with phase("grid rebuild"):
+            self.delegate.rows_per_day = self.rows_per_day
+            if "month" in reasons:
+                # set_month repaints every day, so rows/filter need no signals
+                self.model.rows_per_day = self.rows_per_day
+                self.model.priority_filter = self.priority_filter
+                self.model.work_filter = self.work_filter
+                y = self.year.value()
+                m = self.month.currentIndex() + 1
+                self.load_month(y, m)
+                if self.reconciler is not None:
+                    self.reconciler.set_month(y, m)
+                self.model.set_month(y, m, self.month_data)
+                if self._pending_day:
+                    self._select_day(self._pending_day)
+                    self._pending_day = 0
+            else:
+                self.model.set_rows_per_day(self.rows_per_day)
+                self.model.set_priority_filter(self.priority_filter)
+                self.model.set_work_filter(self.work_filter)
+            self._update_row_heights()
 
     # --------------------------------------------------------------
     def load_month(self, year: int, month: int):
-        data = self.storage.load_json(f"{year}/{month:02d}.json", {}) or {}
-        self.month_data = {
-            int(d): [Work.from_dict(w) for w in wl]
-            for d, wl in data.items()
-        }
+        self.month_data = self.repository.get(year, month)
+
+    def _on_search(self, text: str):
+        if text.strip() and not self._search_text.strip():
+            # pick up files changed or removed outside the app since the last search
+            self.search_index.refresh()
+        self._search_text = text
+        hits = self.search_index.search(text) if text.strip() else []
+        self.search_results.clear()
+        for hit in hits:
+            where = f"{hit.day:02d}.{hit.month:02d}.{hit.year}" if hit.day else f"{hit.month:02d}.{hit.year}"
+            item = QListWidgetItem(f"{where}  [{KIND_LABELS[hit.kind]}]  {hit.text}")
+            item.setData(Qt.UserRole, hit)
+            self.search_results.addItem(item)
+        self.search_results.setVisible(bool(text.strip()))
+
+    def _on_search_hit(self, item: QListWidgetItem):
+        hit: SearchHit = item.data(Qt.UserRole)
+        self.jump_to(hit.year, hit.month, hit.day)
+
+    def jump_to(self, year: int, month: int, day: int = 0):
+        """Show ``year``/``month`` and select ``day`` (if not 0)."""
+        if (year, month) == (self.model.year, self.model.month) and not self.scheduler.is_dirty("grid"):
+            self._select_day(day)
+            return
+        self._pending_day = day
+        self.year.setValue(year)
+        self.month.setCurrentIndex(month - 1)
+        self.rebuild()
 
-    def save_month(self):
-        y = self.year.value()
-        m = self.month.currentIndex() + 1
-        data = {}
-        for day, widget in self.day_widgets.items():
-            works = widget.get_works()
-            if works:
-                data[str(day)] = [w.to_dict() for w in works]
-        self.storage.save_json(f"{y}/{m:02d}.json", data)
+    def _select_day(self, day: int):
+        index = self.model.index_for_day(day)
+        if index.isValid():
+            self.grid.setCurrentIndex(index)
+            self.grid.scrollTo(index)
+
+    def _on_work_pressed(self, day: int, row: int):
+        works = self.model.visible_works(day)
+        self.work_selected.emit(works[row].name if row < len(works) else "")
 
+    def _on_grid_menu(self, pos):
+        index = self.grid.indexAt(pos)
+        day = self.model.day_at(index)
+        if not day:
+            return
+        hit = self.delegate.subcell_at(self.grid.visualRect(index), pos)
+        works = self.model.visible_works(day)
+        name = works[hit[0]].name if hit is not None and hit[0] < len(works) else ""
+        menu = QMenu(self.grid)
+        rename = menu.addAction(f"Переименовать «{name}» во всём архиве…") if name else None
+        if name:
+            menu.addSeparator()
+        bulk = menu.addMenu("Массовое изменение")
+        copy_day = bulk.addAction("Копировать день на…")
+        copy_week = bulk.addAction("Копировать неделю на…")
+        fill = bulk.addAction("Заполнить план работы…")
+        clear = bulk.addAction("Очистить дни…")
+        bulk.addSeparator()
+        clone = bulk.addAction("Шаблон из прошлого месяца")
+        for action in bulk.actions():
+            action.setEnabled(self.model.edit_enabled)
+        chosen = menu.exec(self.grid.viewport().mapToGlobal(pos))
+        if chosen is None:
+            return
+        if chosen is rename:
+            self.rename_requested.emit(name)
+        elif chosen is clone:
+            bulk_edit.clone_previous_month(self.repository, self.model.year, self.model.month)
+        else:
+            mode = {
+                copy_day: BulkEditDialog.COPY,
+                copy_week: BulkEditDialog.COPY,
+                fill: BulkEditDialog.FILL,
+                clear: BulkEditDialog.CLEAR,
+            }[chosen]
+            source = (
+                bulk_edit.week_of(self.model.year, self.model.month, day)
+                if chosen is copy_week
+                else [day]
+            )
+            self._bulk_edit(mode, day, source, name)
+
+    def _bulk_edit(self, mode: str, day: int, source: list[int], name: str):
+        """Ask for the range of a bulk edit and apply it as one batch."""
+        y, m = self.model.year, self.model.month
+        days = calendar.monthrange(y, m)[1]
+        names = sorted({w.name for works in self.month_data.values() for w in works if w.name})
+        # copies start right after the copied day/week
+        first = source[-1] + 1 if mode == BulkEditDialog.COPY else day
+        dialog = BulkEditDialog(mode, days, min(first, days), names, self)
+        if mode == BulkEditDialog.FILL and name:
+            dialog.work_combo.setCurrentText(name)
+        if dialog.exec() != QDialog.Accepted:
+            return
+        first, last = dialog.day_range()
+        if mode == BulkEditDialog.COPY:
+            bulk_edit.copy_days(self.repository, y, m, source, first, last)
+        elif mode == BulkEditDialog.FILL:
+            if dialog.work():
+                bulk_edit.fill_plan(
+                    self.repository, y, m, dialog.work(), dialog.plan_edit.value(),
+                    dialog.weekdays(), first, last, dialog.priority_edit.value(),
+                )
+        else:
+            bulk_edit.clear_range(self.repository, y, m, first, last, dialog.work() or None)
+
+    def _on_work_edited(self, day: int):
+        self.save_month()
+
+    def save_month(self):
+        y, m = self.model.year, self.model.month
+        if not y:
+            return
+        self.repository.save(y, m)
@@ -1,15 +1,20 @@
-from dataclasses import dataclass, asdict
 from pathlib import Path
 
-from PySide6.QtCore import Qt
+from PySide6.QtCore import (
+    Qt,
+    Signal,
+    QAbstractTableModel,
+    QModelIndex,
+    QSortFilterProxyModel,
+)
 from PySide6.QtGui import QColor
 from PySide6.QtWidgets import (
     QWidget,
     QVBoxLayout,
     QHBoxLayout,
     QLabel,
-    QTableWidget,
-    QTableWidgetItem,
+    QTableView,
+    QHeaderView,
     QSpinBox,
     QComboBox,
     QPushButton,
@@ -18,43 +23,212 @@ from PySide6.QtWidgets import (
 )
 
 from ..storage import Storage
-from ..priority_service import PriorityFilter, sort_tasks, filter_tasks, color_for
+from ..month_repository import MonthRepository, MonthData, Work
+from ..events import ADDED, DAY, MONTH, REMOVED, WorkChange
+from ..priority_service import PriorityFilter, matches_filter, color_for
+from ..work_filter import WorkFilter
+
+
+
+class WorkListModel(QAbstractTableModel):
+    """Flat list of ``(day, work)`` entries in insertion order.
+
+    Mutations go through the :class:`MonthRepository`; the model follows the
+    published change events and emits ``rowsInserted``/``rowsRemoved``/
+    ``dataChanged`` for just the affected row, so edits made in other panels
+    show up too.  Ordering and the priority filter are handled by
+    :class:`WorkSortProxy`.
+    """
+
+    HEADERS = ["День", "Работа", "План", "Готово", "Приоритет", "18+", "Комментарий"]
+    FIELDS = [None, "name", "plan", "done", "priority", "is_adult", "comment"]
 
+    edited = Signal(int)
 
-@dataclass
-class Work:
-    name: str
-    plan: int = 0
-    done: int = 0
-    priority: int = 1
-    is_adult: bool = False
-    comment: str = ""
+    def __init__(self, repository: MonthRepository, parent=None):
+        super().__init__(parent)
+        self.repository = repository
+        self.year = 0
+        self.month = 0
+        self._entries: list[list] = []  # [day, work]
+
+    # ------------------------------------------------------------------
+    def set_month(self, year: int, month: int):
+        self.beginResetModel()
+        self.year, self.month = year, month
+        month_data = self.repository.get(year, month)
+        self._entries = [
+            [day, work] for day in sorted(month_data) for work in month_data[day]
+        ]
+        self.endResetModel()
+
+    def entry(self, row: int) -> tuple[int, Work]:
+        day, work = self._entries[row]
+        return day, work
 
-    def to_dict(self) -> dict:
-        return asdict(self)
+    def _row_of(self, work: Work) -> int:
+        for row, (_day, w) in enumerate(self._entries):
+            if w is work:
+                return row
+        return -1
 
-    @staticmethod
-    def from_dict(data: dict) -> "Work":
-        return Work(
-            name=data.get("name", ""),
-            plan=int(data.get("plan", 0)),
-            done=int(data.get("done", 0)),
-            priority=int(data.get("priority", 1)),
-            is_adult=bool(data.get("is_adult", False)),
-            comment=data.get("comment", ""),
-        )
+    def add_work(self, day: int, work: Work):
+        self.repository.add_work(self.year, self.month, day, work)
+        self.edited.emit(day)
+
+    def remove_row(self, row: int):
+        day, work = self._entries[row]
+        self.repository.remove_work(self.year, self.month, day, work)
+        self.edited.emit(day)
+
+    def on_work_changed(self, change: WorkChange):
+        if (change.year, change.month) != (self.year, self.month):
+            return
+        if change.field == MONTH:
+            self.set_month(self.year, self.month)
+            return
+        if change.field == ADDED:
+            row = len(self._entries)
+            self.beginInsertRows(QModelIndex(), row, row)
+            self._entries.append([change.day, change.work])
+            self.endInsertRows()
+            return
+        row = self._row_of(change.work)
+        if row < 0:
+            return
+        if change.field == REMOVED:
+            self.beginRemoveRows(QModelIndex(), row, row)
+            del self._entries[row]
+            self.endRemoveRows()
+            return
+        if change.field == DAY:
+            self._entries[row][0] = change.new
+            col = 0
+        else:
+            col = self.FIELDS.index(change.field)
+        # the proxy sorts on column 0 and re-sorts only when the change covers it
+        first = 0 if change.field == "priority" else col
+        self.dataChanged.emit(self.index(row, first), self.index(row, col))
+
+    # ------------------------------------------------------------------
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._entries)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.HEADERS[section]
+        return None
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.NoItemFlags
+        flags = Qt.ItemIsEnabled | Qt.ItemIsSelectable
+        if index.column() == 5:
+            return flags | Qt.ItemIsUserCheckable
+        return flags | Qt.ItemIsEditable
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        day, work = self._entries[index.row()]
+        col = index.column()
+        if col == 5:
+            if role == Qt.CheckStateRole:
+                return Qt.Checked if work.is_adult else Qt.Unchecked
+            return None
+        if role in (Qt.DisplayRole, Qt.EditRole):
+            value = day if col == 0 else getattr(work, self.FIELDS[col])
+            return str(value)
+        if role == Qt.ForegroundRole and col == 4:
+            return QColor(color_for(work.priority))
+        return None
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if not index.isValid():
+            return False
+        day, work = self._entries[index.row()]
+        col = index.column()
+        y, m = self.year, self.month
+        try:
+            if col == 5 and role == Qt.CheckStateRole:
+                changed = self.repository.set_field(
+                    y, m, day, work, "is_adult", Qt.CheckState(value) == Qt.Checked
+                )
+            elif role != Qt.EditRole:
+                return False
+            elif col == 0:
+                new_day = int(value)
+                changed = new_day != day
+                if changed:
+                    self.repository.move_work(y, m, day, new_day, work)
+                    day = new_day
+            elif col in (1, 6):
+                changed = self.repository.set_field(y, m, day, work, self.FIELDS[col], str(value))
+            elif col == 4:
+                changed = self.repository.set_field(y, m, day, work, "priority", int(value or 1))
+            else:
+                changed = self.repository.set_field(
+                    y, m, day, work, self.FIELDS[col], int(value or 0)
+                )
+        except ValueError:
+            return False
+        if changed:
+            self.edited.emit(day)
+        return True
+
+
+class WorkSortProxy(QSortFilterProxyModel):
+    """Orders rows by day, then priority (highest first) and applies the filter."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.priority_filter = PriorityFilter.OneToFour
+        self.work_filter = WorkFilter()
+        self.setDynamicSortFilter(True)
+
+    def set_priority_filter(self, filt: PriorityFilter):
+        self.priority_filter = filt
+        self.invalidateFilter()
+
+    def set_work_filter(self, filt: WorkFilter):
+        if filt == self.work_filter:
+            return
+        self.work_filter = filt
+        self.invalidateFilter()
+
+    def filterAcceptsRow(self, source_row, source_parent):
+        _day, work = self.sourceModel().entry(source_row)
+        return matches_filter(work, self.priority_filter) and self.work_filter(work)
+
+    def lessThan(self, left, right):
+        model = self.sourceModel()
+        l_day, l_work = model.entry(left.row())
+        r_day, r_work = model.entry(right.row())
+        if l_day != r_day:
+            return l_day < r_day
+        if l_work.priority != r_work.priority:
+            return l_work.priority > r_work.priority
+        return left.row() < right.row()
 
 
 class MainPanel(QWidget):
     """Simplified central panel showing a list of works per day."""
 
-    HEADERS = ["День", "Работа", "План", "Готово", "Приоритет", "18+", "Комментарий"]
+    HEADERS = WorkListModel.HEADERS
 
-    def __init__(self, parent=None, storage: Storage | None = None):
+    def __init__(
+        self,
+        parent=None,
+        storage: Storage | None = None,
+        repository: MonthRepository | None = None,
+    ):
         super().__init__(parent)
         self.storage = storage or Storage(Path("data"))
-        self.month_data: dict[int, list[Work]] = {}
-        self._row_map: dict[int, tuple[int, Work]] = {}
+        self.repository = repository or MonthRepository(self.storage)
+        self.month_data: MonthData = {}
         self.priority_filter = PriorityFilter.OneToFour
         self.scale_percent = 100
 
@@ -74,10 +248,17 @@ class MainPanel(QWidget):
         ctrl.addWidget(self.add_btn)
         lay.addLayout(ctrl)
 
-        self.table = QTableWidget(0, len(self.HEADERS), self)
-        self.table.setHorizontalHeaderLabels(self.HEADERS)
-        self.table.setEditTriggers(QTableWidget.DoubleClicked | QTableWidget.SelectedClicked | QTableWidget.EditKeyPressed)
-        self.table.itemChanged.connect(self._on_item_changed)
+        self.model = WorkListModel(self.repository, self)
+        self.repository.events.subscribe(self.model.on_work_changed)
+        self.model.edited.connect(self._on_edited)
+        self.proxy = WorkSortProxy(self)
+        self.proxy.setSourceModel(self.model)
+        self.proxy.sort(0)
+
+        self.table = QTableView(self)
+        self.table.setModel(self.proxy)
+        self.table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.table.setEditTriggers(QTableView.DoubleClicked | QTableView.SelectedClicked | QTableView.EditKeyPressed)
         self.table.setContextMenuPolicy(Qt.CustomContextMenu)
         self.table.customContextMenuRequested.connect(self._show_menu)
         lay.addWidget(self.table)
@@ -95,108 +276,37 @@ class MainPanel(QWidget):
         f = self.font()
         f.setPointSize(int(12 * self.scale_percent / 100))
         self.setFont(f)
-        for r in range(self.table.rowCount()):
-            self.table.setRowHeight(r, int(24 * self.scale_percent / 100))
+        self.table.verticalHeader().setDefaultSectionSize(int(24 * self.scale_percent / 100))
 
     def set_scale_edit_mode(self, enabled: bool):
-        trigger = (QTableWidget.DoubleClicked | QTableWidget.SelectedClicked | QTableWidget.EditKeyPressed) if enabled else QTableWidget.NoEditTriggers
+        trigger = (QTableView.DoubleClicked | QTableView.SelectedClicked | QTableView.EditKeyPressed) if enabled else QTableView.NoEditTriggers
         self.table.setEditTriggers(trigger)
 
     def set_priority_filter(self, filt: PriorityFilter):
         self.priority_filter = filt
-        self._refresh_table()
+        self.proxy.set_priority_filter(filt)
+
+    def set_work_filter(self, filt: WorkFilter):
+        self.proxy.set_work_filter(filt)
 
     # ------------------------------------------------------------------
     def rebuild(self):
         y = self.year.value()
         m = self.month.currentIndex() + 1
         self.load_month(y, m)
-        self._refresh_table()
-
-    def _refresh_table(self):
-        self.table.blockSignals(True)
-        rows = sum(
-            len(list(filter_tasks(v, self.priority_filter)))
-            for v in self.month_data.values()
-        )
-        self.table.setRowCount(rows)
-        self._row_map.clear()
-        row = 0
-        for day in sorted(self.month_data.keys()):
-            works = list(filter_tasks(self.month_data[day], self.priority_filter))
-            for work in sort_tasks(works):
-                self._row_map[row] = (day, work)
-                self._set_row(row, day, work)
-                row += 1
-        self.table.blockSignals(False)
+        self.model.set_month(y, m)
         self.set_scale(self.scale_percent)
 
-    def _set_row(self, row: int, day: int, work: Work):
-        def set_item(col: int, text: str, checkable: bool = False, checked: bool = False):
-            item = QTableWidgetItem(text)
-            if checkable:
-                item.setFlags(item.flags() | Qt.ItemIsUserCheckable)
-                item.setCheckState(Qt.Checked if checked else Qt.Unchecked)
-                item.setText("")
-            self.table.setItem(row, col, item)
-        set_item(0, str(day))
-        set_item(1, work.name)
-        set_item(2, str(work.plan))
-        set_item(3, str(work.done))
-        pri_item = QTableWidgetItem(str(work.priority))
-        pri_item.setForeground(QColor(color_for(work.priority)))
-        self.table.setItem(row, 4, pri_item)
-        set_item(5, "", checkable=True, checked=work.is_adult)
-        set_item(6, work.comment)
-
     # ------------------------------------------------------------------
-    def _on_item_changed(self, item: QTableWidgetItem):
-        row = item.row()
-        col = item.column()
-        if row not in self._row_map:
-            return
-        day, work = self._row_map[row]
-        try:
-            if col == 0:
-                new_day = int(item.text())
-                if new_day != day:
-                    self.month_data[day].remove(work)
-                    self.month_data.setdefault(new_day, []).append(work)
-                    if not self.month_data[day]:
-                        del self.month_data[day]
-                    self._refresh_table()
-                    self.save_month()
-                    return
-            elif col == 1:
-                work.name = item.text()
-            elif col == 2:
-                work.plan = int(item.text() or 0)
-            elif col == 3:
-                work.done = int(item.text() or 0)
-            elif col == 4:
-                work.priority = int(item.text() or 1)
-            elif col == 5:
-                work.is_adult = item.checkState() == Qt.Checked
-            elif col == 6:
-                work.comment = item.text()
-        except ValueError:
-            pass
-        self.save_month()
-
     def _show_menu(self, pos):
-        row = self.table.rowAt(pos.y())
-        if row < 0 or row not in self._row_map:
+        index = self.table.indexAt(pos)
+        if not index.isValid():
             return
         menu = QMenu(self)
         act_del = menu.addAction("Удалить")
         action = menu.exec(self.table.viewport().mapToGlobal(pos))
         if action == act_del:
-            day, work = self._row_map[row]
-            self.month_data[day].remove(work)
-            if not self.month_data[day]:
-                del self.month_data[day]
-            self.save_month()
-            self._refresh_table()
+            self.model.remove_row(self.proxy.mapToSource(index).row())
 
     # ------------------------------------------------------------------
     def add_work(self):
@@ -222,23 +332,16 @@ class MainPanel(QWidget):
         if not ok:
             return
         w = Work(name=name, plan=plan, done=done, priority=priority, is_adult=(adult == "18+"), comment=comment)
-        self.month_data.setdefault(day, []).append(w)
-        self.save_month()
-        self._refresh_table()
+        self.model.add_work(day, w)
 
     # ------------------------------------------------------------------
     def load_month(self, year: int, month: int):
-        data = self.storage.load_json(f"{year}/{month:02d}.json", {}) or {}
-        self.month_data = {
-            int(d): [Work.from_dict(w) for w in wl]
-            for d, wl in data.items()
-        }
+        self.month_data = self.repository.get(year, month)
+
+    def _on_edited(self, day: int):
+        self.save_month()
 
     def save_month(self):
         y = self.year.value()
         m = self.month.currentIndex() + 1
-        data = {
-            str(day): [w.to_dict() for w in works]
-            for day, works in self.month_data.items() if works
-        }
-        self.storage.save_json(f"{y}/{m:02d}.json", data)
+        self.repository.save(y, m)
@@ -0,0 +1,61 @@
+"""Fine-grained change events for month data.
+
+Panels that edit works publish a :class:`WorkChange` per field through the
+:class:`EventBus` owned by :class:`~app.month_repository.MonthRepository`.
+Subscribers such as the top-of-month and stats panels apply the delta to
+their running aggregates instead of reloading and re-summing the month.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Callable, List
+
+# Pseudo field names for structural changes
+ADDED = "__added__"
+REMOVED = "__removed__"
+DAY = "__day__"
+# many works of the month changed at once (a bulk edit); subscribers
+# rebuild what they show of the month instead of applying deltas
+MONTH = "__month__"
+
+
+@dataclass(frozen=True)
+class WorkChange:
+    """A single change of ``work`` in ``year``/``month``/``day``.
+
+    ``field`` is a :class:`~app.month_repository.Work` attribute name or one
+    of :data:`ADDED`, :data:`REMOVED` and :data:`DAY` (``old``/``new`` are the
+    old and new day numbers for a move, ``old`` is the former position for a
+    removal), or :data:`MONTH` with ``day`` 0, no ``work`` and the grouped
+    changes in ``new``.
+    """
+
+    year: int
+    month: int
+    day: int
+    work: Any
+    field: str
+    old: Any = None
+    new: Any = None
+
+
+class EventBus:
+    """Minimal synchronous publish/subscribe hub."""
+
+    def __init__(self):
+        self._subscribers: List[Callable[[WorkChange], None]] = []
+
+    def subscribe(self, callback: Callable[[WorkChange], None]) -> None:
+        if callback not in self._subscribers:
+            self._subscribers.append(callback)
+
+    def unsubscribe(self, callback: Callable[[WorkChange], None]) -> None:
+        if callback in self._subscribers:
+            self._subscribers.remove(callback)
+
+    def publish(self, change: WorkChange) -> None:
+        for callback in list(self._subscribers):
+            callback(change)
+
+
+__all__ = ["ADDED", "REMOVED", "DAY", "MONTH", "WorkChange", "EventBus"]
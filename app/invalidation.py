@@ -0,0 +1,67 @@
+"""Coalesced refresh scheduling for panels.
+
+Panels register a refresh handler under a name and call
+:meth:`InvalidationScheduler.invalidate` with a reason instead of rebuilding
+immediately.  All invalidations made during one event-loop turn are merged
+and each dirty target is refreshed once, with the set of reasons it was
+invalidated for, so the handler can pick the cheapest refresh that covers
+them.
+"""
+from __future__ import annotations
+
+from collections import Counter
+from typing import Callable, Dict, Set
+
+from PySide6.QtCore import QObject, QTimer
+
+
+class InvalidationScheduler(QObject):
+    """Collect dirty marks and run one deferred refresh pass per target."""
+
+    def __init__(self, parent: QObject | None = None):
+        super().__init__(parent)
+        self._handlers: Dict[str, Callable[[Set[str]], None]] = {}
+        self._dirty: Dict[str, Set[str]] = {}
+        self.requested: Counter = Counter()
+        self.ran: Counter = Counter()
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(0)
+        self._timer.timeout.connect(self.flush)
+
+    def register(self, name: str, handler: Callable[[Set[str]], None]) -> None:
+        """Register ``handler`` to refresh target ``name``."""
+        self._handlers[name] = handler
+
+    def invalidate(self, name: str, reason: str) -> None:
+        """Mark ``name`` dirty for ``reason`` and schedule a refresh pass."""
+        self.requested[name] += 1
+        self._dirty.setdefault(name, set()).add(reason)
+        if not self._timer.isActive():
+            self._timer.start()
+
+    def is_dirty(self, name: str) -> bool:
+        return name in self._dirty
+
+    def flush(self) -> None:
+        """Run pending refreshes now, in registration order.
+
+        Marks made by the handlers themselves are left for the next pass,
+        so a handler invalidating its own target cannot loop.
+        """
+        self._timer.stop()
+        dirty, self._dirty = self._dirty, {}
+        # marks for targets nobody registered are dropped
+        for name in list(self._handlers):
+            reasons = dirty.get(name)
+            if reasons is None:
+                continue
+            self.ran[name] += 1
+            self._handlers[name](reasons)
+
+    def counters(self) -> Dict[str, Dict[str, int]]:
+        """Return how many refreshes were requested and actually ran."""
+        return {
+            name: {"requested": self.requested[name], "ran": self.ran[name]}
+            for name in sorted(set(self.requested) | set(self.ran))
+        }
@@ -1,11 +1,66 @@
+import argparse
 import sys
-from PySide6.QtWidgets import QApplication
-from .main_window import MainWindow
+
+from .profiling import phase, profiler
+
+
+def _parse_args(argv):
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="print startup phase timings")
+    parser.add_argument("--profile-dump", metavar="PATH",
+                        help="also write cProfile stats of the startup to PATH")
+    parser.add_argument("--profile-json", metavar="PATH",
+                        help="write the phase timings as JSON to PATH")
+    parser.add_argument("--quit-after-startup", action="store_true",
+                        help=argparse.SUPPRESS)
+    # everything else is left to Qt
+    return parser.parse_known_args(argv[1:])
+
 
 def main():
-    app = QApplication(sys.argv)
-    win = MainWindow()
-    win.show()
+    args, qt_args = _parse_args(sys.argv)
+    profiling = args.profile_startup or args.profile_dump or args.profile_json
+    cprof = None
+    if profiling:
+        profiler.start()
+        if args.profile_dump:
+            import cProfile
+
+            cprof = cProfile.Profile()
+            cprof.enable()
+
+    with phase("import PySide6"):
+        from PySide6.QtCore import QTimer
+        from PySide6.QtWidgets import QApplication
+    with phase("import app"):
+        from .main_window import MainWindow
+    with phase("QApplication"):
+        app = QApplication(sys.argv[:1] + qt_args)
+    with phase("MainWindow.__init__"):
+        win = MainWindow()
+    with phase("show"):
+        win.show()
+
+    def startup_done():
+        # the first refresh pass (grid rebuild, _load_panels) has run
+        win.scheduler.flush()
+        if cprof is not None:
+            cprof.disable()
+            cprof.dump_stats(args.profile_dump)
+        if profiling:
+            total = profiler.finish()
+            if args.profile_startup:
+                print(profiler.table(total))
+            if args.profile_json:
+                import json
+
+                with open(args.profile_json, "w", encoding="utf-8") as fh:
+                    json.dump({**profiler.timings(), "total": total * 1000}, fh)
+        if args.quit_after_startup:
+            app.quit()
+
+    QTimer.singleShot(0, startup_done)
     sys.exit(app.exec())
 
 if __name__ == "__main__":
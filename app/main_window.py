@@ -1,11 +1,14 @@
 from pathlib import Path
 
-from PySide6.QtCore import Qt, QTimer, QSettings, QSize
-from PySide6.QtGui import QIcon
+from PySide6.QtCore import Qt, QEvent, QSettings, QSize
+from PySide6.QtGui import QAction, QIcon, QKeySequence
 from PySide6.QtWidgets import (
     QMainWindow,
     QDockWidget,
+    QInputDialog,
     QLabel,
+    QMessageBox,
+    QProgressDialog,
     QStatusBar,
     QWidget,
     QToolButton,
@@ -14,7 +17,12 @@ from PySide6.QtWidgets import (
     QVBoxLayout,
 )
 
-from .styles import base_stylesheet, light_stylesheet, apply_glass_effect
+from .styles import (
+    GLASS_STYLESHEET,
+    apply_glass_effect,
+    base_stylesheet,
+    light_stylesheet,
+)
 from .settings_dialog import SettingsDialog
 from .version import get_version
 from .central.daily_grid_panel import DailyGridPanel
@@ -22,8 +30,39 @@ from .panels.top_month_panel import TopMonthPanel
 from .panels.postings_panel import PostingsPanel
 from .panels.stats_panel import StatsPanel
 from .storage import Storage
+from .month_repository import MonthRepository
+from .postings_store import PostingsStore
+from .reconciliation import Reconciler
 from .priority_service import PriorityFilter
-
+from .invalidation import InvalidationScheduler
+from .profiling import phase
+from .time_tracker import StopwatchLabel, TimeTracker
+from .undo import UndoStack
+from .work_rename import RenameCancelled, WorkRenamer, recover_rename
+
+
+# What each pref affects; apply_prefs only reapplies the changed groups
+PREF_GROUPS = {
+    "theme": "theme",
+    "accent": "theme",
+    "palette": "theme",
+    "neon_size": "theme",
+    "neon_intensity": "theme",
+    "glass_enabled": "glass",
+    "glass_opacity": "glass",
+    "glass_blur": "glass",
+    "glass_texture": "glass",
+    "glass_sharpness": "glass",
+    "title_font": "fonts",
+    "text_font": "fonts",
+    "central_scale": "scale",
+    "scale_edit_mode": "scale",
+    "left_edit_mode": "edit",
+    "right_edit_mode": "edit",
+    "rows_per_day": "rows",
+    "priority_filter": "filter",
+}
+_UNSET = object()
 
 
 class MainWindow(QMainWindow):
@@ -55,25 +94,47 @@ class MainWindow(QMainWindow):
             "rows_per_day": int(self.settings.value("rows_per_day", 6)),
         }
 
+        # Pref values as of the last apply_prefs
+        self._applied_prefs: dict = {}
+
         # Storage
         save_dir = self.prefs.get("save_dir") or "data"
         self.storage = Storage(Path(save_dir))
+        # undo a rename interrupted by a crash before anything reads the files
+        recover_rename(self.storage)
+        # Single shared in-memory copy of the month files
+        self.repository = MonthRepository(self.storage)
+        # Postings schedule and its cross-check against the done chapters
+        self.postings_store = PostingsStore(self.storage)
+        self.reconciler = Reconciler(self.repository, self.postings_store)
+
+        # One undo history for the edits of every panel
+        self.undo_stack = UndoStack(self.repository)
+
+        # Panel refreshes are coalesced into one pass per event-loop turn
+        self.scheduler = InvalidationScheduler(self)
 
         # Central panel
         self.central = DailyGridPanel(
             self,
             storage=self.storage,
             rows_per_day=self.prefs.get("rows_per_day", 6),
+            scheduler=self.scheduler,
+            repository=self.repository,
+            reconciler=self.reconciler,
         )
         self.setCentralWidget(self.central)
 
+        # Dock contents are built and loaded on first show, see _ensure_panel
+        self.left_panel: TopMonthPanel | None = None
+        self.right_panel: PostingsPanel | None = None
+        self.stats_panel: StatsPanel | None = None
+        self._panels_month: tuple[int, int] | None = None
+
         # Left dock (Top month)
         self.left_dock = QDockWidget("ТОП месяца", self)
         self.left_dock.setAllowedAreas(Qt.LeftDockWidgetArea)
         self.left_dock.setFeatures(QDockWidget.NoDockWidgetFeatures)
-        self.left_panel = TopMonthPanel(self.left_dock)
-        self.left_panel.storage = self.storage
-        self.left_dock.setWidget(self.left_panel)
         self.addDockWidget(Qt.LeftDockWidgetArea, self.left_dock)
         self.left_dock.visibilityChanged.connect(
             lambda vis: self.settings.setValue("left_dock_visible", vis)
@@ -85,8 +146,6 @@ class MainWindow(QMainWindow):
         self.right_dock = QDockWidget("Постинг отложки по дням", self)
         self.right_dock.setAllowedAreas(Qt.RightDockWidgetArea)
         self.right_dock.setFeatures(QDockWidget.NoDockWidgetFeatures)
-        self.right_panel = PostingsPanel(self.right_dock, storage=self.storage)
-        self.right_dock.setWidget(self.right_panel)
         self.addDockWidget(Qt.RightDockWidgetArea, self.right_dock)
         self.right_dock.visibilityChanged.connect(
             lambda vis: self.settings.setValue("right_dock_visible", vis)
@@ -98,8 +157,6 @@ class MainWindow(QMainWindow):
         self.bottom_dock = QDockWidget("Результаты / Статистика", self)
         self.bottom_dock.setAllowedAreas(Qt.BottomDockWidgetArea)
         self.bottom_dock.setFeatures(QDockWidget.NoDockWidgetFeatures)
-        self.stats_panel = StatsPanel(self.bottom_dock, storage=self.storage)
-        self.bottom_dock.setWidget(self.stats_panel)
         self.addDockWidget(Qt.BottomDockWidgetArea, self.bottom_dock)
         self.bottom_dock.visibilityChanged.connect(
             lambda vis: self.settings.setValue("bottom_dock_visible", vis)
@@ -223,48 +280,152 @@ class MainWindow(QMainWindow):
         self.left_dock.visibilityChanged.connect(self._place_controls)
         self.right_dock.visibilityChanged.connect(self._place_controls)
         self.bottom_dock.visibilityChanged.connect(self._place_controls)
+        for dock in (self.left_dock, self.right_dock, self.bottom_dock):
+            dock.visibilityChanged.connect(
+                lambda vis, d=dock: vis and self._ensure_panel(d)
+            )
 
         # Load saved data for current month/year
-        self.central.year.valueChanged.connect(self._load_panels)
-        self.central.month.currentIndexChanged.connect(self._load_panels)
-        self._load_panels()
+        self.scheduler.register("panels", lambda reasons: self._load_panels())
+        self.central.year.valueChanged.connect(
+            lambda _: self.scheduler.invalidate("panels", "month")
+        )
+        self.central.month.currentIndexChanged.connect(
+            lambda _: self.scheduler.invalidate("panels", "month")
+        )
+        self.scheduler.invalidate("panels", "month")
 
         # Status bar: stopwatch (left) and version (right)
         sb = QStatusBar(self)
         self.setStatusBar(sb)
-        self.timer_label = QLabel("00:00:00:00")
+        self.timer_label = StopwatchLabel()
         self.version_label = QLabel(f"v{get_version()}")
         sb.addWidget(self.timer_label)
         sb.addPermanentWidget(self.version_label)
 
-        self._secs = 0
-        self.timer = QTimer(self)
-        self.timer.timeout.connect(self._tick)
-        self.timer.start(1000)
+        # Counts only while the window is shown and not minimized
+        self.time_tracker = TimeTracker(self.storage, self.timer_label, self)
+        self.central.work_selected.connect(self.time_tracker.set_work)
+
+        # Rename/merge of a work over all months, from the grid's context menu
+        self.renamer = WorkRenamer(
+            self.storage, self.repository, self.central.search_index, self.postings_store
+        )
+        self.central.rename_requested.connect(self._rename_work)
+
+        # Undo/redo; line edits keep their own Ctrl+Z while they have focus
+        self.undo_action = QAction("Отменить", self)
+        self.undo_action.setShortcut(QKeySequence.Undo)
+        self.undo_action.triggered.connect(lambda: self._replay(self.undo_stack.undo))
+        self.redo_action = QAction("Повторить", self)
+        self.redo_action.setShortcuts([QKeySequence.Redo, QKeySequence("Ctrl+Shift+Z")])
+        self.redo_action.triggered.connect(lambda: self._replay(self.undo_stack.redo))
+        self.addActions([self.undo_action, self.redo_action])
+        self.undo_stack.subscribe(self._update_undo_actions)
+        self._update_undo_actions()
 
         # Menu
         self.menuBar().hide()
 
         # Apply initial prefs
-        self.apply_prefs()
+        with phase("apply_prefs"):
+            self.apply_prefs()
 
         # Restore geometry
-        geo = self.settings.value("geometry")
-        state = self.settings.value("windowState")
-        if geo:
-            self.restoreGeometry(geo)
-        if state:
-            self.restoreState(state)
+        with phase("restoreState"):
+            geo = self.settings.value("geometry")
+            state = self.settings.value("windowState")
+            if geo:
+                self.restoreGeometry(geo)
+            if state:
+                self.restoreState(state)
 
         self._place_controls()
 
-    def _tick(self):
-        self._secs += 1
-        d = self._secs // 86400
-        h = (self._secs % 86400) // 3600
-        m = (self._secs % 3600) // 60
-        s = self._secs % 60
-        self.timer_label.setText(f"{d:02d}:{h:02d}:{m:02d}:{s:02d}")
+    def _update_undo_actions(self):
+        self.undo_action.setEnabled(self.undo_stack.can_undo())
+        self.redo_action.setEnabled(self.undo_stack.can_redo())
+
+    def _replay(self, step):
+        """Run an undo/redo step and show the day it changed."""
+        command = step()
+        if command is not None:
+            self.central.jump_to(*command.where)
+
+    def _rename_work(self, old: str):
+        names = self.central.search_index.work_names()
+        new, ok = QInputDialog.getItem(
+            self,
+            "Переименовать работу",
+            f"Новое название для «{old}» (существующее — объединить):",
+            names,
+            names.index(old) if old in names else 0,
+            True,
+        )
+        new = new.strip()
+        if not ok or not new or new == old:
+            return
+        if new in names and QMessageBox.question(
+            self,
+            "Объединить работы",
+            f"Работа «{new}» уже есть. Объединить с ней «{old}» во всех месяцах?",
+        ) != QMessageBox.Yes:
+            return
+
+        # everything unsaved goes to disk first, the rewrite works on files
+        self.scheduler.flush()
+        self.time_tracker.pause()
+        for panel in (self.left_panel, self.right_panel):
+            if panel is not None:
+                panel.save_if_dirty()
+
+        dialog = QProgressDialog("Переименование работы…", "Отмена", 0, 0, self)
+        dialog.setWindowModality(Qt.WindowModal)
+        dialog.setMinimumDuration(300)
+
+        def progress(done: int, total: int) -> bool:
+            dialog.setMaximum(total)
+            dialog.setValue(done)
+            return not dialog.wasCanceled()
+
+        try:
+            files = self.renamer.rename(old, new, progress)
+        except RenameCancelled:
+            files = None
+            self.statusBar().showMessage("Переименование отменено", 5000)
+        except OSError as e:
+            files = None
+            QMessageBox.warning(self, "Переименование работы", f"Не удалось переименовать: {e}")
+        finally:
+            dialog.close()
+            self._update_stopwatch()
+        if files is not None:
+            self.time_tracker.rename_work(old, new)
+            self.statusBar().showMessage(f"«{old}» → «{new}»: файлов изменено: {len(files)}", 5000)
+        # the grid and the docks show re-read months either way; the undo
+        # history points at the works of the forgotten months
+        self.undo_stack.clear()
+        self.central.rebuild()
+        self.scheduler.invalidate("panels", "rename")
+
+    def _update_stopwatch(self):
+        if self.isVisible() and not self.isMinimized():
+            self.time_tracker.resume()
+        else:
+            self.time_tracker.pause()
+
+    def showEvent(self, e):
+        super().showEvent(e)
+        self._update_stopwatch()
+
+    def hideEvent(self, e):
+        super().hideEvent(e)
+        self._update_stopwatch()
+
+    def changeEvent(self, e):
+        super().changeEvent(e)
+        if e.type() == QEvent.WindowStateChange:
+            self._update_stopwatch()
 
     def toggle_left_dock(self):
         if self.left_dock.isVisible():
@@ -284,6 +445,41 @@ class MainWindow(QMainWindow):
         else:
             self.bottom_dock.show()
 
+    def _ensure_panel(self, dock: QDockWidget):
+        """Build the panel of ``dock`` if needed and load the current month."""
+        if dock.widget() is not None:
+            return
+        if dock is self.left_dock:
+            panel = self.left_panel = TopMonthPanel(
+                dock, storage=self.storage, repository=self.repository
+            )
+        elif dock is self.right_dock:
+            panel = self.right_panel = PostingsPanel(
+                dock, storage=self.storage, store=self.postings_store
+            )
+        else:
+            panel = self.stats_panel = StatsPanel(
+                dock, storage=self.storage, repository=self.repository
+            )
+        dock.setWidget(panel)
+        self._configure_panel(panel)
+        if self._panels_month is not None:
+            self._load_panel(panel, *self._panels_month)
+
+    def _panels(self) -> list:
+        """Return the dock panels that have been built so far."""
+        return [
+            p for p in (self.left_panel, self.right_panel, self.stats_panel)
+            if p is not None
+        ]
+
+    def _configure_panel(self, panel: QWidget):
+        panel.set_scale(self.prefs.get("central_scale", 100))
+        if panel is self.left_panel:
+            panel.set_edit_mode(self.prefs.get("left_edit_mode", False))
+        elif panel is self.right_panel:
+            panel.set_edit_mode(self.prefs.get("right_edit_mode", False))
+
     def _place_controls(self, *args):
         rect = self.rect()
         margin = 5
@@ -370,69 +566,85 @@ class MainWindow(QMainWindow):
         dlg.settings_applied.connect(on_apply)
         dlg.exec()
 
+    def _changed_groups(self) -> set[str]:
+        """Return the pref groups whose values differ from the last apply."""
+        keys = [k for k in PREF_GROUPS if self.prefs.get(k) != self._applied_prefs.get(k, _UNSET)]
+        self._applied_prefs.update({k: self.prefs.get(k) for k in keys})
+        return {PREF_GROUPS[k] for k in keys}
+
     def apply_prefs(self):
-        # Stylesheet / Theme
-        if self.prefs.get("theme", "dark") == "dark":
-            sheet = base_stylesheet(
-                accent=self.prefs["accent"],
-                neon_size=self.prefs["neon_size"],
-                neon_intensity=self.prefs["neon_intensity"],
+        """Reapply only the pref groups that changed since the last call."""
+        first = not self._applied_prefs
+        groups = self._changed_groups()
+
+        # Stylesheet / Theme (glass makes the containers transparent)
+        if groups & {"theme", "glass"}:
+            with phase("stylesheet"):
+                if self.prefs.get("theme", "dark") == "dark":
+                    sheet = base_stylesheet(
+                        accent=self.prefs["accent"],
+                        neon_size=self.prefs["neon_size"],
+                        neon_intensity=self.prefs["neon_intensity"],
+                    )
+                else:
+                    sheet = light_stylesheet(
+                        accent=self.prefs["accent"],
+                        neon_size=self.prefs["neon_size"],
+                        neon_intensity=self.prefs["neon_intensity"],
+                    )
+            if self.prefs.get("glass_enabled", False):
+                sheet += GLASS_STYLESHEET
+            if "theme" in groups and self.prefs.get("theme", "dark") != "dark":
+                self.setPalette(self.style().standardPalette())
+            if sheet != self.styleSheet():
+                self.setStyleSheet(sheet)
+                # Re-polish panels so dock contents pick up the accent
+                # focus/hover styles; nothing to re-polish on first apply
+                if not first:
+                    for w in (
+                        self.central,
+                        *self._panels(),
+                        self.left_dock,
+                        self.right_dock,
+                        self.bottom_dock,
+                    ):
+                        w.setStyleSheet("")
+            # Palette combo state
+            if hasattr(self, "palette_combo"):
+                idx = self.palette_combo.findData(self.prefs.get("palette", "cyan"))
+                if idx >= 0 and self.palette_combo.currentIndex() != idx:
+                    self.palette_combo.blockSignals(True)
+                    self.palette_combo.setCurrentIndex(idx)
+                    self.palette_combo.blockSignals(False)
+
+        # Glass backdrop is rendered per theme
+        if groups & {"theme", "glass"}:
+            apply_glass_effect(
+                self,
+                self.prefs.get("glass_enabled", False),
+                self.prefs.get("glass_opacity", 0.9),
+                self.prefs.get("glass_blur", 6),
+                self.prefs.get("glass_texture", 2),
+                self.prefs.get("glass_sharpness", 5),
             )
-        else:
-            sheet = light_stylesheet(
-                accent=self.prefs["accent"],
-                neon_size=self.prefs["neon_size"],
-                neon_intensity=self.prefs["neon_intensity"],
-            )
-            self.setPalette(self.style().standardPalette())
-        self.setStyleSheet(sheet)
-        # Re-polish panels so dock contents pick up the accent focus/hover styles
-        for w in (
-            self.central,
-            self.left_panel,
-            self.right_panel,
-            self.stats_panel,
-            self.left_dock,
-            self.right_dock,
-            self.bottom_dock,
-        ):
-            w.setStyleSheet("")
-
-        # Glass
-        apply_glass_effect(
-            self,
-            self.prefs.get("glass_enabled", False),
-            self.prefs.get("glass_opacity", 0.9),
-            self.prefs.get("glass_blur", 6),
-            self.prefs.get("glass_texture", 2),
-            self.prefs.get("glass_sharpness", 5),
-        )
         # Fonts
-        if self.prefs.get("title_font") or self.prefs.get("text_font"):
+        if "fonts" in groups and (self.prefs.get("title_font") or self.prefs.get("text_font")):
             f = self.font()
             if self.prefs.get("text_font"): f.setFamily(self.prefs.get("text_font"))
             self.setFont(f)
-        # Central scaling
-        scale = self.prefs.get("central_scale", 100)
-        self.central.set_scale(scale)
-        self.left_panel.set_scale(scale)
-        self.right_panel.set_scale(scale)
-        self.stats_panel.set_scale(scale)
-        self.central.set_rows_per_day(self.prefs.get("rows_per_day", 6))
-        self.central.set_scale_edit_mode(self.prefs.get("scale_edit_mode", False))
-        # Panel edit modes
-        self.left_panel.set_edit_mode(self.prefs.get("left_edit_mode", False))
-        self.right_panel.set_edit_mode(self.prefs.get("right_edit_mode", False))
+        # Central scaling, dock panels scale and edit modes
+        if "scale" in groups:
+            self.central.set_scale(self.prefs.get("central_scale", 100))
+            self.central.set_scale_edit_mode(self.prefs.get("scale_edit_mode", False))
+        if groups & {"scale", "edit"}:
+            for panel in self._panels():
+                self._configure_panel(panel)
+        if "rows" in groups:
+            self.central.set_rows_per_day(self.prefs.get("rows_per_day", 6))
         # Priority filter
-        filt = PriorityFilter(self.prefs.get("priority_filter", PriorityFilter.OneToFour))
-        self.central.set_priority_filter(filt)
-        # Palette combo state
-        if hasattr(self, "palette_combo"):
-            idx = self.palette_combo.findData(self.prefs.get("palette", "cyan"))
-            if idx >= 0 and self.palette_combo.currentIndex() != idx:
-                self.palette_combo.blockSignals(True)
-                self.palette_combo.setCurrentIndex(idx)
-                self.palette_combo.blockSignals(False)
+        if "filter" in groups:
+            filt = PriorityFilter(self.prefs.get("priority_filter", PriorityFilter.OneToFour))
+            self.central.set_priority_filter(filt)
 
     def closeEvent(self, e):
         self.settings.setValue("geometry", self.saveGeometry())
@@ -441,16 +653,22 @@ class MainWindow(QMainWindow):
         self.settings.setValue("right_dock_visible", self.right_dock.isVisible())
         self.settings.setValue("bottom_dock_visible", self.bottom_dock.isVisible())
 
-        # Persist panel data
+        # Persist panel data; only dirty months/panels are serialized and
+        # unchanged files are not rewritten
+        self.scheduler.flush()
+        self.time_tracker.pause()
         y = self.central.year.value()
         m = self.central.month.currentIndex() + 1
-        self.central.save_month()
-        self.left_panel.save_month(y, m)
-        self.right_panel.save_month(y, m)
-        self.storage.save_json(
-            f"{y}/stats_{m:02d}.json",
-            {"charts_visible": self.stats_panel.charts_frame.isVisible()},
-        )
+        self.repository.save_dirty()
+        if self.left_panel is not None:
+            self.left_panel.save_if_dirty()
+        if self.right_panel is not None:
+            self.right_panel.save_if_dirty()
+        if self.stats_panel is not None:
+            stats = self.storage.load_json(f"{y}/stats_{m:02d}.json", {}) or {}
+            stats["charts_visible"] = self.stats_panel.charts_visible()
+            self.storage.save_json(f"{y}/stats_{m:02d}.json", stats)
+        self.central.search_index.save()
 
         super().closeEvent(e)
 
@@ -458,11 +676,19 @@ class MainWindow(QMainWindow):
     def _load_panels(self):
         y = self.central.year.value()
         m = self.central.month.currentIndex() + 1
-        self.left_panel.load_month(self.central, y, m)
-        self.right_panel.load_month(y, m)
-        self.stats_panel.set_month(y, m)
-        self.stats_panel.load_year(y)
-        stats = self.storage.load_json(f"{y}/stats_{m:02d}.json", {})
-        vis = bool(stats.get("charts_visible"))
-        self.stats_panel.charts_frame.setVisible(vis)
-        self.stats_panel.toggle_btn.setText("Скрыть графики" if vis else "Показать графики")
+        self._panels_month = (y, m)
+        # hidden docks are loaded when they are first shown
+        with phase("_load_panels"):
+            for panel in self._panels():
+                self._load_panel(panel, y, m)
+
+    def _load_panel(self, panel: QWidget, y: int, m: int):
+        if panel is self.stats_panel:
+            panel.set_month(y, m)
+            panel.load_year(y)
+            stats = self.storage.load_json(f"{y}/stats_{m:02d}.json", {}) or {}
+            panel.set_charts_visible(bool(stats.get("charts_visible")))
+        else:
+            # keep unsaved dock edits of the previous month
+            panel.save_if_dirty()
+            panel.load_month(y, m)
@@ -0,0 +1,228 @@
+"""Shared in-memory month data.
+
+:class:`MonthRepository` owns the single parsed copy of every loaded month
+(``{day: [Work, ...]}``) and hands the same objects to all panels, so an
+edit made in one panel is immediately visible in the others and no panel
+can overwrite another's changes with a stale copy.  It is the only place
+that reads or writes the ``YYYY/MM.json`` month files.
+"""
+from __future__ import annotations
+
+from contextlib import contextmanager
+from dataclasses import dataclass, asdict
+from typing import Any, Dict, Iterator, List, Set, Tuple
+
+from .storage import Storage
+from .events import ADDED, DAY, MONTH, REMOVED, EventBus, WorkChange
+
+
+@dataclass(slots=True, eq=False)
+class Work:
+    """Single work entry of a day.
+
+    Works are compared by identity: the same title may appear several times
+    a day, and priority overrides key their timers by the work object.
+    """
+
+    name: str
+    plan: int = 0
+    done: int = 0
+    priority: int = 1
+    is_adult: bool = False
+    comment: str = ""
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    @staticmethod
+    def from_dict(data: dict) -> "Work":
+        return Work(
+            name=data.get("name", ""),
+            plan=int(data.get("plan", 0)),
+            done=int(data.get("done", 0)),
+            priority=int(data.get("priority", 1)),
+            is_adult=bool(data.get("is_adult", False)),
+            comment=data.get("comment", ""),
+        )
+
+
+MonthData = Dict[int, List[Work]]
+
+
+class MonthRepository:
+    """Cache of parsed months with per-day dirty tracking.
+
+    Edits should go through :meth:`set_field`, :meth:`add_work`,
+    :meth:`remove_work` and :meth:`move_work`, which mark the day dirty and
+    publish a :class:`~app.events.WorkChange` on :attr:`events`.  Inside
+    :meth:`batch` the per-edit changes are held back and one
+    :data:`~app.events.MONTH` change is published at the end.
+    """
+
+    def __init__(self, storage: Storage, events: EventBus | None = None):
+        self.storage = storage
+        self.events = events or EventBus()
+        self._months: Dict[Tuple[int, int], MonthData] = {}
+        self._dirty: Dict[Tuple[int, int], Set[int]] = {}
+        # serialized works per day as last saved/loaded; only dirty days
+        # are re-serialized on save
+        self._payload: Dict[Tuple[int, int], Dict[str, list]] = {}
+        # month -> [nesting depth, changes held back] of open batches
+        self._batches: Dict[Tuple[int, int], list] = {}
+
+    @staticmethod
+    def rel_path(year: int, month: int) -> str:
+        return f"{year}/{month:02d}.json"
+
+    # ------------------------------------------------------------------
+    def get(self, year: int, month: int) -> MonthData:
+        """Return the shared data of a month, parsing it on first access."""
+        key = (year, month)
+        data = self._months.get(key)
+        if data is None:
+            raw = self.storage.load_json(self.rel_path(year, month), {}) or {}
+            data = {
+                int(d): [Work.from_dict(w) for w in wl]
+                for d, wl in raw.items()
+            }
+            self._months[key] = data
+            self._payload[key] = {
+                str(day): [w.to_dict() for w in works if w.name]
+                for day, works in data.items()
+            }
+        return data
+
+    def is_loaded(self, year: int, month: int) -> bool:
+        return (year, month) in self._months
+
+    def forget(self, year: int, month: int) -> None:
+        """Drop the cached copy so the next :meth:`get` re-reads the file."""
+        self._months.pop((year, month), None)
+        self._dirty.pop((year, month), None)
+        self._payload.pop((year, month), None)
+
+    # ------------------------------------------------------------------
+    # edits
+    @contextmanager
+    def batch(self, year: int, month: int) -> Iterator[None]:
+        """Group edits of a month into a single :data:`~app.events.MONTH` change.
+
+        The change's ``new`` holds the grouped changes in order.
+        """
+        key = (year, month)
+        state = self._batches.setdefault(key, [0, []])
+        state[0] += 1
+        try:
+            yield
+        finally:
+            state[0] -= 1
+            if not state[0]:
+                del self._batches[key]
+                if state[1]:
+                    self.events.publish(
+                        WorkChange(year, month, 0, None, MONTH, None, tuple(state[1]))
+                    )
+
+    def _publish(self, change: WorkChange) -> None:
+        state = self._batches.get((change.year, change.month))
+        if state is not None:
+            state[1].append(change)
+        else:
+            self.events.publish(change)
+
+    def set_field(
+        self, year: int, month: int, day: int, work: Work, field: str, value: Any
+    ) -> bool:
+        """Set ``work.field`` to ``value``; return False when nothing changed."""
+        old = getattr(work, field)
+        if old == value:
+            return False
+        setattr(work, field, value)
+        self.mark_dirty(year, month, day)
+        self._publish(WorkChange(year, month, day, work, field, old, value))
+        return True
+
+    def note_change(
+        self, year: int, month: int, day: int, work: Work, field: str, old: Any
+    ) -> None:
+        """Record a change already applied to ``work`` by other means."""
+        new = getattr(work, field)
+        if old == new:
+            return
+        self.mark_dirty(year, month, day)
+        self._publish(WorkChange(year, month, day, work, field, old, new))
+
+    def add_work(
+        self, year: int, month: int, day: int, work: Work, index: int | None = None
+    ) -> None:
+        """Append ``work`` to ``day``, or insert it at ``index``."""
+        works = self.get(year, month).setdefault(day, [])
+        if index is None:
+            works.append(work)
+        else:
+            works.insert(index, work)
+        self.mark_dirty(year, month, day)
+        self._publish(WorkChange(year, month, day, work, ADDED))
+
+    def remove_work(self, year: int, month: int, day: int, work: Work) -> None:
+        """Remove ``work`` from ``day``; the change's ``old`` is its position."""
+        works = self.get(year, month).get(day, [])
+        index = works.index(work) if work in works else None
+        self._detach(self.get(year, month), day, work)
+        self.mark_dirty(year, month, day)
+        self._publish(WorkChange(year, month, day, work, REMOVED, index))
+
+    def move_work(self, year: int, month: int, day: int, new_day: int, work: Work) -> None:
+        data = self.get(year, month)
+        self._detach(data, day, work)
+        data.setdefault(new_day, []).append(work)
+        self.mark_dirty(year, month, day)
+        self.mark_dirty(year, month, new_day)
+        self._publish(WorkChange(year, month, new_day, work, DAY, day, new_day))
+
+    @staticmethod
+    def _detach(data: MonthData, day: int, work: Work) -> None:
+        works = data.get(day, [])
+        if work in works:
+            works.remove(work)
+        if not works:
+            data.pop(day, None)
+
+    # ------------------------------------------------------------------
+    def mark_dirty(self, year: int, month: int, day: int) -> None:
+        self._dirty.setdefault((year, month), set()).add(day)
+
+    def dirty_days(self, year: int, month: int) -> Set[int]:
+        return set(self._dirty.get((year, month), ()))
+
+    def is_dirty(self, year: int, month: int) -> bool:
+        return bool(self._dirty.get((year, month)))
+
+    def save(self, year: int, month: int) -> bool:
+        """Write a month with dirty days back to storage.
+
+        Only the dirty days are serialized again; clean days reuse their
+        cached payload.  Returns True when the file was actually written.
+        """
+        key = (year, month)
+        data = self._months.get(key)
+        dirty = self._dirty.pop(key, None)
+        if data is None or not dirty:
+            return False
+        cache = self._payload.setdefault(key, {})
+        for day in dirty:
+            works = [w.to_dict() for w in data.get(day, ()) if w.name]
+            if works:
+                cache[str(day)] = works
+            else:
+                cache.pop(str(day), None)
+        payload = {k: cache[k] for k in sorted(cache, key=int)}
+        return self.storage.save_json(self.rel_path(year, month), payload)
+
+    def save_dirty(self) -> None:
+        """Save every month that has unsaved edits."""
+        for year, month in list(self._dirty):
+            self.save(year, month)
+
+
+__all__ = ["Work", "MonthData", "MonthRepository"]
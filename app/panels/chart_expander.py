@@ -0,0 +1,229 @@
+"""Collapsible line chart used by the stats panel.
+
+Kept in its own module so that ``PySide6.QtCharts`` is only imported when
+the charts are first shown.
+
+The chart, its axes and one :class:`QLineSeries` per line are created once
+and updated with bulk :meth:`QXYSeries.replace` calls.  Long lines are
+downsampled with LTTB (largest triangle three buckets) to roughly one point
+per horizontal pixel of the plot area, and clicking a legend entry toggles
+its line without rebuilding anything.
+"""
+
+from __future__ import annotations
+
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple
+
+from PySide6.QtCharts import QChart, QChartView, QLineSeries, QValueAxis
+from PySide6.QtCore import QPointF, Qt
+from PySide6.QtGui import QColor, QPainter
+from PySide6.QtWidgets import QToolButton, QVBoxLayout, QWidget
+
+Point = Tuple[float, float]
+
+# The legend (and toggling lines by clicking it) is shown up to this many
+# lines; beyond that it costs more layout time than it helps
+LEGEND_LIMIT = 30
+
+
+def downsample_lttb(points: Sequence[Point], threshold: int) -> List[Point]:
+    """Reduce ``points`` (sorted by x) to ``threshold`` points with LTTB."""
+    n = len(points)
+    if threshold >= n or threshold < 3:
+        return list(points)
+    sampled = [points[0]]
+    every = (n - 2) / (threshold - 2)
+    a = 0
+    for i in range(threshold - 2):
+        # average of the next bucket is the third triangle vertex
+        start = int((i + 1) * every) + 1
+        end = min(int((i + 2) * every) + 1, n)
+        span = end - start or 1
+        avg_x = sum(p[0] for p in points[start:end]) / span
+        avg_y = sum(p[1] for p in points[start:end]) / span
+        # pick the point of the current bucket with the largest triangle
+        lo = int(i * every) + 1
+        hi = int((i + 1) * every) + 1
+        ax, ay = points[a]
+        best, best_area = lo, -1.0
+        for j in range(lo, hi):
+            x, y = points[j]
+            area = abs((ax - avg_x) * (y - ay) - (ax - x) * (avg_y - ay))
+            if area > best_area:
+                best, best_area = j, area
+        sampled.append(points[best])
+        a = best
+    sampled.append(points[-1])
+    return sampled
+
+
+class ChartExpander(QWidget):
+    """Collapsible section containing a line chart."""
+
+    def __init__(self, title: str, parent: Optional[QWidget] = None):
+        super().__init__(parent)
+        lay = QVBoxLayout(self)
+        self.toggle_btn = QToolButton(text=title, checkable=True, checked=False)
+        self.toggle_btn.setToolButtonStyle(Qt.ToolButtonTextBesideIcon)
+        self.toggle_btn.setArrowType(Qt.RightArrow)
+        lay.addWidget(self.toggle_btn)
+
+        self.chart = QChart()
+        self.axis_x = QValueAxis()
+        self.axis_y = QValueAxis()
+        self.axis_x.setLabelFormat("%d")
+        self.chart.addAxis(self.axis_x, Qt.AlignBottom)
+        self.chart.addAxis(self.axis_y, Qt.AlignLeft)
+        self.chart.legend().setAlignment(Qt.AlignRight)
+        self.view = QChartView(self.chart, self)
+        self.view.setRenderHint(QPainter.Antialiasing, False)
+        self.view.setVisible(False)
+        self.view.resizeEvent = self._on_view_resized
+        lay.addWidget(self.view)
+
+        # raw points per line; series are kept across updates
+        self._data: Dict[str, List[Point]] = {}
+        # (min x, max x, min y, max y) per line for the axis ranges
+        self._bounds: Dict[str, Tuple[float, float, float, float]] = {}
+        self._series: Dict[str, QLineSeries] = {}
+        self._hidden: set[str] = set()
+        # axis ranges last set, (min x, max x, min y, max y)
+        self._ranges: Optional[Tuple[float, float, float, float]] = None
+        self._sampled_width = 0
+        self._stale = False
+
+        self.toggle_btn.clicked.connect(self._on_toggled)
+
+    def _on_toggled(self, checked: bool):
+        self.view.setVisible(checked)
+        self.toggle_btn.setArrowType(Qt.DownArrow if checked else Qt.RightArrow)
+        if checked and self._stale:
+            self._apply()
+
+    # ------------------------------------------------------------------
+    def set_series(self, values: List[int]):
+        """Show a single line of ``values`` for x = 1, 2, ..."""
+        self.set_lines({self.toggle_btn.text(): [(i, v) for i, v in enumerate(values, start=1)]})
+        self.chart.legend().setVisible(False)
+
+    def set_lines(
+        self,
+        lines: Mapping[str, Sequence[Point]],
+        colors: Optional[Mapping[str, QColor]] = None,
+    ):
+        """Replace the data of all lines; series of unchanged names are reused."""
+        self.chart.legend().setVisible(len(lines) <= LEGEND_LIMIT)
+        for name in [n for n in self._series if n not in lines]:
+            self.chart.removeSeries(self._series.pop(name))
+            self._hidden.discard(name)
+        for name in lines:
+            series = self._series.get(name)
+            if series is None:
+                series = self._series[name] = QLineSeries()
+                series.setName(name)
+                self.chart.addSeries(series)
+                series.attachAxis(self.axis_x)
+                series.attachAxis(self.axis_y)
+                self._connect_marker(series)
+            if colors and name in colors:
+                series.setColor(colors[name])
+        self._data = {name: list(points) for name, points in lines.items()}
+        self._bounds = {
+            name: (
+                points[0][0],
+                points[-1][0],
+                min(p[1] for p in points),
+                max(p[1] for p in points),
+            )
+            for name, points in self._data.items()
+            if points
+        }
+        if self.view.isVisible():
+            self._apply()
+        else:
+            self._stale = True
+
+    def set_line_visible(self, name: str, visible: bool):
+        series = self._series.get(name)
+        if series is None:
+            return
+        if visible:
+            self._hidden.discard(name)
+        else:
+            self._hidden.add(name)
+        series.setVisible(visible)
+        self._update_markers(series)
+        if self._sets_bound(name, visible):
+            self._update_ranges()
+
+    def set_line_color(self, name: str, color: QColor):
+        series = self._series.get(name)
+        if series is not None:
+            series.setColor(color)
+
+    def line_names(self) -> List[str]:
+        return list(self._series)
+
+    # ------------------------------------------------------------------
+    def _plot_width(self) -> int:
+        return max(int(self.chart.plotArea().width()), self.view.width() // 2, 50)
+
+    def _apply(self):
+        """Push the (downsampled) data into the series."""
+        self._stale = False
+        width = self._plot_width()
+        self._sampled_width = width
+        for name, points in self._data.items():
+            sampled = downsample_lttb(points, width)
+            self._series[name].replace([QPointF(x, y) for x, y in sampled])
+            self._series[name].setVisible(name not in self._hidden)
+        self._update_ranges()
+
+    def _sets_bound(self, name: str, visible: bool) -> bool:
+        """Whether toggling line ``name`` can move an axis range.
+
+        Rescaling re-maps every series, so a line lying inside the ranges
+        of the others is shown or hidden without touching the axes.
+        """
+        b = self._bounds.get(name)
+        if b is None or self._ranges is None:
+            return b is not None
+        x0, x1, low, high = self._ranges
+        if visible:
+            return b[0] < x0 or b[1] > x1 or b[2] < low or b[3] > high
+        return b[0] <= x0 or b[1] >= x1 or b[2] <= low or b[3] >= high
+
+    def _update_ranges(self):
+        bounds = [b for name, b in self._bounds.items() if name not in self._hidden]
+        if not bounds:
+            return
+        x0 = min(b[0] for b in bounds)
+        x1 = max(b[1] for b in bounds)
+        low = min(0, min(b[2] for b in bounds))
+        high = max(b[3] for b in bounds)
+        ranges = (x0, x1 if x1 > x0 else x0 + 1, low, high if high > low else low + 1)
+        if ranges == self._ranges:
+            return
+        self._ranges = ranges
+        self.axis_x.setRange(ranges[0], ranges[1])
+        self.axis_y.setRange(ranges[2], ranges[3])
+
+    def _on_view_resized(self, event):
+        QChartView.resizeEvent(self.view, event)
+        # resample only when the width changed noticeably
+        if self._data and abs(self._plot_width() - self._sampled_width) > 32:
+            self._apply()
+
+    def _connect_marker(self, series: QLineSeries):
+        for marker in self.chart.legend().markers(series):
+            marker.clicked.connect(
+                lambda s=series: self.set_line_visible(s.name(), not s.isVisible())
+            )
+
+    def _update_markers(self, series: QLineSeries):
+        # keep hidden lines in the legend, dimmed
+        for marker in self.chart.legend().markers(series):
+            color = marker.labelBrush().color()
+            color.setAlphaF(1.0 if series.isVisible() else 0.4)
+            marker.setLabelBrush(color)
+            marker.setVisible(True)
@@ -1,22 +1,41 @@
 """Panel displaying delayed postings per day.
 
-This panel keeps a simple table of upcoming chapter postings for works. Each
-record contains a date, work title, chapter title and a priority which is
-visualised by a coloured marker. Data is persisted via :class:`Storage` per
-month/year similarly to other panels.
+This panel keeps a table of upcoming chapter postings for works. A day can
+hold several records, each with a time/note, work title, chapter title and
+a priority which is visualised by a coloured marker. Data is persisted via
+:class:`PostingsStore` per month/year similarly to other panels.
+
+Below the table an "upcoming" list shows the postings of the next days
+across month boundaries. It is driven by the store's date index and fetches
+rows in batches as it is scrolled, so only the months of the visible dates
+are read.
+
+Recurring rules (:class:`~app.posting_rules.PostingRule`) are expanded for
+the shown month only; their rows are read-only and greyed, and a single
+occurrence can be skipped from the context menu.
 """
 
 import calendar
-from dataclasses import dataclass, asdict
+from datetime import date, timedelta
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import List, Optional, Tuple
 
-from PySide6.QtCore import Qt
+from PySide6.QtCore import Qt, QAbstractListModel, QDate, QModelIndex
 from PySide6.QtGui import QColor
 from PySide6.QtWidgets import (
     QWidget,
     QVBoxLayout,
+    QHBoxLayout,
     QLabel,
+    QListView,
+    QSpinBox,
+    QCheckBox,
+    QDateEdit,
+    QDialog,
+    QDialogButtonBox,
+    QFormLayout,
+    QLineEdit,
+    QPushButton,
     QTableWidget,
     QTableWidgetItem,
     QInputDialog,
@@ -24,50 +43,197 @@ from PySide6.QtWidgets import (
 )
 
 from ..storage import Storage
+from ..postings_store import Posting, PostingsStore
+from ..posting_rules import PostingRule, WEEKDAY_NAMES
 from ..priority_service import color_for, PriorityLevel, PRIORITY_DESCRIPTIONS
 
+# Upcoming rows are fetched this many dates at a time
+UPCOMING_BATCH = 20
+# day item role holding the id of the rule a row was expanded from
+RULE_ROLE = Qt.UserRole + 1
+RULE_ROW_COLOR = "#808080"
+
+
+class UpcomingModel(QAbstractListModel):
+    """Postings from a start date on, fetched lazily from the date index."""
+
+    def __init__(self, store: PostingsStore, parent=None):
+        super().__init__(parent)
+        self.store = store
+        self._rows: List[Tuple[date, Posting]] = []
+        # next date with postings that is not fetched yet
+        self._next: Optional[date] = None
+        self._end: Optional[date] = None
+
+    def set_range(self, start: date, end: Optional[date] = None):
+        """Show postings with ``start <= date < end`` (no end: all further)."""
+        self.beginResetModel()
+        self.store.refresh_index()
+        self._rows = []
+        self._next = self.store.next_date(start)
+        self._end = end
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def canFetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return False
+        return self._next is not None and (self._end is None or self._next < self._end)
+
+    def fetchMore(self, parent=QModelIndex()):
+        rows: List[Tuple[date, Posting]] = []
+        for _ in range(UPCOMING_BATCH):
+            if not self.canFetchMore():
+                break
+            day = self._next
+            rows.extend((day, p) for p in self.store.postings_on(day))
+            self._next = self.store.next_date(day + timedelta(days=1))
+        if not rows:
+            return
+        first = len(self._rows)
+        self.beginInsertRows(QModelIndex(), first, first + len(rows) - 1)
+        self._rows.extend(rows)
+        self.endInsertRows()
 
-@dataclass
-class Posting:
-    """Single postponed posting entry."""
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        day, p = self._rows[index.row()]
+        if role == Qt.DisplayRole:
+            when = f"{day:%d.%m.%Y}" + (f" {p.date}" if p.date else "")
+            return f"{when}  {p.work} — {p.chapter}"
+        if role == Qt.ForegroundRole and p.priority:
+            return QColor(color_for(p.priority))
+        return None
 
-    date: str = ""
-    work: str = ""
-    chapter: str = ""
-    priority: int = 1
 
-    def to_dict(self) -> dict:
-        return asdict(self)
+class RuleDialog(QDialog):
+    """Form for a new recurring posting rule."""
 
-    @staticmethod
-    def from_dict(data: dict) -> "Posting":
-        return Posting(
-            date=data.get("date", ""),
-            work=data.get("work", ""),
-            chapter=data.get("chapter", ""),
-            priority=int(data.get("priority", 1)),
+    def __init__(self, parent=None, work: str = ""):
+        super().__init__(parent)
+        self.setWindowTitle("Правило постинга")
+        form = QFormLayout(self)
+        self.work_edit = QLineEdit(work, self)
+        form.addRow("Работа", self.work_edit)
+        days = QWidget(self)
+        days_lay = QHBoxLayout(days)
+        days_lay.setContentsMargins(0, 0, 0, 0)
+        self.weekday_checks = []
+        for name in WEEKDAY_NAMES:
+            check = QCheckBox(name, days)
+            days_lay.addWidget(check)
+            self.weekday_checks.append(check)
+        form.addRow("Дни недели", days)
+        self.start_edit = QDateEdit(QDate.currentDate(), self)
+        self.start_edit.setCalendarPopup(True)
+        form.addRow("Начало", self.start_edit)
+        self.first_edit = QSpinBox(self)
+        self.first_edit.setRange(0, 100000)
+        self.first_edit.setValue(1)
+        form.addRow("Первая глава", self.first_edit)
+        self.until_chapter_edit = QSpinBox(self)
+        self.until_chapter_edit.setRange(0, 100000)
+        self.until_chapter_edit.setSpecialValueText("нет")
+        form.addRow("До главы", self.until_chapter_edit)
+        # the minimum date stands for "no end date"
+        self.until_edit = QDateEdit(self)
+        self.until_edit.setCalendarPopup(True)
+        self.until_edit.setMinimumDate(QDate(2000, 1, 1))
+        self.until_edit.setSpecialValueText("нет")
+        self.until_edit.setDate(self.until_edit.minimumDate())
+        form.addRow("До даты", self.until_edit)
+        self.format_edit = QLineEdit("Глава {n}", self)
+        form.addRow("Название главы", self.format_edit)
+        self.time_edit = QLineEdit(self)
+        form.addRow("Время", self.time_edit)
+        self.priority_edit = QSpinBox(self)
+        self.priority_edit.setRange(1, 4)
+        form.addRow("Приоритет", self.priority_edit)
+        buttons = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel, self)
+        buttons.accepted.connect(self.accept)
+        buttons.rejected.connect(self.reject)
+        form.addRow(buttons)
+
+    def rule(self) -> PostingRule:
+        until = self.until_edit.date()
+        return PostingRule(
+            work=self.work_edit.text().strip(),
+            weekdays=[i for i, c in enumerate(self.weekday_checks) if c.isChecked()],
+            start=self.start_edit.date().toString(Qt.ISODate),
+            first_chapter=self.first_edit.value(),
+            until_chapter=self.until_chapter_edit.value(),
+            until="" if until == self.until_edit.minimumDate() else until.toString(Qt.ISODate),
+            chapter_format=self.format_edit.text() or "Глава {n}",
+            time=self.time_edit.text(),
+            priority=self.priority_edit.value(),
         )
 
+
 class PostingsPanel(QWidget):
     """Table based panel with editable postings."""
 
-    def __init__(self, parent=None, storage: Optional[Storage] = None):
+    PRIORITY_COLUMN = 4
+
+    def __init__(
+        self,
+        parent=None,
+        storage: Optional[Storage] = None,
+        store: Optional[PostingsStore] = None,
+    ):
         super().__init__(parent)
         self.edit_mode = False
         self.scale_percent = 100
         self.storage = storage or Storage(Path("data"))
+        self.store = store or PostingsStore(self.storage)
 
         lay = QVBoxLayout(self)
         lay.addWidget(QLabel("Постинг отложки по дням"))
 
-        self.table = QTableWidget(0, 4, self)
-        self.table.setHorizontalHeaderLabels(["Дата", "Работа", "Глава", "Приор."])
+        self.table = QTableWidget(0, 5, self)
+        self.table.setHorizontalHeaderLabels(["День", "Время", "Работа", "Глава", "Приор."])
         lay.addWidget(self.table)
+        self.rule_btn = QPushButton("Добавить правило…", self)
+        self.rule_btn.clicked.connect(self._on_add_rule)
+        lay.addWidget(self.rule_btn)
+
+        head = QHBoxLayout()
+        head.addWidget(QLabel("Ближайшие дни:"))
+        self.upcoming_days = QSpinBox(self)
+        self.upcoming_days.setRange(0, 365)
+        self.upcoming_days.setValue(14)
+        self.upcoming_days.setSpecialValueText("все")
+        head.addWidget(self.upcoming_days)
+        head.addStretch(1)
+        lay.addLayout(head)
+        self.upcoming_model = UpcomingModel(self.store, self)
+        self.upcoming = QListView(self)
+        self.upcoming.setModel(self.upcoming_model)
+        self.upcoming.setUniformItemSizes(True)
+        self.upcoming.setEditTriggers(QListView.NoEditTriggers)
+        lay.addWidget(self.upcoming)
+        self.upcoming_days.valueChanged.connect(lambda _: self.refresh_upcoming())
+
+        # dirty tracking: saves are skipped while nothing changed
+        self.dirty = False
+        self._loaded: tuple[int, int] = (0, 0)
+        self.table.itemChanged.connect(self._mark_dirty)
 
         self.table.cellDoubleClicked.connect(self._on_cell_double_clicked)
         self.table.setContextMenuPolicy(Qt.CustomContextMenu)
         self.table.customContextMenuRequested.connect(self._on_table_menu)
 
+    def _mark_dirty(self, *args):
+        self.dirty = True
+
+    def refresh_upcoming(self):
+        """Show postings from today for the chosen number of days."""
+        start = date.today()
+        days = self.upcoming_days.value()
+        self.upcoming_model.set_range(start, start + timedelta(days=days) if days else None)
+
     # ------------------------------------------------------------------
     # helpers / UI
     def set_edit_mode(self, enabled: bool):
@@ -82,8 +248,7 @@ class PostingsPanel(QWidget):
         f = self.font()
         f.setPointSize(int(12 * self.scale_percent / 100))
         self.setFont(f)
-        for r in range(self.table.rowCount()):
-            self.table.setRowHeight(r, int(24 * self.scale_percent / 100))
+        self.table.verticalHeader().setDefaultSectionSize(int(24 * self.scale_percent / 100))
 
     def _priority_color(self, p: int) -> str:
         return color_for(p)
@@ -95,72 +260,196 @@ class PostingsPanel(QWidget):
             self.table.setItem(row, col, item)
         item.setText(text)
 
+    def _set_day(self, row: int, day: int):
+        item = QTableWidgetItem(str(day))
+        item.setData(Qt.UserRole, day)
+        item.setFlags(item.flags() & ~Qt.ItemIsEditable)
+        self.table.setItem(row, 0, item)
+
     def _set_priority(self, row: int, p: int):
-        item = self.table.item(row, 3)
+        item = self.table.item(row, self.PRIORITY_COLUMN)
         if not item:
             item = QTableWidgetItem()
-            self.table.setItem(row, 3, item)
+            self.table.setItem(row, self.PRIORITY_COLUMN, item)
         item.setData(Qt.UserRole, p)
         item.setText("●" if p else "")
         item.setTextAlignment(Qt.AlignCenter)
         item.setForeground(QColor(self._priority_color(p)))
-        desc = PRIORITY_DESCRIPTIONS.get(PriorityLevel(p), "")
+        desc = PRIORITY_DESCRIPTIONS.get(PriorityLevel(p), "") if p else ""
         if desc:
             item.setToolTip(f"{p} — {desc}")
 
+    def _set_posting(self, row: int, day: int, p: Optional[Posting]):
+        self._set_day(row, day)
+        if p is None:
+            return
+        self._set_text(row, 1, p.date)
+        self._set_text(row, 2, p.work)
+        self._set_text(row, 3, p.chapter)
+        self._set_priority(row, p.priority)
+        if p.rule:
+            rule = self.store.rule(p.rule)
+            self.table.item(row, 0).setData(RULE_ROLE, p.rule)
+            for col in range(self.table.columnCount()):
+                item = self.table.item(row, col)
+                item.setFlags(item.flags() & ~Qt.ItemIsEditable)
+                if col != self.PRIORITY_COLUMN:
+                    item.setForeground(QColor(RULE_ROW_COLOR))
+                if rule is not None:
+                    item.setToolTip(rule.describe())
+
+    def _rule_of(self, row: int) -> str:
+        return self.table.item(row, 0).data(RULE_ROLE) or ""
+
     def _on_cell_double_clicked(self, row: int, col: int):
-        if not self.edit_mode:
+        if not self.edit_mode or col == 0 or self._rule_of(row):
             return
-        if col == 3:
+        if col == self.PRIORITY_COLUMN:
             item = self.table.item(row, col)
             current = item.data(Qt.UserRole) if item else 0
-            p, ok = QInputDialog.getInt(self, "Приоритет", "Приоритет (1-4)", int(current), 1, 4)
+            p, ok = QInputDialog.getInt(
+                self, "Приоритет", "Приоритет (1-4)", max(1, int(current or 1)), 1, 4
+            )
             if ok:
                 self._set_priority(row, p)
         else:
-            self.table.editItem(self.table.item(row, col))
+            item = self.table.item(row, col)
+            if item is None:
+                self._set_text(row, col, "")
+                item = self.table.item(row, col)
+            self.table.editItem(item)
 
     def _on_table_menu(self, pos):
         idx = self.table.indexAt(pos)
-        if not idx.isValid() or idx.column() != 3:
+        if not idx.isValid():
             return
         row = idx.row()
         menu = QMenu(self.table)
-        for lvl in PriorityLevel:
-            act = menu.addAction(f"{int(lvl)}")
-            act.setData(int(lvl))
+        rule_id = self._rule_of(row)
+        if rule_id:
+            skip = menu.addAction("Пропустить этот день")
+            remove = menu.addAction("Удалить правило")
+            chosen = menu.exec(self.table.mapToGlobal(pos))
+            if chosen is skip:
+                year, month = self._loaded
+                day = self.table.item(row, 0).data(Qt.UserRole)
+                self.store.add_exception(rule_id, date(year, month, day))
+            elif chosen is remove:
+                self.store.remove_rule(rule_id)
+            if chosen is not None:
+                self._reload_rules()
+            return
+        if idx.column() == self.PRIORITY_COLUMN:
+            for lvl in PriorityLevel:
+                act = menu.addAction(f"{int(lvl)}")
+                act.setData(int(lvl))
+            chosen = menu.exec(self.table.mapToGlobal(pos))
+            if chosen:
+                self._set_priority(row, int(chosen.data()))
+            return
+        add = menu.addAction("Добавить запись на этот день")
+        remove = menu.addAction("Удалить запись")
         chosen = menu.exec(self.table.mapToGlobal(pos))
-        if chosen:
-            p = int(chosen.data())
-            self._set_priority(row, p)
+        if chosen is add:
+            self.add_entry(row)
+        elif chosen is remove:
+            self.remove_entry(row)
+
+    def _on_add_rule(self):
+        dlg = RuleDialog(self)
+        if dlg.exec() != QDialog.Accepted:
+            return
+        rule = dlg.rule()
+        if not rule.work or not rule.weekdays:
+            return
+        self.store.add_rule(rule)
+        self._reload_rules()
+
+    def _reload_rules(self):
+        """Show changed rules, keeping unsaved edits of the stored rows."""
+        if not self._loaded[0]:
+            return
+        dirty = self.dirty
+        edited = self.collect_month()
+        self._fill(*self._loaded, edited)
+        self.dirty = dirty
+        self.refresh_upcoming()
+
+    def add_entry(self, row: int) -> int:
+        """Insert an empty record for the day of ``row`` below it."""
+        day = self.table.item(row, 0).data(Qt.UserRole)
+        # stored rows come before the rule rows of a day
+        while row > 0 and self._rule_of(row):
+            row -= 1
+        self.table.insertRow(row + 1)
+        self._set_day(row + 1, day)
+        self.dirty = True
+        return row + 1
+
+    def remove_entry(self, row: int):
+        """Remove a record; the last row of a day is only cleared."""
+        day = self.table.item(row, 0).data(Qt.UserRole)
+        same_day = [
+            r
+            for r in range(self.table.rowCount())
+            if self.table.item(r, 0).data(Qt.UserRole) == day and not self._rule_of(r)
+        ]
+        if len(same_day) > 1:
+            self.table.removeRow(row)
+        else:
+            for col in range(1, self.table.columnCount()):
+                self.table.takeItem(row, col)
+        self.dirty = True
 
     # ------------------------------------------------------------------
     # persistence
     def load_month(self, year: int, month: int):
+        self._fill(year, month, self.store.month(year, month))
+        self._loaded = (year, month)
+        self.dirty = False
+        self.refresh_upcoming()
+
+    def _fill(self, year: int, month: int, data):
         days = calendar.monthrange(year, month)[1]
-        data = self.storage.load_json(f"{year}/postings_{month:02d}.json", {}) or {}
-        self.table.setRowCount(days)
-        for day in range(1, days + 1):
-            row = day - 1
-            entry = data.get(str(day))
-            if isinstance(entry, dict):
-                p = Posting.from_dict(entry)
-                self._set_text(row, 0, p.date)
-                self._set_text(row, 1, p.work)
-                self._set_text(row, 2, p.chapter)
-                self._set_priority(row, p.priority)
+        expanded = self.store.rule_postings(year, month)
+        # every day has at least one (possibly empty) row to type into,
+        # followed by the postings of recurring rules
+        rows = [
+            (day, p)
+            for day in range(1, days + 1)
+            for p in (data.get(day) or [None]) + expanded.get(day, [])
+        ]
+        self.table.blockSignals(True)
+        self.table.clearContents()
+        self.table.setRowCount(len(rows))
+        for row, (day, p) in enumerate(rows):
+            self._set_posting(row, day, p)
+        self.table.blockSignals(False)
         self.set_scale(self.scale_percent)
 
-    def save_month(self, year: int, month: int):
-        days = self.table.rowCount()
-        data: Dict[str, dict] = {}
-        for day in range(1, days + 1):
-            r = day - 1
-            date = self.table.item(r, 0).text() if self.table.item(r, 0) else ""
-            work = self.table.item(r, 1).text() if self.table.item(r, 1) else ""
-            chap = self.table.item(r, 2).text() if self.table.item(r, 2) else ""
-            pr_item = self.table.item(r, 3)
+    def collect_month(self):
+        """Return ``{day: [Posting]}`` of the stored (non-rule) rows."""
+        data = {}
+        for r in range(self.table.rowCount()):
+            if self._rule_of(r):
+                continue
+            day = self.table.item(r, 0).data(Qt.UserRole)
+            texts = [self.table.item(r, c).text() if self.table.item(r, c) else "" for c in (1, 2, 3)]
+            pr_item = self.table.item(r, self.PRIORITY_COLUMN)
             priority = pr_item.data(Qt.UserRole) if pr_item else 0
-            if any([date, work, chap, priority]):
-                data[str(day)] = Posting(date, work, chap, priority).to_dict()
-        self.storage.save_json(f"{year}/postings_{month:02d}.json", data)
+            if any(texts) or priority:
+                data.setdefault(day, []).append(Posting(*texts, priority or 0))
+        return data
+
+    def save_month(self, year: int, month: int):
+        self.store.save_month(year, month, self.collect_month())
+        if (year, month) == self._loaded:
+            self.dirty = False
+        self.refresh_upcoming()
+
+    def save_if_dirty(self) -> bool:
+        """Save the loaded month only if something changed since load/save."""
+        if not self.dirty or not self._loaded[0]:
+            return False
+        self.save_month(*self._loaded)
+        return True
@@ -2,11 +2,11 @@
 
 from __future__ import annotations
 
+from collections import Counter
 from pathlib import Path
-from typing import Dict, List, Optional
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Dict, List, Optional, Set, Tuple
 
-from PySide6.QtCharts import QChart, QChartView, QLineSeries
-from PySide6.QtCore import QPointF, Qt
 from PySide6.QtWidgets import (
     QFrame,
     QGroupBox,
@@ -14,44 +14,26 @@ from PySide6.QtWidgets import (
     QPushButton,
     QTableWidget,
     QTableWidgetItem,
-    QToolButton,
     QVBoxLayout,
     QWidget,
 )
 
 from ..storage import Storage
+from ..month_repository import MonthRepository
+from ..events import ADDED, MONTH, REMOVED, WorkChange
 
+if TYPE_CHECKING:
+    from .chart_expander import ChartExpander
+    from .work_charts import WorkChartsWidget
 
-class ChartExpander(QWidget):
-    """Collapsible section containing a line chart."""
 
-    def __init__(self, title: str, parent: Optional[QWidget] = None):
-        super().__init__(parent)
-        lay = QVBoxLayout(self)
-        self.toggle_btn = QToolButton(text=title, checkable=True, checked=False)
-        self.toggle_btn.setToolButtonStyle(Qt.ToolButtonTextBesideIcon)
-        self.toggle_btn.setArrowType(Qt.RightArrow)
-        lay.addWidget(self.toggle_btn)
-
-        self.view = QChartView(QChart(), self)
-        self.view.setVisible(False)
-        lay.addWidget(self.view)
-
-        self.toggle_btn.clicked.connect(self._on_toggled)
+@dataclass
+class YearStats:
+    """Parsed ``stats_MM.json`` files of a year and their file versions."""
 
-    def _on_toggled(self, checked: bool):
-        self.view.setVisible(checked)
-        self.toggle_btn.setArrowType(Qt.DownArrow if checked else Qt.RightArrow)
-
-    # ------------------------------------------------------------------
-    def set_series(self, values: List[int]):
-        chart = QChart()
-        series = QLineSeries()
-        for i, v in enumerate(values, start=1):
-            series.append(QPointF(i, v))
-        chart.addSeries(series)
-        chart.createDefaultAxes()
-        self.view.setChart(chart)
+    versions: List[Optional[Tuple[int, int]]]
+    months: List[dict]
+    soft: Dict[str, Dict[str, float]]
 
 
 class StatsPanel(QWidget):
@@ -73,12 +55,33 @@ class StatsPanel(QWidget):
         "Чистыми",
     ]
 
-    def __init__(self, parent: Optional[QWidget] = None, storage: Optional[Storage] = None):
+    # Metrics derived live from the current month's works
+    WORKS_ROW = METRICS.index("Работ")
+    CHAPTERS_ROW = METRICS.index("Глав")
+
+    CHARTS = ["Профит", "Просмотры"]
+
+    def __init__(
+        self,
+        parent: Optional[QWidget] = None,
+        storage: Optional[Storage] = None,
+        repository: Optional[MonthRepository] = None,
+    ):
         super().__init__(parent)
         self.storage = storage or Storage(Path("data"))
+        self.repository = repository
         self.current_year = 0
         self.current_month = 0
         self.scale_percent = 100
+        # running aggregates of the current month, updated per change event
+        self._names: Counter = Counter()
+        self._done = 0
+        # parsed years; the year on screen and its live (current month) column
+        self._years: Dict[int, YearStats] = {}
+        self._shown_year = 0
+        self._live_col: Optional[int] = None
+        if self.repository is not None:
+            self.repository.events.subscribe(self._on_work_changed)
 
         lay = QVBoxLayout(self)
         lay.addWidget(QLabel("Результаты / Статистика"))
@@ -124,13 +127,10 @@ class StatsPanel(QWidget):
 
         self.toggle_btn.clicked.connect(self.toggle_charts)
 
-        charts_lay = QVBoxLayout(self.charts_frame)
+        # Chart sections (and QtCharts itself) are created on first show
         self.chart_sections: Dict[str, ChartExpander] = {}
-        for name in ["Профит", "Просмотры"]:
-            ce = ChartExpander(name, self.charts_frame)
-            charts_lay.addWidget(ce)
-            self.chart_sections[name] = ce
-        charts_lay.addStretch()
+        self._chart_values: Dict[str, List[int]] = {}
+        self.work_charts: Optional[WorkChartsWidget] = None
 
     # ------------------------------------------------------------------
     def set_scale(self, percent: int):
@@ -147,6 +147,17 @@ class StatsPanel(QWidget):
     def set_month(self, year: int, month: int):
         self.current_year = year
         self.current_month = month
+        self._count_month()
+
+    def _count_month(self):
+        self._names = Counter()
+        self._done = 0
+        if self.repository is not None:
+            for works in self.repository.get(self.current_year, self.current_month).values():
+                for w in works:
+                    if w.name:
+                        self._names[w.name] += 1
+                    self._done += w.done
 
     def _set_item(self, table: QTableWidget, row: int, col: int, text: str):
         item = table.item(row, col)
@@ -156,32 +167,100 @@ class StatsPanel(QWidget):
         item.setText(text)
 
     # ------------------------------------------------------------------
-    def load_year(self, year: int):
-        """Aggregate monthly stats from storage and populate tables."""
-
-        monthly_data = [
-            self.storage.load_json(f"{year}/stats_{m:02d}.json", {}) or {} for m in range(1, 13)
+    def _read_year(self, year: int) -> Tuple[YearStats, Set[int]]:
+        """Return the cached stats of ``year`` and the months re-read now."""
+        versions = [
+            self.storage.version(f"{year}/stats_{m:02d}.json") for m in range(1, 13)
         ]
+        cached = self._years.get(year)
+        if cached is None:
+            cached = self._years[year] = YearStats([None] * 12, [{}] * 12, {})
+            changed = set(range(12))
+        else:
+            changed = {c for c in range(12) if versions[c] != cached.versions[c]}
+        for col in changed:
+            cached.months[col] = (
+                self.storage.load_json(f"{year}/stats_{col + 1:02d}.json", {}) or {}
+            )
+            cached.versions[col] = versions[col]
+        if changed:
+            cached.soft = self._aggregate_software(cached.months)
+        return cached, changed
 
-        # Metrics table values
-        for row, metric in enumerate(self.METRICS):
-            total = 0
-            for col, data in enumerate(monthly_data):
-                val = int(data.get("metrics", {}).get(metric, 0) or 0)
-                self._set_item(self.metrics_table, row, col, str(val))
-                total += val
-            self._set_item(self.metrics_table, row, 12, str(total))
-
-        # Software costs aggregation
+    @staticmethod
+    def _aggregate_software(months: List[dict]) -> Dict[str, Dict[str, float]]:
         soft: Dict[str, Dict[str, float]] = {}
-        for data in monthly_data:
+        for data in months:
             for entry in data.get("software", []):
                 name = entry.get("name", "")
                 price = float(entry.get("price", 0) or 0)
                 count = int(entry.get("count", 0) or 0)
                 info = soft.setdefault(name, {"price": price, "count": 0})
                 info["count"] += count
+        return soft
+
+    @staticmethod
+    def _metric(data: dict, metric: str) -> int:
+        return int(data.get("metrics", {}).get(metric, 0) or 0)
 
+    def load_year(self, year: int):
+        """Show the stats of ``year``.
+
+        Parsed month files are cached per year and re-read only when their
+        version changed.  For the year already shown only the cells of
+        changed months are rewritten, and nothing at all when no file
+        changed and the current month stayed the same.
+        """
+        stats, changed = self._read_year(year)
+        if self.work_charts is not None:
+            self.work_charts.set_month(self.current_year, self.current_month)
+        live_col = self.current_month - 1 if (
+            self.repository is not None and year == self.current_year
+        ) else None
+        if year == self._shown_year and not changed and live_col == self._live_col:
+            return
+
+        if year != self._shown_year:
+            # Metrics table values
+            for row, metric in enumerate(self.METRICS):
+                total = 0
+                for col, data in enumerate(stats.months):
+                    val = self._metric(data, metric)
+                    self._set_item(self.metrics_table, row, col, str(val))
+                    total += val
+                self._set_item(self.metrics_table, row, 12, str(total))
+            changed = set(range(12))
+        else:
+            # put the stored values back under the previous live cells
+            if self._live_col is not None and self._live_col not in changed:
+                for row in (self.WORKS_ROW, self.CHAPTERS_ROW):
+                    self._put(row, self._live_col,
+                              self._metric(stats.months[self._live_col], self.METRICS[row]))
+            for col in sorted(changed):
+                for row, metric in enumerate(self.METRICS):
+                    self._put(row, col, self._metric(stats.months[col], metric))
+        self._shown_year = year
+        self._live_col = None
+
+        if changed:
+            self._fill_software(stats.soft)
+            # Update charts
+            for name in self.CHARTS:
+                values = [self._metric(d, name) for d in stats.months]
+                if values == self._chart_values.get(name):
+                    continue
+                self._chart_values[name] = values
+                if name in self.chart_sections:
+                    self.chart_sections[name].set_series(values)
+
+        if live_col is not None:
+            self._live_col = live_col
+            self._set_live(self.WORKS_ROW, len(self._names))
+            self._set_live(self.CHAPTERS_ROW, self._done)
+
+        self.set_scale(self.scale_percent)
+
+    def _fill_software(self, soft: Dict[str, Dict[str, float]]):
         self.software_table.setRowCount(len(soft) + 1)
         total_cost = 0.0
         row = 0
@@ -198,19 +277,83 @@ class StatsPanel(QWidget):
         self._set_item(self.software_table, row, 0, "Итого")
         self._set_item(self.software_table, row, 3, f"{total_cost:g}")
 
-        # Update charts
-        for name, section in self.chart_sections.items():
-            values = [int(d.get("metrics", {}).get(name, 0) or 0) for d in monthly_data]
-            section.set_series(values)
-
-        self.set_scale(self.scale_percent)
+    # ------------------------------------------------------------------
+    def _put(self, row: int, col: int, value: int):
+        """Show ``value`` in a month cell and adjust the year total."""
+        item = self.metrics_table.item(row, col)
+        old = int(item.text() or 0) if item else 0
+        if old == value:
+            return
+        total_item = self.metrics_table.item(row, 12)
+        total = int(total_item.text() or 0) if total_item else 0
+        self._set_item(self.metrics_table, row, col, str(value))
+        self._set_item(self.metrics_table, row, 12, str(total - old + value))
+
+    def _set_live(self, row: int, value: int):
+        """Show ``value`` for the current month and adjust the year total."""
+        self._put(row, self.current_month - 1, value)
+
+    def _on_work_changed(self, change: WorkChange):
+        if (change.year, change.month) != (self.current_year, self.current_month):
+            return
+        w = change.work
+        names_before = len(self._names)
+        if change.field == MONTH:
+            self._count_month()
+            names_before = -1
+        elif change.field in (ADDED, REMOVED):
+            sign = 1 if change.field == ADDED else -1
+            self._done += sign * w.done
+            self._count_name(w.name, sign)
+        elif change.field == "done":
+            self._done += change.new - change.old
+        elif change.field == "name":
+            self._count_name(change.old, -1)
+            self._count_name(change.new, 1)
+        else:
+            return
+        self._set_live(self.CHAPTERS_ROW, self._done)
+        if len(self._names) != names_before:
+            self._set_live(self.WORKS_ROW, len(self._names))
+
+    def _count_name(self, name: str, delta: int):
+        if not name:
+            return
+        self._names[name] += delta
+        if self._names[name] <= 0:
+            del self._names[name]
 
     # ------------------------------------------------------------------
-    def toggle_charts(self):
-        vis = not self.charts_frame.isVisible()
+    def _ensure_charts(self):
+        if self.chart_sections:
+            return
+        from .chart_expander import ChartExpander
+        from .work_charts import WorkChartsWidget
+
+        charts_lay = QVBoxLayout(self.charts_frame)
+        for name in self.CHARTS:
+            ce = ChartExpander(name, self.charts_frame)
+            ce.set_series(self._chart_values.get(name, []))
+            charts_lay.addWidget(ce)
+            self.chart_sections[name] = ce
+        self.work_charts = WorkChartsWidget(self.storage, parent=self.charts_frame)
+        self.work_charts.set_month(self.current_year, self.current_month)
+        charts_lay.addWidget(self.work_charts)
+        charts_lay.addStretch()
+
+    def charts_visible(self) -> bool:
+        return not self.charts_frame.isHidden()
+
+    def set_charts_visible(self, vis: bool):
+        if vis:
+            self._ensure_charts()
         self.charts_frame.setVisible(vis)
         self.toggle_btn.setText("Скрыть графики" if vis else "Показать графики")
 
+    def toggle_charts(self):
+        vis = not self.charts_visible()
+        self.set_charts_visible(vis)
+
         if self.current_year and self.current_month:
             data = self.storage.load_json(
                 f"{self.current_year}/stats_{self.current_month:02d}.json", {}
@@ -1,13 +1,19 @@
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, Optional, Any
+from typing import Dict, List, Optional, Any
 
-from PySide6.QtCore import Qt
+from PySide6.QtCore import (
+    Qt,
+    Signal,
+    QAbstractTableModel,
+    QModelIndex,
+    QSortFilterProxyModel,
+)
 from PySide6.QtWidgets import (
     QWidget,
     QVBoxLayout,
     QLabel,
-    QTableWidget,
-    QTableWidgetItem,
+    QTableView,
     QFormLayout,
     QLineEdit,
     QSpinBox,
@@ -16,18 +22,222 @@ from PySide6.QtWidgets import (
 )
 
 from ..storage import Storage
+from ..month_repository import MonthRepository
+from ..events import ADDED, MONTH, REMOVED, WorkChange
+
+
+@dataclass(slots=True)
+class TopRow:
+    """One work of the month top.
+
+    ``plan``/``done``/``adult``/``count`` are aggregated from the month's
+    works (``count`` is the number of entries, a row added by hand counts
+    as one and is remembered in ``manual``); the other fields are entered
+    by the user.  An empty
+    ``progress`` means it is derived from plan/done.
+    """
+
+    name: str
+    status: str = ""
+    total_chapters: str = ""
+    symbols_per_chapter: str = ""
+    progress: str = ""
+    release: str = ""
+    profit: str = ""
+    ads: str = ""
+    views: str = ""
+    likes: str = ""
+    thanks: str = ""
+    plan: int = 0
+    done: int = 0
+    adult: int = 0
+    count: int = 0
+    manual: int = 0
+
+    def progress_text(self) -> str:
+        if self.progress:
+            return self.progress
+        return f"{int(self.done / self.plan * 100)}" if self.plan else ""
+
+    def to_dict(self) -> Dict[str, Any]:
+        try:
+            total = int(self.total_chapters or 0)
+        except ValueError:
+            total = 0
+        return {
+            "status": self.status,
+            "is_adult": self.adult > 0,
+            "total_chapters": total,
+            "symbols_per_chapter": self.symbols_per_chapter,
+            "plan": self.plan,
+            "done": self.done,
+            "progress": self.progress_text(),
+            "release": self.release,
+            "profit": self.profit,
+            "ads": self.ads,
+            "views": self.views,
+            "likes": self.likes,
+            "thanks": self.thanks,
+        }
+
+
+def _number(text: str) -> float:
+    """Sort key of a metric cell; text that is not a number sorts lowest."""
+    try:
+        return float(text.replace(" ", "").replace(",", "."))
+    except ValueError:
+        return float("-inf")
+
+
+class TopMonthModel(QAbstractTableModel):
+    """Rows of :class:`TopRow` records; only changed cells are signalled."""
+
+    COLUMNS = [
+        ("Работа", "name"),
+        ("Статус", "status"),
+        ("18+", None),
+        ("Главы всего", "total_chapters"),
+        ("Знаки/главу", "symbols_per_chapter"),
+        ("Запланировано", "plan"),
+        ("Сделано", "done"),
+        ("Прогресс", "progress"),
+        ("Выпуск", "release"),
+        ("Профит", "profit"),
+        ("Реклама", "ads"),
+        ("Просмотры", "views"),
+        ("Лайки", "likes"),
+        ("Спасибо", "thanks"),
+    ]
+    # aggregated columns (not editable)
+    AGGREGATE_COLUMNS = (2, 5, 6, 7)
+    # sorted as text; the rest by their numeric value
+    TEXT_COLUMNS = (0, 1, 2, 8)
+    DONE_COLUMN = 6
+    SortRole = Qt.UserRole + 1
+
+    edited = Signal()
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.rows: List[TopRow] = []
+        self._rows_by_name: Dict[str, TopRow] = {}
+
+    # ------------------------------------------------------------------
+    def set_rows(self, rows: List[TopRow]):
+        self.beginResetModel()
+        self.rows = rows
+        self._rows_by_name = {r.name: r for r in rows}
+        self.endResetModel()
+
+    def row_of(self, name: str) -> Optional[TopRow]:
+        return self._rows_by_name.get(name)
+
+    def add_row(self, row: TopRow):
+        pos = len(self.rows)
+        self.beginInsertRows(QModelIndex(), pos, pos)
+        self.rows.append(row)
+        self._rows_by_name.setdefault(row.name, row)
+        self.endInsertRows()
+
+    def remove_row(self, row: TopRow):
+        pos = self.rows.index(row)
+        self.beginRemoveRows(QModelIndex(), pos, pos)
+        del self.rows[pos]
+        if self._rows_by_name.get(row.name) is row:
+            del self._rows_by_name[row.name]
+        self.endRemoveRows()
+
+    def aggregates_changed(self, row: TopRow):
+        pos = self.rows.index(row)
+        self.dataChanged.emit(self.index(pos, 2), self.index(pos, 7))
+
+    def to_payload(self) -> Dict[str, Dict[str, Any]]:
+        """Serialize the rows in the ``top_month_MM.json`` layout."""
+        return {r.name.strip(): r.to_dict() for r in self.rows if r.name.strip()}
+
+    # ------------------------------------------------------------------
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.COLUMNS[section][0]
+        return None
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.NoItemFlags
+        flags = Qt.ItemIsEnabled | Qt.ItemIsSelectable
+        if index.column() == 0 or index.column() in self.AGGREGATE_COLUMNS[:-1]:
+            return flags
+        return flags | Qt.ItemIsEditable
+
+    def _text(self, row: TopRow, col: int) -> str:
+        if col == 2:
+            return "18+" if row.adult > 0 else "0+"
+        if col == 7:
+            return row.progress_text()
+        return str(getattr(row, self.COLUMNS[col][1]))
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row = self.rows[index.row()]
+        col = index.column()
+        if role in (Qt.DisplayRole, Qt.EditRole):
+            return self._text(row, col)
+        if role == self.SortRole:
+            # plain values so the proxy compares them without calling back
+            if col in self.TEXT_COLUMNS:
+                return self._text(row, col).lower()
+            if col in (5, 6):
+                return float(getattr(row, self.COLUMNS[col][1]))
+            return _number(self._text(row, col))
+        return None
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if role != Qt.EditRole or not index.isValid():
+            return False
+        row = self.rows[index.row()]
+        attr = self.COLUMNS[index.column()][1]
+        value = str(value)
+        if attr is None or getattr(row, attr) == value:
+            return False
+        setattr(row, attr, value)
+        self.dataChanged.emit(index, index)
+        self.edited.emit()
+        return True
+
+
+class TopSortProxy(QSortFilterProxyModel):
+    """Sorts by :attr:`TopMonthModel.SortRole`, numbers numerically."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setSortRole(TopMonthModel.SortRole)
+        self.setDynamicSortFilter(True)
 
-if False:  # type checking only
-    from ..central.daily_grid_panel import DailyGridPanel
 
 class TopMonthPanel(QWidget):
     """Panel showing monthly top works with editable statistics."""
 
-    def __init__(self, parent=None, storage: Optional[Storage] = None):
+    def __init__(
+        self,
+        parent=None,
+        storage: Optional[Storage] = None,
+        repository: Optional[MonthRepository] = None,
+    ):
         super().__init__(parent)
         self.edit_mode = False
         self.scale_percent = 100
         self.storage = storage or Storage(Path("data"))
+        self.repository = repository or MonthRepository(self.storage)
+        self.repository.events.subscribe(self._on_work_changed)
+        # rows of the loaded month; aggregates are kept current by change events
+        self._loaded: tuple[int, int] = (0, 0)
 
         lay = QVBoxLayout(self)
         lay.addWidget(QLabel("ТОП месяца"))
@@ -78,26 +288,28 @@ class TopMonthPanel(QWidget):
         lay.addWidget(form_widget)
         self.add_btn = QPushButton("Добавить", self)
         lay.addWidget(self.add_btn)
-        self.table = QTableWidget(0, 14, self)
-        self.table.setHorizontalHeaderLabels([
-            "Работа",
-            "Статус",
-            "18+",
-            "Главы всего",
-            "Знаки/главу",
-            "Запланировано",
-            "Сделано",
-            "Прогресс",
-            "Выпуск",
-            "Профит",
-            "Реклама",
-            "Просмотры",
-            "Лайки",
-            "Спасибо",
-        ])
+        self.model = TopMonthModel(self)
+        self.proxy = TopSortProxy(self)
+        self.proxy.setSourceModel(self.model)
+        self.table = QTableView(self)
+        self.table.setModel(self.proxy)
+        self.table.setSortingEnabled(True)
+        self.table.sortByColumn(TopMonthModel.DONE_COLUMN, Qt.DescendingOrder)
         lay.addWidget(self.table)
         self.add_btn.clicked.connect(self._on_add_clicked)
 
+        # dirty tracking: saves are skipped while nothing changed
+        self.dirty = False
+        self.model.edited.connect(self._mark_dirty)
+        for w in form_widget.findChildren(QLineEdit):
+            w.textEdited.connect(self._mark_dirty)
+        for w in form_widget.findChildren(QSpinBox):
+            w.valueChanged.connect(self._mark_dirty)
+        self.adult_edit.toggled.connect(self._mark_dirty)
+
+    def _mark_dirty(self, *args):
+        self.dirty = True
+
     # ------------------------------------------------------------------
     # scaling / edit mode
     def set_scale(self, percent: int):
@@ -105,12 +317,11 @@ class TopMonthPanel(QWidget):
         f = self.font()
         f.setPointSize(int(12 * self.scale_percent / 100))
         self.setFont(f)
-        for r in range(self.table.rowCount()):
-            self.table.setRowHeight(r, int(24 * self.scale_percent / 100))
+        self.table.verticalHeader().setDefaultSectionSize(int(24 * self.scale_percent / 100))
 
     def set_edit_mode(self, enabled: bool):
         self.edit_mode = enabled
-        trigger = QTableWidget.DoubleClicked if enabled else QTableWidget.NoEditTriggers
+        trigger = QTableView.DoubleClicked if enabled else QTableView.NoEditTriggers
         self.table.setEditTriggers(trigger)
         # ensure scaling applied when toggling edit mode
         self.set_scale(self.scale_percent)
@@ -120,24 +331,26 @@ class TopMonthPanel(QWidget):
     def _on_add_clicked(self):
         """Add a new row using form data and persist the month."""
         data = self.collect_form_data()
-        row = self.table.rowCount()
-        self.table.insertRow(row)
-        self._set_item(row, 0, data.get("work", ""), editable=False)
-        self._set_item(row, 1, data.get("status", ""))
-        adult_text = "18+" if data.get("is_adult") else "0+"
-        self._set_item(row, 2, adult_text, editable=False)
-        self._set_item(row, 3, str(data.get("total_chapters", "")))
-        self._set_item(row, 4, str(data.get("symbols_per_chapter", "")))
-        self._set_item(row, 5, str(data.get("plan", 0)), editable=False)
-        self._set_item(row, 6, str(data.get("done", 0)), editable=False)
-        self._set_item(row, 7, str(data.get("progress", "")))
-        self._set_item(row, 8, str(data.get("release", "")))
-        self._set_item(row, 9, str(data.get("profit", "")))
-        self._set_item(row, 10, str(data.get("ads", "")))
-        self._set_item(row, 11, str(data.get("views", "")))
-        self._set_item(row, 12, str(data.get("likes", "")))
-        self._set_item(row, 13, str(data.get("thanks", "")))
-        self.set_scale(self.scale_percent)
+        # a manual row counts as one entry so it is not dropped by grid edits
+        row = TopRow(
+            name=data.get("work", ""),
+            status=data.get("status", ""),
+            total_chapters=str(data.get("total_chapters", "")),
+            symbols_per_chapter=str(data.get("symbols_per_chapter", "")),
+            progress=str(data.get("progress", "")),
+            release=str(data.get("release", "")),
+            profit=str(data.get("profit", "")),
+            ads=str(data.get("ads", "")),
+            views=str(data.get("views", "")),
+            likes=str(data.get("likes", "")),
+            thanks=str(data.get("thanks", "")),
+            plan=int(data.get("plan", 0)),
+            done=int(data.get("done", 0)),
+            adult=int(bool(data.get("is_adult"))),
+            count=1,
+            manual=1,
+        )
+        self.model.add_row(row)
         self.save_month(data.get("year", 0), data.get("month", 0))
         # clear form fields except year/month
         self.work_edit.clear()
@@ -157,31 +370,11 @@ class TopMonthPanel(QWidget):
 
     # ------------------------------------------------------------------
     # persistence helpers
-    def _set_item(self, row: int, col: int, text: str, editable: bool = True):
-        item = self.table.item(row, col)
-        if not item:
-            item = QTableWidgetItem()
-            self.table.setItem(row, col, item)
-        item.setText(text)
-        flags = item.flags()
-        if editable:
-            item.setFlags(flags | Qt.ItemIsEditable)
-        else:
-            item.setFlags(flags & ~Qt.ItemIsEditable)
-
-    def load_month(self, central: "DailyGridPanel", year: int, month: int):
-        """Load stats from MainPanel and stored data for given month."""
-        # ensure central data for the month is loaded
-        central.load_month(year, month)
-
-        # aggregate works from central
-        stats: Dict[str, Dict[str, Any]] = {}
-        for works in central.month_data.values():
-            for w in works:
-                info = stats.setdefault(w.name, {"plan": 0, "done": 0, "adult": False})
-                info["plan"] += w.plan
-                info["done"] += w.done
-                info["adult"] = info["adult"] or getattr(w, "is_adult", False)
+    def load_month(self, year: int, month: int):
+        """Load stats from the shared month data and stored top values."""
+        # aggregate works from the central month data
+        self._loaded = (year, month)
+        rows = self._aggregate(year, month)
 
         # load previously saved metrics
         saved = self.storage.load_json(f"{year}/top_month_{month:02d}.json", {}) or {}
@@ -209,42 +402,129 @@ class TopMonthPanel(QWidget):
             self.year_edit.setValue(year)
             self.month_edit.setValue(month)
 
-        # build table
-        self.table.setRowCount(len(stats))
-        for row, (name, info) in enumerate(
-            sorted(stats.items(), key=lambda x: x[1]["done"], reverse=True)
-        ):
-            self._set_item(row, 0, name, editable=False)
-            saved_row = saved.get(name, {}) if isinstance(saved, dict) else {}
-            self._set_item(row, 1, str(saved_row.get("status", "")))
-            adult_text = "18+" if info.get("adult") else "0+"
-            self._set_item(row, 2, adult_text, editable=False)
-            self._set_item(row, 3, str(saved_row.get("total_chapters", "")))
-            self._set_item(row, 4, str(saved_row.get("symbols_per_chapter", "")))
-            self._set_item(row, 5, str(info.get("plan", 0)), editable=False)
-            self._set_item(row, 6, str(info.get("done", 0)), editable=False)
-            progress = saved_row.get("progress")
-            if progress in (None, ""):
-                plan = info.get("plan", 0)
-                done = info.get("done", 0)
-                progress = f"{int(done / plan * 100)}" if plan else ""
-            self._set_item(row, 7, str(progress))
-            self._set_item(row, 8, str(saved_row.get("release", "")))
-            self._set_item(row, 9, str(saved_row.get("profit", "")))
-            self._set_item(row, 10, str(saved_row.get("ads", "")))
-            self._set_item(row, 11, str(saved_row.get("views", "")))
-            self._set_item(row, 12, str(saved_row.get("likes", "")))
-            self._set_item(row, 13, str(saved_row.get("thanks", "")))
+        # fill the user-entered fields; an empty progress stays derived
+        if isinstance(saved, dict):
+            for name, row in rows.items():
+                saved_row = saved.get(name)
+                if not isinstance(saved_row, dict):
+                    continue
+                for field in self.SAVED_TEXT_FIELDS:
+                    value = saved_row.get(field)
+                    if value is not None:
+                        setattr(row, field, str(value))
 
-        self.set_scale(self.scale_percent)
+        self.model.set_rows(list(rows.values()))
+        self.dirty = False
+
+    # user-entered fields restored from ``top_month_MM.json``
+    SAVED_TEXT_FIELDS = (
+        "status",
+        "total_chapters",
+        "symbols_per_chapter",
+        "progress",
+        "release",
+        "profit",
+        "ads",
+        "views",
+        "likes",
+        "thanks",
+    )
+
+    # ------------------------------------------------------------------
+    # incremental aggregation
+    def _aggregate(self, year: int, month: int) -> Dict[str, TopRow]:
+        rows: Dict[str, TopRow] = {}
+        for works in self.repository.get(year, month).values():
+            for w in works:
+                if not w.name:
+                    continue
+                row = rows.get(w.name)
+                if row is None:
+                    row = rows[w.name] = TopRow(w.name)
+                row.plan += w.plan
+                row.done += w.done
+                row.adult += int(w.is_adult)
+                row.count += 1
+        return rows
+
+    def _reaggregate(self):
+        """Rebuild the aggregates after a bulk edit, keeping the entered fields."""
+        rows = self._aggregate(*self._loaded)
+        result = []
+        for old in self.model.rows:
+            row = rows.pop(old.name, None)
+            if row is None:
+                if old.manual:
+                    old.count = old.manual
+                    result.append(old)
+                continue
+            for field in self.SAVED_TEXT_FIELDS:
+                setattr(row, field, getattr(old, field))
+            row.count += old.manual
+            row.manual = old.manual
+            result.append(row)
+        result.extend(rows.values())
+        self.model.set_rows(result)
+        self.dirty = True
+
+    def _on_work_changed(self, change: WorkChange):
+        """Apply one work change to the aggregates and touch only its row."""
+        if (change.year, change.month) != self._loaded:
+            return
+        if change.field == MONTH:
+            self._reaggregate()
+            return
+        w = change.work
+        if change.field in (ADDED, REMOVED):
+            sign = 1 if change.field == ADDED else -1
+            self._apply_delta(w.name, sign * w.plan, sign * w.done, sign * int(w.is_adult), sign)
+        elif change.field == "name":
+            self._apply_delta(change.old, -w.plan, -w.done, -int(w.is_adult), -1)
+            self._apply_delta(change.new, w.plan, w.done, int(w.is_adult), 1)
+        elif change.field == "plan":
+            self._apply_delta(w.name, change.new - change.old, 0, 0, 0)
+        elif change.field == "done":
+            self._apply_delta(w.name, 0, change.new - change.old, 0, 0)
+        elif change.field == "is_adult":
+            self._apply_delta(w.name, 0, 0, 1 if change.new else -1, 0)
+
+    def _apply_delta(self, name: str, plan: int, done: int, adult: int, count: int):
+        if not name:
+            return
+        row = self.model.row_of(name)
+        if row is None:
+            row = TopRow(name, plan=plan, done=done, adult=adult, count=count)
+            if row.count > 0:
+                self.model.add_row(row)
+                self.dirty = True
+            return
+        row.plan += plan
+        row.done += done
+        row.adult += adult
+        row.count += count
+        if row.count <= 0:
+            self.model.remove_row(row)
+        else:
+            # the proxy re-sorts the row if the sorted column changed
+            self.model.aggregates_changed(row)
+        self.dirty = True
 
     def save_month(self, year: int, month: int):
         """Persist current table values for aggregation."""
         data = self.collect_month_data()
         payload = {"__form__": self.collect_form_data(), **data}
         self.storage.save_json(f"{year}/top_month_{month:02d}.json", payload)
+        if (year, month) == self._loaded:
+            self.dirty = False
         return payload
 
+    def save_if_dirty(self) -> bool:
+        """Save the loaded month only if something changed since load/save."""
+        if not self.dirty or not self._loaded[0]:
+            return False
+        self.save_month(*self._loaded)
+        return True
+
     def collect_form_data(self) -> Dict[str, Any]:
         """Gather current values from the input form."""
         return {
@@ -266,52 +546,11 @@ class TopMonthPanel(QWidget):
             "thanks": self.thanks_edit.text(),
         }
 
-    def collect_month_data(self) -> Dict[str, Dict[str, str]]:
-        """Return current table values as a dictionary.
+    def collect_month_data(self) -> Dict[str, Dict[str, Any]]:
+        """Return current row values as a dictionary.
 
         The structure mirrors what :meth:`save_month` stores and can be used
         by aggregation helpers to gather statistics without touching the
         filesystem.
         """
-        data: Dict[str, Dict[str, str]] = {}
-        for r in range(self.table.rowCount()):
-            name_item = self.table.item(r, 0)
-            if not name_item:
-                continue
-            name = name_item.text().strip()
-            if not name:
-                continue
-            status = self.table.item(r, 1).text() if self.table.item(r, 1) else ""
-            adult_text = self.table.item(r, 2).text() if self.table.item(r, 2) else "0+"
-            is_adult = adult_text.strip().startswith("18")
-            total_chapters = (
-                int(self.table.item(r, 3).text() or 0) if self.table.item(r, 3) else 0
-            )
-            symbols_per_chapter = (
-                self.table.item(r, 4).text() if self.table.item(r, 4) else ""
-            )
-            plan = int(self.table.item(r, 5).text() or 0) if self.table.item(r, 5) else 0
-            done = int(self.table.item(r, 6).text() or 0) if self.table.item(r, 6) else 0
-            progress = self.table.item(r, 7).text() if self.table.item(r, 7) else ""
-            release = self.table.item(r, 8).text() if self.table.item(r, 8) else ""
-            profit = self.table.item(r, 9).text() if self.table.item(r, 9) else ""
-            ads = self.table.item(r, 10).text() if self.table.item(r, 10) else ""
-            views = self.table.item(r, 11).text() if self.table.item(r, 11) else ""
-            likes = self.table.item(r, 12).text() if self.table.item(r, 12) else ""
-            thanks = self.table.item(r, 13).text() if self.table.item(r, 13) else ""
-            data[name] = {
-                "status": status,
-                "is_adult": is_adult,
-                "total_chapters": total_chapters,
-                "symbols_per_chapter": symbols_per_chapter,
-                "plan": plan,
-                "done": done,
-                "progress": progress,
-                "release": release,
-                "profit": profit,
-                "ads": ads,
-                "views": views,
-                "likes": likes,
-                "thanks": thanks,
-            }
-        return data
+        return self.model.to_payload()
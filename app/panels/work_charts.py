@@ -0,0 +1,164 @@
+"""Per-work line charts for the stats panel.
+
+Every work is drawn as its own line of a chosen metric over a chosen
+period.  Data comes from :meth:`TopAggregator.work_series`, which keeps the
+parsed ``top_month_MM.json`` files in memory, so switching the metric or
+period does not read month files again.  Line colours are derived from the
+work name and can be overridden per work (double-click in the list); the
+overrides are stored in ``work_colors.json``.
+"""
+
+from __future__ import annotations
+
+import hashlib
+from typing import Dict, List, Optional, Tuple
+
+from PySide6.QtCore import Qt
+from PySide6.QtGui import QColor, QIcon, QPixmap
+from PySide6.QtWidgets import (
+    QColorDialog,
+    QComboBox,
+    QHBoxLayout,
+    QListWidget,
+    QListWidgetItem,
+    QVBoxLayout,
+    QWidget,
+)
+
+from ..storage import Storage
+from ..top_aggregator import TopAggregator
+from .chart_expander import ChartExpander
+
+COLORS_FILE = "work_colors.json"
+
+
+def work_color(name: str, overrides: Optional[Dict[str, str]] = None) -> QColor:
+    """Return the line colour of a work: the override or a hash-based hue."""
+    if overrides and name in overrides:
+        return QColor(overrides[name])
+    h = hashlib.blake2b(name.encode("utf-8"), digest_size=2).digest()
+    return QColor.fromHsv(int.from_bytes(h, "big") % 360, 200, 230)
+
+
+class WorkChartsWidget(QWidget):
+    """Metric/period selectors, a one-line-per-work chart and a work list."""
+
+    METRICS = {"Готово": "done", "Профит": "profit", "Просмотры": "views", "Лайки": "likes"}
+    PERIODS = ["Текущий год", "12 месяцев", "Всё время"]
+
+    def __init__(
+        self,
+        storage: Storage,
+        aggregator: Optional[TopAggregator] = None,
+        parent: Optional[QWidget] = None,
+    ):
+        super().__init__(parent)
+        self.storage = storage
+        self.aggregator = aggregator or TopAggregator(storage)
+        self.year = 0
+        self.month = 0
+        self.overrides: Dict[str, str] = self.storage.load_json(COLORS_FILE, {}) or {}
+        self._shown: Tuple = ()
+        storage.subscribe(self._on_saved)
+
+        lay = QVBoxLayout(self)
+        lay.setContentsMargins(0, 0, 0, 0)
+        ctrl = QHBoxLayout()
+        self.metric_combo = QComboBox(self)
+        self.metric_combo.addItems(list(self.METRICS))
+        self.period_combo = QComboBox(self)
+        self.period_combo.addItems(self.PERIODS)
+        ctrl.addWidget(self.metric_combo)
+        ctrl.addWidget(self.period_combo)
+        ctrl.addStretch(1)
+        lay.addLayout(ctrl)
+
+        body = QHBoxLayout()
+        self.chart = ChartExpander("По работам", self)
+        self.works = QListWidget(self)
+        self.works.setMaximumWidth(220)
+        self.works.setToolTip("Флажок — показать линию, двойной щелчок — цвет")
+        body.addWidget(self.chart, 1)
+        body.addWidget(self.works)
+        lay.addLayout(body)
+
+        self.metric_combo.currentIndexChanged.connect(lambda _: self.refresh())
+        self.period_combo.currentIndexChanged.connect(lambda _: self.refresh())
+        self.works.itemChanged.connect(self._on_item_changed)
+        self.works.itemDoubleClicked.connect(self._pick_color)
+
+    # ------------------------------------------------------------------
+    def _on_saved(self, rel_path: str, data):
+        # colours renamed or merged elsewhere are picked up on the next refresh
+        if rel_path == COLORS_FILE and data != self.overrides:
+            self.overrides = dict(data)
+            self._shown = ()
+
+    def set_month(self, year: int, month: int):
+        self.year, self.month = year, month
+        self.refresh()
+
+    def _months(self) -> List[Tuple[int, int]]:
+        period = self.period_combo.currentIndex()
+        if period == 0:
+            return [(self.year, m) for m in range(1, 13)]
+        if period == 1:
+            index = self.year * 12 + self.month - 1
+            return [(i // 12, i % 12 + 1) for i in range(index - 11, index + 1)]
+        years = self.aggregator.years() or [self.year]
+        return [(y, m) for y in range(years[0], years[-1] + 1) for m in range(1, 13)]
+
+    def refresh(self):
+        """Redraw the lines; nothing is done when the data did not change."""
+        if not self.year:
+            return
+        months = self._months()
+        metric = self.METRICS[self.metric_combo.currentText()]
+        series = self.aggregator.work_series(metric, months)
+        key = (metric, tuple(months), series)
+        if key == self._shown:
+            return
+        self._shown = key
+
+        order = sorted(series, key=lambda n: sum(series[n]), reverse=True)
+        lines = {
+            name: [(i, v) for i, v in enumerate(series[name], start=1)] for name in order
+        }
+        colors = {name: work_color(name, self.overrides) for name in order}
+        self.chart.set_lines(lines, colors)
+
+        hidden = {
+            self.works.item(r).text()
+            for r in range(self.works.count())
+            if self.works.item(r).checkState() != Qt.Checked
+        }
+        self.works.blockSignals(True)
+        self.works.clear()
+        for name in order:
+            item = QListWidgetItem(self._swatch(colors[name]), name)
+            item.setFlags(item.flags() | Qt.ItemIsUserCheckable)
+            item.setCheckState(Qt.Unchecked if name in hidden else Qt.Checked)
+            self.works.addItem(item)
+            if name in hidden:
+                self.chart.set_line_visible(name, False)
+        self.works.blockSignals(False)
+
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _swatch(color: QColor) -> QIcon:
+        pix = QPixmap(12, 12)
+        pix.fill(color)
+        return QIcon(pix)
+
+    def _on_item_changed(self, item: QListWidgetItem):
+        self.chart.set_line_visible(item.text(), item.checkState() == Qt.Checked)
+
+    def _pick_color(self, item: QListWidgetItem):
+        name = item.text()
+        color = QColorDialog.getColor(work_color(name, self.overrides), self, name)
+        if not color.isValid():
+            return
+        self.overrides[name] = color.name()
+        self.storage.save_json(COLORS_FILE, self.overrides)
+        item.setIcon(self._swatch(color))
+        self.chart.set_line_color(name, color)
@@ -0,0 +1,146 @@
+"""Recurring posting rules.
+
+A rule such as "work X, next chapter every Mon/Wed/Fri until chapter 300"
+is stored once in ``posting_rules.json`` and expanded into concrete
+postings only for the dates that are asked for.  The chapter number of an
+occurrence is computed arithmetically from the number of earlier
+occurrences, so showing any month does not expand the months before it.
+Exception dates skip an occurrence; its chapter moves to the next one.
+"""
+from __future__ import annotations
+
+import uuid
+from dataclasses import asdict, dataclass, field
+from datetime import date, timedelta
+from typing import Iterator, List, Optional, Tuple
+
+RULES_FILE = "posting_rules.json"
+
+WEEKDAY_NAMES = ["Пн", "Вт", "Ср", "Чт", "Пт", "Сб", "Вс"]
+
+
+def _parse_date(text: str) -> Optional[date]:
+    try:
+        return date.fromisoformat(text) if text else None
+    except ValueError:
+        return None
+
+
+@dataclass
+class PostingRule:
+    """Weekly posting pattern of one work.
+
+    ``weekdays`` are ``date.weekday()`` numbers (0 is Monday).  The rule
+    ends at ``until_chapter`` or ``until`` (ISO date, inclusive), whichever
+    comes first; 0 / "" means no limit.
+    """
+
+    work: str = ""
+    weekdays: List[int] = field(default_factory=list)
+    start: str = ""
+    first_chapter: int = 1
+    until_chapter: int = 0
+    until: str = ""
+    chapter_format: str = "Глава {n}"
+    time: str = ""
+    priority: int = 1
+    exceptions: List[str] = field(default_factory=list)
+    id: str = field(default_factory=lambda: uuid.uuid4().hex[:8])
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    @staticmethod
+    def from_dict(data: dict) -> "PostingRule":
+        return PostingRule(
+            work=data.get("work", ""),
+            weekdays=sorted({int(d) % 7 for d in data.get("weekdays", [])}),
+            start=data.get("start", ""),
+            first_chapter=int(data.get("first_chapter", 1)),
+            until_chapter=int(data.get("until_chapter", 0)),
+            until=data.get("until", ""),
+            chapter_format=data.get("chapter_format", "Глава {n}"),
+            time=data.get("time", ""),
+            priority=int(data.get("priority", 1)),
+            exceptions=list(data.get("exceptions", [])),
+            id=data.get("id") or uuid.uuid4().hex[:8],
+        )
+
+    # ------------------------------------------------------------------
+    def describe(self) -> str:
+        days = "/".join(WEEKDAY_NAMES[d] for d in self.weekdays)
+        limit = []
+        if self.until_chapter:
+            limit.append(f"до гл. {self.until_chapter}")
+        if self.until:
+            limit.append(f"до {self.until}")
+        return f"{self.work}: {days} с {self.start}, с гл. {self.first_chapter} " + " ".join(limit)
+
+    def chapter_title(self, n: int) -> str:
+        try:
+            return self.chapter_format.format(n=n)
+        except (KeyError, IndexError, ValueError):
+            return f"{self.chapter_format} {n}"
+
+    def _slots_before(self, start: date, end: date) -> int:
+        """Weekday slots in ``[start, end)``, exceptions not subtracted."""
+        days = (end - start).days
+        if days <= 0 or not self.weekdays:
+            return 0
+        weeks, rest = divmod(days, 7)
+        first = start.weekday()
+        return weeks * len(self.weekdays) + sum(
+            1 for i in range(rest) if (first + i) % 7 in self.weekdays
+        )
+
+    def _is_slot(self, day: date) -> bool:
+        return day.weekday() in self.weekdays
+
+    def _count_before(self, day: date) -> int:
+        """Occurrences (exceptions excluded) strictly before ``day``."""
+        start = _parse_date(self.start)
+        if start is None or day <= start:
+            return 0
+        skipped = 0
+        for text in self.exceptions:
+            d = _parse_date(text)
+            if d is not None and start <= d < day and self._is_slot(d):
+                skipped += 1
+        return self._slots_before(start, day) - skipped
+
+    def occurrences(self, first: date, last: date) -> Iterator[Tuple[date, int]]:
+        """Yield ``(date, chapter number)`` for occurrences in ``[first, last]``."""
+        start = _parse_date(self.start)
+        if start is None or not self.weekdays:
+            return
+        until = _parse_date(self.until)
+        if until is not None and until < last:
+            last = until
+        day = max(first, start)
+        n = self.first_chapter + self._count_before(day)
+        exceptions = set(self.exceptions)
+        while day <= last:
+            if self._is_slot(day) and day.isoformat() not in exceptions:
+                if self.until_chapter and n > self.until_chapter:
+                    return
+                yield day, n
+                n += 1
+            day += timedelta(days=1)
+
+    def next_date(self, after: date) -> Optional[date]:
+        """First occurrence on or after ``after``, None when the rule ended."""
+        start = _parse_date(self.start)
+        if start is None or not self.weekdays:
+            return None
+        day = max(after, start)
+        until = _parse_date(self.until)
+        # exceptions can skip whole weeks; bound the search by their number
+        last = day + timedelta(days=7 * (len(self.exceptions) + 1))
+        if until is not None and until < last:
+            last = until
+        for d, _n in self.occurrences(day, last):
+            return d
+        return None
+
+
+__all__ = ["RULES_FILE", "WEEKDAY_NAMES", "PostingRule"]
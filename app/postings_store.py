@@ -0,0 +1,316 @@
+"""Delayed postings schedule shared by the postings panel.
+
+``YYYY/postings_MM.json`` maps a day number to a list of postings, so a
+day can hold several chapters of several works.  Files of the old layout
+(one posting dict per day) are read transparently and written in the new
+layout on the next save; the free-text ``date`` of a posting is kept as is
+(a time or a note), the posting's date is always its day key.
+
+:class:`PostingsStore` keeps parsed months per file version and a sorted
+index of the posting dates of the whole data directory.  The index is
+persisted in ``postings_index.json`` and refreshed with stat calls, so only
+month files that changed are parsed again; lists spanning months (the
+"upcoming" view) read just the months of the dates they show.
+
+Recurring :class:`~app.posting_rules.PostingRule` instances are not stored
+per month; :meth:`PostingsStore.rule_postings` expands them for one month
+on demand and :meth:`PostingsStore.postings_on` / :meth:`next_date` merge
+them with the stored postings.
+"""
+from __future__ import annotations
+
+import bisect
+import calendar
+import re
+from dataclasses import asdict, dataclass
+from datetime import date, timedelta
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from .posting_rules import RULES_FILE, PostingRule
+from .storage import Storage
+
+INDEX_FILE = "postings_index.json"
+_FILE_RE = re.compile(r"^(\d{4})/postings_(\d{2})\.json$")
+
+Month = Dict[int, List["Posting"]]
+
+
+@dataclass
+class Posting:
+    """Single postponed posting entry."""
+
+    date: str = ""
+    work: str = ""
+    chapter: str = ""
+    priority: int = 1
+    # id of the recurring rule this posting was expanded from ("" if stored)
+    rule: str = ""
+
+    def to_dict(self) -> dict:
+        data = asdict(self)
+        if not self.rule:
+            del data["rule"]
+        return data
+
+    @staticmethod
+    def from_dict(data: dict) -> "Posting":
+        return Posting(
+            date=data.get("date", ""),
+            work=data.get("work", ""),
+            chapter=data.get("chapter", ""),
+            priority=int(data.get("priority", 1)),
+            rule=data.get("rule", ""),
+        )
+
+
+def postings_path(year: int, month: int) -> str:
+    return f"{year}/postings_{month:02d}.json"
+
+
+def parse_month(raw) -> Month:
+    """Parse a postings file of either layout into ``{day: [Posting]}``."""
+    days: Month = {}
+    if not isinstance(raw, dict):
+        return days
+    for key, entries in raw.items():
+        try:
+            day = int(key)
+        except ValueError:
+            continue
+        if isinstance(entries, dict):
+            # old layout: exactly one posting per day
+            entries = [entries]
+        if not isinstance(entries, list):
+            continue
+        postings = [Posting.from_dict(e) for e in entries if isinstance(e, dict)]
+        if postings:
+            days[day] = postings
+    return days
+
+
+class PostingsStore:
+    """Parsed postings months plus a sorted date index over all months."""
+
+    def __init__(self, storage: Storage):
+        self.storage = storage
+        # (year, month) -> (file version, parsed days)
+        self._months: Dict[Tuple[int, int], Tuple[Optional[Tuple[int, int]], Month]] = {}
+        # file -> {"version": [mtime_ns, size], "days": {day: count}}
+        self._files: Optional[Dict[str, dict]] = None
+        self._dates: List[date] = []
+        self._counts: List[int] = []
+        self._rules: Optional[List[PostingRule]] = None
+        # bumped on every rule change; expanded months are cached per version
+        self._rules_version = 0
+        self._rule_months: Dict[Tuple[int, int], Tuple[int, Month]] = {}
+        self._subscribers: List[Callable[[int, int], None]] = []
+
+    def subscribe(self, callback: Callable[[int, int], None]) -> None:
+        """Call ``callback(year, month)`` after postings of a month changed.
+
+        Rule changes affect every month and are reported as ``(0, 0)``.
+        """
+        if callback not in self._subscribers:
+            self._subscribers.append(callback)
+
+    def _notify(self, year: int, month: int) -> None:
+        for callback in list(self._subscribers):
+            callback(year, month)
+
+    # ------------------------------------------------------------------
+    # months
+    def month(self, year: int, month: int) -> Month:
+        """Return ``{day: [Posting]}``; the file is parsed only if it changed.
+
+        The returned structure is shared; use :meth:`save_month` to change it.
+        """
+        path = postings_path(year, month)
+        version = self.storage.version(path)
+        cached = self._months.get((year, month))
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        days = parse_month(self.storage.load_json(path, {}) if version else {})
+        self._months[(year, month)] = (version, days)
+        return days
+
+    def postings(self, year: int, month: int) -> Month:
+        """Stored and rule postings of a month, stored ones first."""
+        days = {d: list(p) for d, p in self.month(year, month).items()}
+        for d, postings in self.rule_postings(year, month).items():
+            days.setdefault(d, []).extend(postings)
+        return days
+
+    def postings_on(self, day: date) -> List[Posting]:
+        return self.month(day.year, day.month).get(day.day, []) + self.rule_postings(
+            day.year, day.month
+        ).get(day.day, [])
+
+    def save_month(self, year: int, month: int, days: Month) -> bool:
+        """Write a month in the list layout and update the date index."""
+        days = {d: list(p) for d, p in sorted(days.items()) if p}
+        path = postings_path(year, month)
+        written = self.storage.save_json(
+            path, {str(d): [p.to_dict() for p in postings] for d, postings in days.items()}
+        )
+        version = self.storage.version(path)
+        self._months[(year, month)] = (version, days)
+        if self._files is not None:
+            self._set_file(path, version, days)
+            self._rebuild()
+            self._persist()
+        self._notify(year, month)
+        return written
+
+    def invalidate(self):
+        """Forget parsed months and rules after files were rewritten elsewhere."""
+        self._months.clear()
+        self._rules = None
+        self._rules_version += 1
+        self._rule_months.clear()
+        self._notify(0, 0)
+
+    # ------------------------------------------------------------------
+    # date index
+    def refresh_index(self) -> bool:
+        """Bring the date index up to date; return True if it changed."""
+        if self._files is None:
+            stored = self.storage.load_json(INDEX_FILE, {}) or {}
+            self._files = stored if isinstance(stored, dict) else {}
+            changed = True
+        else:
+            changed = False
+        seen = set()
+        for p in self.storage.base_dir.glob("*/postings_*.json"):
+            rel = p.relative_to(self.storage.base_dir).as_posix()
+            m = _FILE_RE.match(rel)
+            if not m:
+                continue
+            seen.add(rel)
+            version = self.storage.version(rel)
+            entry = self._files.get(rel)
+            if entry is not None and tuple(entry.get("version") or ()) == version:
+                continue
+            self._set_file(rel, version, self.month(int(m.group(1)), int(m.group(2))))
+            changed = True
+        for rel in [r for r in self._files if r not in seen]:
+            del self._files[rel]
+            changed = True
+        if changed:
+            self._rebuild()
+            self._persist()
+        return changed
+
+    def _set_file(self, rel: str, version, days: Month):
+        self._files[rel] = {
+            "version": list(version) if version else None,
+            "days": {str(d): len(p) for d, p in days.items()},
+        }
+
+    def _rebuild(self):
+        pairs = []
+        for rel, entry in self._files.items():
+            m = _FILE_RE.match(rel)
+            if not m:
+                continue
+            year, month = int(m.group(1)), int(m.group(2))
+            for day, count in entry.get("days", {}).items():
+                try:
+                    pairs.append((date(year, month, int(day)), int(count)))
+                except ValueError:
+                    continue
+        pairs.sort()
+        self._dates = [d for d, _ in pairs]
+        self._counts = [c for _, c in pairs]
+
+    def _persist(self):
+        self.storage.save_json(INDEX_FILE, self._files)
+
+    def dates(self) -> List[date]:
+        """Sorted dates that have postings (index must be refreshed first)."""
+        return self._dates
+
+    def position(self, start: date) -> int:
+        """Index of the first posting date on or after ``start``."""
+        return bisect.bisect_left(self._dates, start)
+
+    def count_between(self, start: date, end: date) -> int:
+        """Number of stored postings with ``start <= date < end``."""
+        lo = bisect.bisect_left(self._dates, start)
+        hi = bisect.bisect_left(self._dates, end)
+        return sum(self._counts[lo:hi])
+
+    def next_date(self, after: date) -> Optional[date]:
+        """First date on or after ``after`` with stored or rule postings."""
+        i = self.position(after)
+        candidates = [self._dates[i]] if i < len(self._dates) else []
+        for rule in self.rules():
+            d = rule.next_date(after)
+            if d is not None:
+                candidates.append(d)
+        return min(candidates) if candidates else None
+
+    def upcoming(self, start: date, end: Optional[date] = None) -> Iterator[Tuple[date, Posting]]:
+        """Yield ``(date, posting)`` from ``start`` on, reading months lazily."""
+        day = self.next_date(start)
+        while day is not None and (end is None or day < end):
+            for posting in self.postings_on(day):
+                yield day, posting
+            day = self.next_date(day + timedelta(days=1))
+
+    # ------------------------------------------------------------------
+    # recurring rules
+    def rules(self) -> List[PostingRule]:
+        if self._rules is None:
+            raw = self.storage.load_json(RULES_FILE, []) or []
+            self._rules = [PostingRule.from_dict(r) for r in raw if isinstance(r, dict)]
+        return self._rules
+
+    def rule(self, rule_id: str) -> Optional[PostingRule]:
+        return next((r for r in self.rules() if r.id == rule_id), None)
+
+    def save_rules(self):
+        """Persist the rules and drop the expanded months."""
+        self.storage.save_json(RULES_FILE, [r.to_dict() for r in self.rules()])
+        self._rules_version += 1
+        self._rule_months.clear()
+        self._notify(0, 0)
+
+    def add_rule(self, rule: PostingRule):
+        self.rules().append(rule)
+        self.save_rules()
+
+    def remove_rule(self, rule_id: str):
+        self._rules = [r for r in self.rules() if r.id != rule_id]
+        self.save_rules()
+
+    def add_exception(self, rule_id: str, day: date):
+        """Skip the occurrence of a rule on ``day``."""
+        rule = self.rule(rule_id)
+        if rule is not None and day.isoformat() not in rule.exceptions:
+            rule.exceptions.append(day.isoformat())
+            self.save_rules()
+
+    def rule_postings(self, year: int, month: int) -> Month:
+        """Expand the rules for one month (cached until the rules change)."""
+        cached = self._rule_months.get((year, month))
+        if cached is not None and cached[0] == self._rules_version:
+            return cached[1]
+        first = date(year, month, 1)
+        last = date(year, month, calendar.monthrange(year, month)[1])
+        days: Month = {}
+        for rule in self.rules():
+            for day, n in rule.occurrences(first, last):
+                days.setdefault(day.day, []).append(
+                    Posting(rule.time, rule.work, rule.chapter_title(n), rule.priority, rule.id)
+                )
+        self._rule_months[(year, month)] = (self._rules_version, days)
+        return days
+
+
+__all__ = [
+    "INDEX_FILE",
+    "Posting",
+    "PostingsStore",
+    "parse_month",
+    "postings_path",
+]
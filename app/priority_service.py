@@ -49,9 +49,14 @@ def color_for(priority: int) -> str:
 def sort_tasks(tasks: Iterable) -> Iterable:
     return sorted(tasks, key=lambda t: getattr(t, "priority", 0), reverse=True)
 
+def matches_filter(task, filt: PriorityFilter) -> bool:
+    if filt == PriorityFilter.OneToTwo:
+        return getattr(task, "priority", 4) <= 2
+    return True
+
 def filter_tasks(tasks: Iterable, filt: PriorityFilter) -> Iterable:
     if filt == PriorityFilter.OneToTwo:
-        return [t for t in tasks if getattr(t, "priority", 4) <= 2]
+        return [t for t in tasks if matches_filter(t, filt)]
     return tasks
 
 _overrides: Dict[object, Tuple[QTimer, int]] = {}
@@ -0,0 +1,169 @@
+"""Startup phase timers.
+
+Code on the startup path wraps its steps in :func:`phase`; the timings are
+only collected while the global :data:`profiler` is enabled (``python -m
+app.main --profile-startup``), otherwise :func:`phase` costs a flag check.
+
+``python -m app.profiling`` starts the application in a fresh process on a
+synthetic data directory and fails when a phase exceeds its budget, so
+startup regressions show up as a non-zero exit code.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Tuple
+
+# Default per-phase budgets in milliseconds for the regression check
+PHASE_BUDGETS: Dict[str, float] = {
+    "import PySide6": 400,
+    "import app": 400,
+    "QApplication": 300,
+    "MainWindow.__init__": 600,
+    "stylesheet": 50,
+    "apply_prefs": 200,
+    "restoreState": 100,
+    "show": 500,
+    "grid rebuild": 300,
+    "_load_panels": 300,
+}
+
+
+class StartupProfiler:
+    """Collect nested ``(depth, name, seconds)`` phase timings."""
+
+    def __init__(self):
+        self.enabled = False
+        self.phases: List[Tuple[int, str, float]] = []
+        self._depth = 0
+        self._start = 0.0
+
+    def start(self) -> None:
+        self.enabled = True
+        self.phases = []
+        self._depth = 0
+        self._start = time.perf_counter()
+
+    def finish(self) -> float:
+        """Stop collecting and return the total time since :meth:`start`."""
+        self.enabled = False
+        return time.perf_counter() - self._start
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        if not self.enabled:
+            yield
+            return
+        slot = len(self.phases)
+        self.phases.append((self._depth, name, 0.0))
+        self._depth += 1
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._depth -= 1
+            if slot < len(self.phases):
+                self.phases[slot] = (self._depth, name, time.perf_counter() - start)
+
+    def timings(self) -> Dict[str, float]:
+        """Return the first timing of every phase in milliseconds."""
+        result: Dict[str, float] = {}
+        for _depth, name, secs in self.phases:
+            result.setdefault(name, secs * 1000)
+        return result
+
+    def table(self, total: float | None = None) -> str:
+        lines = [f"{'phase':<32} {'ms':>9}"]
+        for depth, name, secs in self.phases:
+            lines.append(f"{'  ' * depth + name:<32} {secs * 1000:9.1f}")
+        if total is not None:
+            lines.append(f"{'total':<32} {total * 1000:9.1f}")
+        return "\n".join(lines)
+
+
+profiler = StartupProfiler()
+
+
+def phase(name: str):
+    """Time the enclosed block as startup phase ``name``."""
+    return profiler.phase(name)
+
+
+# ----------------------------------------------------------------------
+# regression check
+def run_startup(data_root: Path) -> Dict[str, float]:
+    """Start the app in a fresh process inside ``data_root``; return timings."""
+    out = data_root / "startup.json"
+    # every run starts with default settings (all docks visible)
+    shutil.rmtree(data_root / "config", ignore_errors=True)
+    env = dict(
+        os.environ,
+        QT_QPA_PLATFORM=os.environ.get("QT_QPA_PLATFORM", "offscreen"),
+        # keep QSettings of the check away from the user's ones
+        XDG_CONFIG_HOME=str(data_root / "config"),
+        HOME=str(data_root),
+    )
+    root = Path(__file__).resolve().parent.parent
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(root), env.get("PYTHONPATH")]))
+    subprocess.run(
+        [sys.executable, "-m", "app.main", "--profile-startup",
+         "--profile-json", str(out), "--quit-after-startup"],
+        cwd=data_root, env=env, check=True, stdout=subprocess.DEVNULL,
+    )
+    return json.loads(out.read_text(encoding="utf-8"))
+
+
+def check(timings: Dict[str, float], budgets: Dict[str, float]) -> List[str]:
+    """Return a message for every phase over its budget."""
+    return [
+        f"{name}: {timings[name]:.1f}ms > {limit:.0f}ms"
+        for name, limit in budgets.items()
+        if name in timings and timings[name] > limit
+    ]
+
+
+def main(argv: List[str] | None = None) -> int:
+    from .bench import make_synthetic_data
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--works", type=int, default=6, help="works per day")
+    parser.add_argument("--runs", type=int, default=3, help="best of N starts")
+    parser.add_argument(
+        "--budget", action="append", default=[], metavar="PHASE=MS",
+        help="override the budget of a phase",
+    )
+    args = parser.parse_args(argv)
+
+    budgets = dict(PHASE_BUDGETS)
+    for item in args.budget:
+        name, _, ms = item.rpartition("=")
+        budgets[name] = float(ms)
+
+    best: Dict[str, float] = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        # the grid opens on January of its first selectable year
+        make_synthetic_data(root / "data", 2000, args.works)
+        for _ in range(max(1, args.runs)):
+            for name, ms in run_startup(root).items():
+                best[name] = min(ms, best.get(name, ms))
+
+    for name, ms in best.items():
+        limit = budgets.get(name)
+        print(f"{name:<24} {ms:9.1f}ms" + (f"  (budget {limit:.0f}ms)" if limit else ""))
+    failures = check(best, budgets)
+    for msg in failures:
+        print(f"FAIL {msg}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,291 @@
+"""Plan vs. postings reconciliation.
+
+For every work of a month the :class:`Reconciler` keeps the chapters done
+per day (from the shared month data) and the postings scheduled per day
+(stored and rule postings), and derives the running buffer of chapters that
+are ready but not posted yet.  A day is flagged for a work when a posting
+of it goes out that day while the postings scheduled up to that day exceed
+the chapters done up to it.  The buffer opens with the previous month's
+closing balance, carried month by month from the first month with data,
+so chapters finished ahead cover postings of any later month.  Closings of
+past months are cached per version of their month and postings files and
+dropped from an edited month onwards.
+
+Edits arrive as :class:`~app.events.WorkChange` deltas and postings changes
+as store notifications; only the works they touch are recomputed, so the
+pass can run live while typing.
+"""
+from __future__ import annotations
+
+import calendar
+import re
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from .events import ADDED, DAY, MONTH, REMOVED, WorkChange
+from .month_repository import MonthData, MonthRepository, Work
+from .postings_store import PostingsStore, postings_path
+
+_MONTH_FILE_RE = re.compile(r"^(?:postings_)?(\d{2})\.json$")
+
+Month = Tuple[int, int]
+
+
+def _next(year: int, month: int) -> Month:
+    return (year + 1, 1) if month == 12 else (year, month + 1)
+
+
+@dataclass
+class WorkBalance:
+    """Reconciliation result of one work for the month.
+
+    ``buffer[d - 1]`` is the number of ready-but-unposted chapters at the
+    end of day ``d``; ``short_days`` are the posting days where it is
+    negative.
+    """
+
+    buffer: List[int] = field(default_factory=list)
+    short_days: List[int] = field(default_factory=list)
+
+    @property
+    def closing(self) -> int:
+        return self.buffer[-1] if self.buffer else 0
+
+
+class Reconciler:
+    """Incrementally maintained buffers of the shown month, per work."""
+
+    def __init__(self, repository: MonthRepository, store: PostingsStore):
+        self.repository = repository
+        self.store = store
+        self.year = 0
+        self.month = 0
+        self._days = 0
+        # work -> chapters done / postings scheduled per day (index day - 1)
+        self._done: Dict[str, List[int]] = {}
+        self._posted: Dict[str, List[int]] = {}
+        # work -> buffer carried over from the previous month
+        self._opening: Dict[str, int] = {}
+        # past month -> (versions of its month and postings files, closing per work)
+        self._closings: Dict[Month, Tuple[tuple, Dict[str, int]]] = {}
+        # earliest month with data; None until scanned
+        self._first: Optional[Month] = None
+        self.balances: Dict[str, WorkBalance] = {}
+        # day -> works short on that day
+        self._short: Dict[int, Set[str]] = {}
+        self._subscribers: List[Callable[[Set[str]], None]] = []
+        repository.events.subscribe(self._on_work_changed)
+        store.subscribe(self._on_postings_changed)
+
+    def subscribe(self, callback: Callable[[Set[str]], None]) -> None:
+        """Call ``callback(works)`` with the works whose balance changed."""
+        if callback not in self._subscribers:
+            self._subscribers.append(callback)
+
+    # ------------------------------------------------------------------
+    def set_month(self, year: int, month: int):
+        """Compute the balances of every work of a month from scratch."""
+        self.year, self.month = year, month
+        self._days = calendar.monthrange(year, month)[1]
+        self._read_done()
+        self._posted = self._count_postings()
+        self._opening = self._count_opening()
+        self.balances = {}
+        self._short = {}
+        self._recompute(set(self._done) | set(self._posted))
+
+    def short_works(self, day: int) -> Set[str]:
+        """Works posted on ``day`` with fewer chapters done than posted."""
+        return self._short.get(day, set())
+
+    def short_days(self) -> List[int]:
+        return sorted(d for d, works in self._short.items() if works)
+
+    # ------------------------------------------------------------------
+    def _add_done(self, name: str, day: int, delta: int):
+        if not name or not delta or not 1 <= day <= self._days:
+            return
+        per_day = self._done.setdefault(name, [0] * self._days)
+        per_day[day - 1] += delta
+
+    def _read_done(self):
+        self._done = {}
+        for day, works in self.repository.get(self.year, self.month).items():
+            for w in works:
+                self._add_done(w.name, day, w.done)
+
+    def _recount_done(self):
+        """Re-read the chapters done after a bulk edit; recompute changed works."""
+        old = self._done
+        self._read_done()
+        done = self._done
+        self._recompute({n for n in set(old) | set(done) if old.get(n) != done.get(n)})
+
+    def _first_month(self) -> Month:
+        """Earliest month with works, postings or a posting rule start."""
+        if self._first is None:
+            months = [(self.year, self.month)]
+            for p in self.repository.storage.base_dir.glob("*/*.json"):
+                m = _MONTH_FILE_RE.match(p.name)
+                if m and p.parent.name.isdigit() and len(p.parent.name) == 4:
+                    months.append((int(p.parent.name), int(m.group(1))))
+            for rule in self.store.rules():
+                try:
+                    start = date.fromisoformat(rule.start)
+                except ValueError:
+                    continue
+                months.append((start.year, start.month))
+            self._first = min(months)
+        return self._first
+
+    def _month_data(self, year: int, month: int) -> MonthData:
+        if self.repository.is_loaded(year, month):
+            return self.repository.get(year, month)
+        # past months are only counted, not kept in the shared repository
+        raw = self.repository.storage.load_json(MonthRepository.rel_path(year, month), {}) or {}
+        return {int(d): [Work.from_dict(w) for w in wl] for d, wl in raw.items()}
+
+    def _close_month(self, year: int, month: int, opening: Dict[str, int]) -> Dict[str, int]:
+        """``opening`` plus the month's chapters done minus its postings."""
+        days = calendar.monthrange(year, month)[1]
+        closing = dict(opening)
+        for day, works in self._month_data(year, month).items():
+            if 1 <= day <= days:
+                for w in works:
+                    if w.name and w.done:
+                        closing[w.name] = closing.get(w.name, 0) + w.done
+        for day, postings in self.store.postings(year, month).items():
+            if 1 <= day <= days:
+                for p in postings:
+                    if p.work:
+                        closing[p.work] = closing.get(p.work, 0) - 1
+        return {n: v for n, v in closing.items() if v}
+
+    def _count_opening(self) -> Dict[str, int]:
+        """Closing balance of the previous month per work.
+
+        Walks the months from the first one with data; a month whose files
+        changed since its closing was cached is recounted, and so are all
+        the months after it.
+        """
+        storage = self.repository.storage
+        closing: Dict[str, int] = {}
+        stale = False
+        ym = self._first_month()
+        while ym < (self.year, self.month):
+            year, month = ym
+            versions = (
+                storage.version(MonthRepository.rel_path(year, month)),
+                storage.version(postings_path(year, month)),
+            )
+            cached = self._closings.get(ym)
+            if stale or cached is None or cached[0] != versions:
+                stale = True
+                self._closings[ym] = (versions, self._close_month(year, month, closing))
+            closing = self._closings[ym][1]
+            ym = _next(year, month)
+        return dict(closing)
+
+    def _forget_closings(self, year: int, month: int):
+        """Drop the cached closings from ``year``-``month`` onwards."""
+        for ym in [ym for ym in self._closings if ym >= (year, month)]:
+            del self._closings[ym]
+        if self._first is not None and (year, month) < self._first:
+            self._first = (year, month)
+
+    def _recount_opening(self):
+        old = self._opening
+        self._opening = opening = self._count_opening()
+        self._recompute({n for n in set(old) | set(opening) if old.get(n) != opening.get(n)})
+
+    def _count_postings(self) -> Dict[str, List[int]]:
+        posted: Dict[str, List[int]] = {}
+        for day, postings in self.store.postings(self.year, self.month).items():
+            if not 1 <= day <= self._days:
+                continue
+            for p in postings:
+                if p.work:
+                    posted.setdefault(p.work, [0] * self._days)[day - 1] += 1
+        return posted
+
+    def _recompute(self, names: Iterable[str]):
+        changed = set()
+        for name in names:
+            done = self._done.get(name)
+            posted = self._posted.get(name)
+            old = self.balances.get(name)
+            for day in old.short_days if old else ():
+                self._short[day].discard(name)
+            if not any(done or ()) and not any(posted or ()):
+                self._done.pop(name, None)
+                self._posted.pop(name, None)
+                if self.balances.pop(name, None) is not None:
+                    changed.add(name)
+                continue
+            buffer, short, running = [], [], self._opening.get(name, 0)
+            for i in range(self._days):
+                running += (done[i] if done else 0) - (posted[i] if posted else 0)
+                buffer.append(running)
+                if running < 0 and posted and posted[i]:
+                    short.append(i + 1)
+                    self._short.setdefault(i + 1, set()).add(name)
+            balance = WorkBalance(buffer, short)
+            if old != balance:
+                self.balances[name] = balance
+                changed.add(name)
+        if changed:
+            for callback in list(self._subscribers):
+                callback(changed)
+
+    def _on_work_changed(self, change: WorkChange):
+        if change.field in (ADDED, REMOVED, MONTH, "name", "done"):
+            self._forget_closings(change.year, change.month)
+            if self.year and (change.year, change.month) < (self.year, self.month):
+                self._recount_opening()
+                return
+        if (change.year, change.month) != (self.year, self.month):
+            return
+        w = change.work
+        if change.field == MONTH:
+            self._recount_done()
+        elif change.field in (ADDED, REMOVED):
+            sign = 1 if change.field == ADDED else -1
+            self._add_done(w.name, change.day, sign * w.done)
+            self._recompute({w.name})
+        elif change.field == "name":
+            self._add_done(change.old, change.day, -w.done)
+            self._add_done(change.new, change.day, w.done)
+            self._recompute({change.old, change.new} - {""})
+        elif change.field == "done":
+            self._add_done(w.name, change.day, change.new - change.old)
+            self._recompute({w.name})
+        elif change.field == DAY:
+            self._add_done(w.name, change.old, -w.done)
+            self._add_done(w.name, change.new, w.done)
+            self._recompute({w.name})
+
+    def _on_postings_changed(self, year: int, month: int):
+        if (year, month) == (0, 0):
+            # rules changed: every month may post differently
+            self._closings.clear()
+            self._first = None
+        else:
+            self._forget_closings(year, month)
+        if not self.year:
+            return
+        if (year, month) < (self.year, self.month):
+            self._recount_opening()
+            if (year, month) != (0, 0):
+                return
+        elif (year, month) != (self.year, self.month):
+            return
+        posted = self._count_postings()
+        names = {
+            n for n in set(posted) | set(self._posted) if posted.get(n) != self._posted.get(n)
+        }
+        self._posted = posted
+        self._recompute(names)
+
+
+__all__ = ["WorkBalance", "Reconciler"]
@@ -0,0 +1,273 @@
+"""Full-text search over the whole data directory.
+
+:class:`SearchIndex` is an inverted index of work names and comments
+(``YYYY/MM.json``), posting chapters (``YYYY/postings_MM.json``) and top
+statuses (``YYYY/top_month_MM.json``), together with the work names found in
+every file including the time sheets (``YYYY/time_MM.json``), so
+:meth:`SearchIndex.files_of` can tell which files mention a work without
+reading the archive.  It is persisted in
+``search_index.json`` together with the version of every indexed file:
+files written by the app are re-indexed from the saved data right away
+(:meth:`Storage.subscribe`), files changed behind its back are found by
+stat calls on the next :meth:`SearchIndex.refresh`.  Lookups bisect a
+sorted term list, so every query word matches as a prefix.
+"""
+from __future__ import annotations
+
+import bisect
+import heapq
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from .postings_store import parse_month
+from .storage import Storage
+
+INDEX_FILE = "search_index.json"
+
+_FILE_RE = re.compile(r"^(\d{4})/(?:(postings|top_month|time)_)?(\d{2})\.json$")
+_WORD_RE = re.compile(r"\w+")
+
+# document kinds
+WORK = "work"
+COMMENT = "comment"
+POSTING = "posting"
+STATUS = "status"
+
+KIND_LABELS = {WORK: "работа", COMMENT: "комментарий", POSTING: "постинг", STATUS: "статус"}
+
+Doc = Tuple[int, str, str]  # (day, kind, text); day 0 for month-level docs
+
+
+def _month_of(rel: str) -> Tuple[int, int]:
+    m = _FILE_RE.match(rel)
+    return int(m.group(1)), int(m.group(3))
+
+
+def tokenize(text: str) -> List[str]:
+    return _WORD_RE.findall(text.casefold().replace("ё", "е"))
+
+
+@dataclass(frozen=True)
+class SearchHit:
+    year: int
+    month: int
+    day: int
+    kind: str
+    text: str
+
+
+def _docs_of(kind: Optional[str], data: Any) -> List[Doc]:
+    """Extract the searchable documents of one month file."""
+    docs: List[Doc] = []
+    if not isinstance(data, dict):
+        return docs
+    if kind is None:
+        for day, works in data.items():
+            if not isinstance(works, list):
+                continue
+            for w in works:
+                if not isinstance(w, dict):
+                    continue
+                if w.get("name"):
+                    docs.append((int(day), WORK, str(w["name"])))
+                if w.get("comment"):
+                    docs.append((int(day), COMMENT, str(w["comment"])))
+    elif kind == "postings":
+        for day, postings in parse_month(data).items():
+            for p in postings:
+                if p.work or p.chapter:
+                    docs.append((day, POSTING, f"{p.work} — {p.chapter}".strip(" —")))
+    elif kind == "top_month":
+        for name, row in data.items():
+            if name != "__form__" and isinstance(row, dict) and row.get("status"):
+                docs.append((0, STATUS, f"{name}: {row['status']}"))
+    # the same name on many days of a month is one hit per day, not per entry
+    return sorted(set(docs))
+
+
+def _works_of(kind: Optional[str], data: Any) -> List[str]:
+    """Names of the works a month file mentions."""
+    names: Set[str] = set()
+    if not isinstance(data, dict):
+        return []
+    if kind is None:
+        for works in data.values():
+            if isinstance(works, list):
+                names.update(str(w.get("name", "")) for w in works if isinstance(w, dict))
+    elif kind == "postings":
+        for postings in parse_month(data).values():
+            names.update(p.work for p in postings)
+    else:
+        names.update(k for k in data if k != "__form__")
+        form = data.get("__form__")
+        if isinstance(form, dict) and form.get("work"):
+            names.add(str(form["work"]))
+    names.discard("")
+    return sorted(names)
+
+
+class SearchIndex:
+    """Persistent inverted index over the month files."""
+
+    def __init__(self, storage: Storage):
+        self.storage = storage
+        # file -> {"version": [mtime_ns, size], "docs": [[day, kind, text]],
+        #          "works": [name]}
+        self._files: Optional[Dict[str, dict]] = None
+        # term -> {(file, doc number)}
+        self._terms: Dict[str, Set[Tuple[str, int]]] = {}
+        # work name -> files mentioning it
+        self._works: Dict[str, Set[str]] = {}
+        self._sorted: Optional[List[str]] = None
+        self.dirty = False
+        storage.subscribe(self._on_saved)
+
+    # ------------------------------------------------------------------
+    def refresh(self) -> bool:
+        """Index files changed since they were last seen; True if any."""
+        if self._files is None:
+            self._load()
+        changed = False
+        seen = set()
+        for p in self.storage.base_dir.glob("*/*.json"):
+            rel = p.relative_to(self.storage.base_dir).as_posix()
+            m = _FILE_RE.match(rel)
+            if not m:
+                continue
+            seen.add(rel)
+            version = self.storage.version(rel)
+            entry = self._files.get(rel)
+            if (
+                entry is not None
+                and "works" in entry
+                and tuple(entry.get("version") or ()) == version
+            ):
+                continue
+            self._index_file(rel, m.group(2), self.storage.load_json(rel, {}), version)
+            changed = True
+        for rel in [r for r in self._files if r not in seen]:
+            self._drop_file(rel)
+            del self._files[rel]
+            changed = True
+        if changed:
+            self.save()
+        return changed
+
+    def save(self):
+        """Persist the index if it changed since the last save."""
+        if self._files is not None and self.dirty:
+            self.storage.save_json(INDEX_FILE, self._files)
+            self.dirty = False
+
+    def _load(self):
+        stored = self.storage.load_json(INDEX_FILE, {}) or {}
+        self._files = {}
+        for rel, entry in (stored if isinstance(stored, dict) else {}).items():
+            if isinstance(entry, dict):
+                self._files[rel] = entry
+                self._add_terms(rel, entry.get("docs", []))
+                self._add_works(rel, entry.get("works", []))
+
+    def _on_saved(self, rel_path: str, data: Any):
+        m = _FILE_RE.match(rel_path)
+        if not m or self._files is None:
+            return
+        self._index_file(rel_path, m.group(2), data, self.storage.version(rel_path))
+
+    # ------------------------------------------------------------------
+    def _index_file(self, rel: str, kind: Optional[str], data: Any, version):
+        if rel in self._files:
+            self._drop_file(rel)
+        docs = [list(d) for d in _docs_of(kind, data)]
+        works = _works_of(kind, data)
+        self._files[rel] = {
+            "version": list(version) if version else None,
+            "docs": docs,
+            "works": works,
+        }
+        self._add_terms(rel, docs)
+        self._add_works(rel, works)
+        self.dirty = True
+
+    def _add_works(self, rel: str, works: List[str]):
+        for name in works:
+            self._works.setdefault(name, set()).add(rel)
+
+    def _add_terms(self, rel: str, docs: List[list]):
+        for i, (_day, _kind, text) in enumerate(docs):
+            for term in tokenize(text):
+                refs = self._terms.get(term)
+                if refs is None:
+                    refs = self._terms[term] = set()
+                    self._sorted = None
+                refs.add((rel, i))
+
+    def _drop_file(self, rel: str):
+        for name in self._files[rel].get("works", []):
+            files = self._works.get(name)
+            if files is not None:
+                files.discard(rel)
+                if not files:
+                    del self._works[name]
+        for i, (_day, _kind, text) in enumerate(self._files[rel].get("docs", [])):
+            for term in tokenize(text):
+                refs = self._terms.get(term)
+                if refs is None:
+                    continue
+                refs.discard((rel, i))
+                if not refs:
+                    del self._terms[term]
+                    self._sorted = None
+
+    # ------------------------------------------------------------------
+    def files_of(self, name: str) -> List[str]:
+        """Month files mentioning the work ``name``, oldest first."""
+        self.refresh()
+        return sorted(self._works.get(name, ()))
+
+    def work_names(self) -> List[str]:
+        """Every work name found in the archive."""
+        if self._files is None:
+            self.refresh()
+        return sorted(self._works)
+
+    def search(self, query: str, limit: int = 200) -> List[SearchHit]:
+        """Documents containing every word of ``query`` as a word prefix.
+
+        Only the first call scans the archive; callers starting a new
+        search call :meth:`refresh` to catch files changed on disk since.
+        """
+        if self._files is None:
+            self.refresh()
+        words = tokenize(query)
+        if not words:
+            return []
+        if self._sorted is None:
+            self._sorted = sorted(self._terms)
+        found: Optional[Set[Tuple[str, int]]] = None
+        for word in sorted(words, key=len, reverse=True):
+            refs: Set[Tuple[str, int]] = set()
+            i = bisect.bisect_left(self._sorted, word)
+            while i < len(self._sorted) and self._sorted[i].startswith(word):
+                refs |= self._terms[self._sorted[i]]
+                i += 1
+            found = refs if found is None else found & refs
+            if not found:
+                return []
+        # newest first; only the returned hits are built
+        months = {rel: _month_of(rel) for rel in {rel for rel, _ in found}}
+        files = self._files
+
+        def key(ref):
+            rel, i = ref
+            return months[rel], files[rel]["docs"][i]
+
+        hits = []
+        for rel, i in heapq.nlargest(limit, found, key=key):
+            day, kind, text = files[rel]["docs"][i]
+            hits.append(SearchHit(*months[rel], day, kind, text))
+        return hits
+
+
+__all__ = ["INDEX_FILE", "KIND_LABELS", "SearchHit", "SearchIndex", "tokenize"]
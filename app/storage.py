@@ -1,36 +1,102 @@
+import hashlib
 import json
 from pathlib import Path
-from typing import Union, Any
+from typing import Any, Callable, Dict, List, Tuple, Union
+
+
+def _digest(data: bytes) -> str:
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
 
 
 class Storage:
-    """Helper around a directory used for persisting JSON files."""
+    """Helper around a directory used for persisting JSON files.
+
+    The content hash of every file read or written is remembered, and
+    :meth:`save_json` skips the write when the serialized data matches what
+    is already on disk.  This keeps write volume (and churn in synced data
+    folders) down to actual changes.
+    """
 
     def __init__(self, base_dir: Union[Path, str]):
+        self._subscribers: List[Callable[[str, Any], None]] = []
         self.set_base_dir(base_dir)
 
+    def subscribe(self, callback: Callable[[str, Any], None]) -> None:
+        """Call ``callback(rel_path, data)`` after every actual write."""
+        if callback not in self._subscribers:
+            self._subscribers.append(callback)
+
     def set_base_dir(self, base_dir: Union[Path, str]):
         """Change the base directory where files are stored."""
         self.base_dir = Path(base_dir)
         self.base_dir.mkdir(parents=True, exist_ok=True)
+        # path -> (content hash, (mtime_ns, size)) of the last read/write
+        self._hashes: Dict[Path, Tuple[str, Tuple[int, int]]] = {}
+        self.writes = 0
+        self.skipped_writes = 0
 
     def path(self, *parts):
         p = self.base_dir.joinpath(*parts)
         p.parent.mkdir(parents=True, exist_ok=True)
         return p
 
-    def save_json(self, rel_path: str, data: Any):
+    def save_json(self, rel_path: str, data: Any) -> bool:
+        """Write ``data``; return False when the file already held it."""
         p = self.path(rel_path)
-        p.write_text(
-            json.dumps(data, ensure_ascii=False, indent=2),
-            encoding="utf-8",
-        )
+        raw = json.dumps(data, ensure_ascii=False, indent=2).encode("utf-8")
+        digest = _digest(raw)
+        if self._disk_digest(p) == digest:
+            self.skipped_writes += 1
+            return False
+        p.write_bytes(raw)
+        self._remember(p, digest)
+        self.writes += 1
+        for callback in list(self._subscribers):
+            callback(rel_path, data)
+        return True
+
+    def _disk_digest(self, p: Path):
+        """Hash of the file on disk, re-read only if it changed since last seen."""
+        try:
+            st = p.stat()
+        except OSError:
+            return None
+        cached = self._hashes.get(p)
+        if cached is not None and cached[1] == (st.st_mtime_ns, st.st_size):
+            return cached[0]
+        try:
+            digest = _digest(p.read_bytes())
+        except OSError:
+            return None
+        self._remember(p, digest)
+        return digest
+
+    def _remember(self, p: Path, digest: str):
+        try:
+            st = p.stat()
+        except OSError:
+            return
+        self._hashes[p] = (digest, (st.st_mtime_ns, st.st_size))
+
+    def version(self, rel_path: str):
+        """Return ``(mtime_ns, size)`` of a file, or None when it is missing.
+
+        Cheap enough to poll; callers use it to tell whether a cached parse
+        of the file is still current.
+        """
+        try:
+            st = self.base_dir.joinpath(rel_path).stat()
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
 
     def load_json(self, rel_path: str, default=None):
         p = self.path(rel_path)
         if p.exists():
             try:
-                return json.loads(p.read_text(encoding="utf-8"))
+                raw = p.read_bytes()
+                self._remember(p, _digest(raw))
+                return json.loads(raw.decode("utf-8"))
             except Exception:
                 return default
         return default
@@ -1,48 +1,109 @@
-from PySide6.QtCore import Qt
-from PySide6.QtGui import QColor
-from PySide6.QtWidgets import QGraphicsBlurEffect
+import random
+from functools import lru_cache
 
+from PySide6.QtCore import QEvent, QObject, QRectF, Qt
+from PySide6.QtGui import QColor, QImage, QPainter, QPixmap
+from PySide6.QtWidgets import (
+    QGraphicsBlurEffect,
+    QGraphicsPixmapItem,
+    QGraphicsScene,
+    QWidget,
+)
 
-class GlassBlurEffect(QGraphicsBlurEffect):
-    """Blur effect with optional texture and sharpness overlays."""
+GLASS_TILE = 64
 
-    def __init__(self, texture: int = 0, sharpness: int = 0, parent=None):
-        super().__init__(parent)
-        self._texture = max(0, texture)
-        self._sharpness = max(0, sharpness)
 
-    def setTexture(self, value: int) -> None:
-        self._texture = max(0, value)
+@lru_cache(maxsize=8)
+def _frost_tile(blur: int, texture: int) -> QPixmap:
+    """Return a blurred noise tile used as the frosted glass grain."""
+    rng = random.Random(GLASS_TILE)
+    img = QImage(GLASS_TILE, GLASS_TILE, QImage.Format_ARGB32_Premultiplied)
+    img.fill(Qt.transparent)
+    alpha = max(0, min(255, texture * 3))
+    for y in range(GLASS_TILE):
+        for x in range(GLASS_TILE):
+            v = rng.randrange(256)
+            img.setPixelColor(x, y, QColor(v, v, v, alpha))
+    if blur <= 0:
+        return QPixmap.fromImage(img)
 
-    def setSharpness(self, value: int) -> None:
-        self._sharpness = max(0, value)
+    # Blur once through a scene instead of on every window repaint
+    scene = QGraphicsScene()
+    item = QGraphicsPixmapItem(QPixmap.fromImage(img))
+    effect = QGraphicsBlurEffect()
+    effect.setBlurRadius(blur)
+    item.setGraphicsEffect(effect)
+    scene.addItem(item)
+    out = QImage(GLASS_TILE, GLASS_TILE, QImage.Format_ARGB32_Premultiplied)
+    out.fill(Qt.transparent)
+    painter = QPainter(out)
+    scene.render(painter, QRectF(out.rect()), QRectF(0, 0, GLASS_TILE, GLASS_TILE))
+    painter.end()
+    return QPixmap.fromImage(out)
 
-    def draw(self, painter):  # type: ignore[override]
-        # First let the base class draw the blurred source
-        super().draw(painter)
 
-        rect = self.boundingRect()
+@lru_cache(maxsize=4)
+def glass_backdrop(
+    width: int, height: int, base: str, blur: int, texture: int, sharpness: int
+) -> QPixmap:
+    """Render the glass backdrop for a window size, theme colour and params."""
+    pix = QPixmap(max(1, width), max(1, height))
+    pix.fill(QColor(base))
+    painter = QPainter(pix)
+    if texture:
+        painter.drawTiledPixmap(pix.rect(), _frost_tile(blur, texture))
+        # Overlay a translucent white to emulate frosted texture
+        painter.fillRect(pix.rect(), QColor(255, 255, 255, max(0, min(255, texture))))
+    if sharpness:
+        # Draw a subtle border to give an impression of sharpness
+        painter.setPen(QColor(255, 255, 255, max(0, min(255, sharpness))))
+        painter.setBrush(Qt.NoBrush)
+        painter.drawRect(pix.rect().adjusted(0, 0, -1, -1))
+    painter.end()
+    return pix
 
-        if self._texture:
-            # Overlay a translucent white to emulate frosted texture
-            alpha = max(0, min(255, self._texture))
-            painter.fillRect(rect, QColor(255, 255, 255, alpha))
 
-        if self._sharpness:
-            # Draw a subtle border to give an impression of sharpness
-            pen = painter.pen()
-            pen.setColor(QColor(255, 255, 255, max(0, min(255, self._sharpness))))
-            painter.setPen(pen)
-            painter.setBrush(Qt.NoBrush)
-            painter.drawRect(rect)
+class GlassBackdrop(QWidget):
+    """Bottom-most child painting the cached glass backdrop of its window."""
+
+    def __init__(self, window: QWidget):
+        super().__init__(window)
+        self.setObjectName("glassBackdrop")
+        self.setAttribute(Qt.WA_TransparentForMouseEvents)
+        self.setAttribute(Qt.WA_OpaquePaintEvent)
+        self.params = ("#151718", 6, 2, 5)
+        window.installEventFilter(self)
+        self.setGeometry(window.rect())
+        self.lower()
+
+    def eventFilter(self, obj: QObject, event: QEvent) -> bool:
+        if event.type() == QEvent.Resize:
+            self.setGeometry(self.parentWidget().rect())
+            self.lower()
+        return False
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.drawPixmap(
+            event.rect(),
+            glass_backdrop(self.width(), self.height(), *self.params),
+            event.rect(),
+        )
 
 # Styles used across the application
-MARK_STYLESHEET_TEMPLATE = "background:{}; border-radius:4px;"
-DAY_PLACEHOLDER_STYLESHEET = "color: gray;"
-ADULT_LABEL_STYLESHEET = "color: red;"
+DAY_PLACEHOLDER_COLOR = "gray"
+ADULT_LABEL_COLOR = "red"
+# day caption of the grid when postings exceed chapters done
+SHORTAGE_COLOR = "#e05555"
+# text of an input holding an invalid value (e.g. a filter expression)
+ERROR_TEXT_COLOR = "#e05555"
 
+@lru_cache(maxsize=16)
 def base_stylesheet(accent: str = "#00E5FF", neon_size: int = 8, neon_intensity: int = 60):
-    '''Return a base dark stylesheet with rounded controls and a pseudo-neon focus.'''
+    '''Return a base dark stylesheet with rounded controls and a pseudo-neon focus.
+
+    Results are memoized per parameter tuple.
+    '''
     # Neon via shadow-like glow using box-shadow is not native in Qt stylesheets.
     # We emulate with focus ring and accent borders.
     col = QColor(accent)
@@ -117,8 +178,12 @@ def base_stylesheet(accent: str = "#00E5FF", neon_size: int = 8, neon_intensity:
     """
 
 
+@lru_cache(maxsize=16)
 def light_stylesheet(accent: str = "#000000", neon_size: int = 8, neon_intensity: int = 60):
-    """Return a simple light stylesheet with white backgrounds and black text."""
+    """Return a simple light stylesheet with white backgrounds and black text.
+
+    Results are memoized per parameter tuple.
+    """
     col = QColor(accent)
     shadow = f"rgba({col.red()}, {col.green()}, {col.blue()}, {neon_intensity/100})"
     return f"""
@@ -189,17 +254,31 @@ def light_stylesheet(accent: str = "#000000", neon_size: int = 8, neon_intensity
         border-color: {accent};
     }}
     """
-    
+
+
+# Appended to the theme stylesheet while glass is enabled: the window and
+# the top-level containers let the backdrop show through
+GLASS_STYLESHEET = """
+    QMainWindow, QDockWidget, QStatusBar,
+    DailyGridPanel, TopMonthPanel, PostingsPanel, StatsPanel {
+        background-color: transparent;
+    }
+"""
+
+THEME_BACKGROUNDS = {"dark": "#151718", "light": "#FFFFFF"}
+
+
 def apply_glass_effect(window, enabled: bool, opacity: float = 0.9,
                        blur: int | None = None, texture: int | None = None,
                        sharpness: int | None = None):
     """Apply a simple glass-like effect.
 
-    Besides adjusting window opacity, this helper stores the desired blur,
-    texture and sharpness values and applies a ``GlassBlurEffect`` to the
-    window.  Parameters are optional; if omitted the values are read from the
-    window's ``prefs`` dictionary when available.  When the underlying Qt
-    features are unavailable, the effect is safely disabled.
+    Besides adjusting window opacity, this helper shows a
+    :class:`GlassBackdrop` under the window contents.  The backdrop is
+    rendered once per window size, theme and parameter set, so repaints of
+    the widgets on top of it cost the same as without glass.  Parameters are
+    optional; if omitted the values are read from the window's ``prefs``
+    dictionary when available.
     """
 
     prefs = getattr(window, "prefs", {})
@@ -210,20 +289,21 @@ def apply_glass_effect(window, enabled: bool, opacity: float = 0.9,
     if sharpness is None:
         sharpness = prefs.get("glass_sharpness", 5)
 
+    backdrop = window.findChild(GlassBackdrop, "glassBackdrop")
     if enabled:
         window.setWindowOpacity(opacity)
-        try:
-            effect = GlassBlurEffect(texture=texture, sharpness=sharpness)
-            effect.setBlurRadius(blur)
-            window.setGraphicsEffect(effect)
-        except Exception:
-            # If the effect cannot be created (e.g. missing Qt features),
-            # disable it gracefully
-            window.setWindowOpacity(1.0)
-            window.setGraphicsEffect(None)
+        if backdrop is None:
+            backdrop = GlassBackdrop(window)
+        base = THEME_BACKGROUNDS.get(prefs.get("theme", "dark"), THEME_BACKGROUNDS["dark"])
+        params = (base, int(blur), int(texture), int(sharpness))
+        if backdrop.params != params:
+            backdrop.params = params
+            backdrop.update()
+        backdrop.show()
     else:
         window.setWindowOpacity(1.0)
-        window.setGraphicsEffect(None)
+        if backdrop is not None:
+            backdrop.hide()
 
     # Persist values on the window for future calls
     prefs["glass_blur"] = blur
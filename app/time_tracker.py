@@ -0,0 +1,150 @@
+"""Session stopwatch and per-work time tracking.
+
+:class:`TimeTracker` counts the time the window is visible, attributes it to
+the work selected in the grid and writes the totals to
+``YYYY/time_MM.json`` (``{work name: seconds}``) in batches.  The display is
+a :class:`StopwatchLabel` that only repaints its own fixed-size rect.
+"""
+from __future__ import annotations
+
+import time
+from datetime import date
+from typing import Dict, Tuple
+
+from PySide6.QtCore import QObject, QSize, Qt, QTimer
+from PySide6.QtGui import QPainter
+from PySide6.QtWidgets import QSizePolicy, QWidget
+
+from .storage import Storage
+
+# Pending seconds are written at most this often
+FLUSH_INTERVAL = 60
+
+
+def format_duration(secs: int) -> str:
+    d = secs // 86400
+    h = (secs % 86400) // 3600
+    m = (secs % 3600) // 60
+    s = secs % 60
+    return f"{d:02d}:{h:02d}:{m:02d}:{s:02d}"
+
+
+class StopwatchLabel(QWidget):
+    """Fixed-size ``DD:HH:MM:SS`` display.
+
+    The size is derived from the widest text, so a new value never triggers
+    a relayout of the status bar and only the label's rect is repainted.
+    """
+
+    def __init__(self, parent: QWidget | None = None):
+        super().__init__(parent)
+        self._text = format_duration(0)
+        self.setSizePolicy(QSizePolicy.Fixed, QSizePolicy.Fixed)
+
+    def sizeHint(self) -> QSize:
+        fm = self.fontMetrics()
+        return QSize(fm.horizontalAdvance("00:00:00:00") + 8, fm.height() + 4)
+
+    def minimumSizeHint(self) -> QSize:
+        return self.sizeHint()
+
+    def text(self) -> str:
+        return self._text
+
+    def set_seconds(self, secs: int):
+        text = format_duration(secs)
+        if text != self._text:
+            self._text = text
+            self.update()
+
+    def changeEvent(self, event):
+        super().changeEvent(event)
+        self.updateGeometry()
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.setPen(self.palette().windowText().color())
+        painter.drawText(self.rect(), Qt.AlignLeft | Qt.AlignVCenter, self._text)
+
+
+class TimeTracker(QObject):
+    """Count session time and record it per work in batched writes."""
+
+    def __init__(self, storage: Storage, label: StopwatchLabel, parent: QObject | None = None):
+        super().__init__(parent)
+        self.storage = storage
+        self.label = label
+        self.work = ""
+        self.session = 0.0
+        self._last = time.monotonic()
+        self._last_flush = self._last
+        # {(year, month): {work: seconds}} not yet written
+        self._pending: Dict[Tuple[int, int], Dict[str, float]] = {}
+        self._timer = QTimer(self)
+        self._timer.setInterval(1000)
+        self._timer.timeout.connect(self._tick)
+
+    # ------------------------------------------------------------------
+    def is_running(self) -> bool:
+        return self._timer.isActive()
+
+    def resume(self):
+        if self._timer.isActive():
+            return
+        self._last = time.monotonic()
+        self._timer.start()
+
+    def pause(self):
+        """Stop counting (window hidden/minimized) and write pending time."""
+        if not self._timer.isActive():
+            return
+        self._account()
+        self._timer.stop()
+        self.flush()
+
+    def set_work(self, name: str):
+        """Attribute time from now on to ``name`` ("" records nothing)."""
+        if name == self.work:
+            return
+        if self._timer.isActive():
+            self._account()
+        self.work = name
+
+    def rename_work(self, old: str, new: str):
+        """Count pending and further time of ``old`` as ``new``."""
+        for works in self._pending.values():
+            if old in works:
+                works[new] = works.get(new, 0.0) + works.pop(old)
+        if self.work == old:
+            self.work = new
+
+    # ------------------------------------------------------------------
+    def _account(self):
+        now = time.monotonic()
+        delta = now - self._last
+        self._last = now
+        self.session += delta
+        if self.work:
+            today = date.today()
+            month = self._pending.setdefault((today.year, today.month), {})
+            month[self.work] = month.get(self.work, 0.0) + delta
+
+    def _tick(self):
+        self._account()
+        self.label.set_seconds(int(self.session))
+        if self._last - self._last_flush >= FLUSH_INTERVAL:
+            self.flush()
+
+    def flush(self):
+        """Add the pending seconds to the month files."""
+        self._last_flush = time.monotonic()
+        pending, self._pending = self._pending, {}
+        for (year, month), works in pending.items():
+            path = f"{year}/time_{month:02d}.json"
+            data = self.storage.load_json(path, {}) or {}
+            for name, secs in works.items():
+                data[name] = round(data.get(name, 0) + secs, 1)
+            self.storage.save_json(path, data)
+
+
+__all__ = ["FLUSH_INTERVAL", "format_duration", "StopwatchLabel", "TimeTracker"]
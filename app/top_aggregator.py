@@ -4,9 +4,16 @@ The :class:`TopAggregator` reads monthly files produced by
 :class:`~app.panels.top_month_panel.TopMonthPanel` via :meth:`save_month`
 and combines them over arbitrary periods.  The resulting data structure is
 suitable for displaying in future reporting windows.
+
+Parsed months are kept per file version, so the per-work monthly series
+used by the charts (:meth:`TopAggregator.work_series`) are served from
+memory and only changed month files are read again.  Months written
+through the shared :class:`Storage` are dropped from the cache right away,
+so a rewrite is seen even when it keeps the file's size and mtime.
 """
 from __future__ import annotations
 
+import re
 from dataclasses import dataclass
 from datetime import date
 from pathlib import Path
@@ -14,6 +21,8 @@ from typing import Dict, Iterable, List, Optional, Tuple
 
 from .storage import Storage
 
+_FILE_RE = re.compile(r"^(\d{4})/top_month_(\d{2})\.json$")
+
 
 @dataclass
 class Stats:
@@ -33,6 +42,10 @@ class Stats:
         self.likes += other.likes
 
 
+# Stats fields that can be charted per work
+SERIES_METRICS = ("done", "profit", "views", "likes")
+
+
 def _to_int(value) -> int:
     try:
         return int(value)
@@ -45,12 +58,29 @@ class TopAggregator:
 
     def __init__(self, storage: Optional[Storage] = None, base_dir: Optional[Path] = None):
         self.storage = storage or Storage(base_dir or Path("data"))
+        # (year, month) -> (file version, parsed stats)
+        self._months: Dict[Tuple[int, int], Tuple[Optional[Tuple[int, int]], Dict[str, Stats]]] = {}
+        self.storage.subscribe(self._on_saved)
+
+    def _on_saved(self, rel_path: str, data) -> None:
+        m = _FILE_RE.match(rel_path)
+        if m:
+            self._months.pop((int(m.group(1)), int(m.group(2))), None)
 
     # ------------------------------------------------------------------
     # loading helpers
     def load_month(self, year: int, month: int) -> Dict[str, Stats]:
-        """Load statistics for a specific month."""
-        raw = self.storage.load_json(f"{year}/top_month_{month:02d}.json", {}) or {}
+        """Load statistics for a specific month.
+
+        The result is cached until the month file changes on disk and must
+        not be modified by callers.
+        """
+        path = f"{year}/top_month_{month:02d}.json"
+        version = self.storage.version(path)
+        cached = self._months.get((year, month))
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        raw = (self.storage.load_json(path, {}) or {}) if version else {}
         result: Dict[str, Stats] = {}
         if isinstance(raw, dict):
             # new format may store meta information under special key
@@ -64,8 +94,34 @@ class TopAggregator:
                     views=_to_int(info.get("views")),
                     likes=_to_int(info.get("likes")),
                 )
+        self._months[(year, month)] = (version, result)
         return result
 
+    def years(self) -> List[int]:
+        """Return the years that have a data folder, ascending."""
+        return sorted(
+            int(p.name) for p in self.storage.base_dir.iterdir()
+            if p.is_dir() and p.name.isdigit()
+        )
+
+    # ------------------------------------------------------------------
+    # per-work series
+    def work_series(
+        self, metric: str, months: Iterable[Tuple[int, int]]
+    ) -> Dict[str, List[int]]:
+        """Return ``{work: [value per month]}`` of ``metric`` over ``months``.
+
+        Months in which a work does not appear count as 0.
+        """
+        if metric not in SERIES_METRICS:
+            raise ValueError(f"unknown metric: {metric}")
+        months = list(months)
+        series: Dict[str, List[int]] = {}
+        for i, (year, month) in enumerate(months):
+            for name, stats in self.load_month(year, month).items():
+                series.setdefault(name, [0] * len(months))[i] = getattr(stats, metric)
+        return series
+
     # ------------------------------------------------------------------
     # aggregation
     def aggregate_months(self, months: Iterable[Tuple[int, int]]) -> List[Tuple[str, Stats]]:
@@ -102,4 +158,4 @@ class TopAggregator:
         return self.aggregate_months(months)
 
 
-__all__ = ["Stats", "TopAggregator"]
+__all__ = ["SERIES_METRICS", "Stats", "TopAggregator"]
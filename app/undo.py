@@ -0,0 +1,184 @@
+"""Undo/redo of month edits.
+
+:class:`UndoStack` listens to the :class:`~app.events.WorkChange` events of
+the shared :class:`~app.month_repository.MonthRepository`, so every panel
+editing through the repository shares one history without recording
+anything itself.  A command is the list of changes of one edit: the work,
+the field and its old and new value, never a copy of the month.  A bulk
+edit (:meth:`MonthRepository.batch`) is one command; repeated edits of the
+same field of the same work in quick succession, as when typing in a cell,
+are merged into one.
+
+Undo and redo replay the changes through the repository's own edit
+methods, so the panels repaint from the published events as for any edit,
+and then save the touched months.
+"""
+from __future__ import annotations
+
+import time
+from contextlib import ExitStack
+from dataclasses import dataclass, field, replace
+from typing import Callable, List, Optional, Set, Tuple
+
+from .events import ADDED, DAY, MONTH, REMOVED, WorkChange
+from .month_repository import MonthRepository
+
+# edits of one cell closer together than this are one command (seconds)
+MERGE_INTERVAL = 2.0
+# commands kept for undo
+LIMIT = 200
+
+
+@dataclass(slots=True)
+class Command:
+    """Changes of one user edit, in the order they were made."""
+
+    changes: List[WorkChange]
+    time: float = field(default_factory=time.monotonic)
+
+    @property
+    def months(self) -> Set[Tuple[int, int]]:
+        return {(c.year, c.month) for c in self.changes}
+
+    @property
+    def where(self) -> Tuple[int, int, int]:
+        """``(year, month, day)`` of the first change, to show it."""
+        c = self.changes[0]
+        return c.year, c.month, c.day
+
+
+class UndoStack:
+    """Undo/redo history of the edits published by a repository."""
+
+    def __init__(self, repository: MonthRepository, limit: int = LIMIT):
+        self.repository = repository
+        self.limit = limit
+        self._undo: List[Command] = []
+        self._redo: List[Command] = []
+        self._replaying = False
+        # the last command may still absorb edits of the same cell
+        self._open = False
+        self._subscribers: List[Callable[[], None]] = []
+        repository.events.subscribe(self._on_change)
+
+    def subscribe(self, callback: Callable[[], None]) -> None:
+        """Call ``callback()`` whenever undo/redo availability may change."""
+        if callback not in self._subscribers:
+            self._subscribers.append(callback)
+
+    def _notify(self) -> None:
+        for callback in list(self._subscribers):
+            callback()
+
+    def can_undo(self) -> bool:
+        return bool(self._undo)
+
+    def can_redo(self) -> bool:
+        return bool(self._redo)
+
+    def clear(self) -> None:
+        """Forget the history, e.g. after the month files were rewritten."""
+        self._undo.clear()
+        self._redo.clear()
+        self._open = False
+        self._notify()
+
+    # ------------------------------------------------------------------
+    def _on_change(self, change: WorkChange):
+        if self._replaying:
+            return
+        if change.field == MONTH:
+            self._push(Command(list(change.new or ())))
+            return
+        last = self._undo[-1] if self._undo else None
+        if (
+            self._open
+            and last is not None
+            and change.field not in (ADDED, REMOVED, DAY)
+            and len(last.changes) == 1
+            and last.changes[0].work is change.work
+            and last.changes[0].field == change.field
+            and change.year == last.changes[0].year
+            and change.month == last.changes[0].month
+            and time.monotonic() - last.time <= MERGE_INTERVAL
+        ):
+            merged = replace(last.changes[0], new=change.new)
+            last.time = time.monotonic()
+            self._redo.clear()
+            if merged.old == merged.new:
+                # typed back to where it was
+                self._undo.pop()
+                self._open = False
+            else:
+                last.changes[0] = merged
+            self._notify()
+            return
+        self._push(Command([change]))
+        self._open = change.field not in (ADDED, REMOVED, DAY)
+
+    def _push(self, command: Command):
+        if not command.changes:
+            return
+        self._undo.append(command)
+        del self._undo[: -self.limit]
+        self._redo.clear()
+        self._open = False
+        self._notify()
+
+    # ------------------------------------------------------------------
+    def undo(self) -> Optional[Command]:
+        """Revert the last command; return it, or None if there was none."""
+        if not self._undo:
+            return None
+        command = self._undo.pop()
+        self._replay(command, reverse=True)
+        self._redo.append(command)
+        self._notify()
+        return command
+
+    def redo(self) -> Optional[Command]:
+        """Apply the last undone command again."""
+        if not self._redo:
+            return None
+        command = self._redo.pop()
+        self._replay(command, reverse=False)
+        self._undo.append(command)
+        self._notify()
+        return command
+
+    def _replay(self, command: Command, reverse: bool):
+        repo = self.repository
+        changes = reversed(command.changes) if reverse else command.changes
+        self._open = False
+        self._replaying = True
+        try:
+            with ExitStack() as batches:
+                if len(command.changes) > 1:
+                    # one event and one repaint per month, as for the original edit
+                    for year, month in sorted(command.months):
+                        batches.enter_context(repo.batch(year, month))
+                for change in changes:
+                    self._apply(change, reverse)
+        finally:
+            self._replaying = False
+        for year, month in sorted(command.months):
+            repo.save(year, month)
+
+    def _apply(self, c: WorkChange, reverse: bool):
+        repo = self.repository
+        if c.field == ADDED or c.field == REMOVED:
+            if (c.field == ADDED) == reverse:
+                repo.remove_work(c.year, c.month, c.day, c.work)
+            else:
+                # a removed work goes back to its old position
+                repo.add_work(c.year, c.month, c.day, c.work, c.old if reverse else None)
+        elif c.field == DAY:
+            src, dst = (c.new, c.old) if reverse else (c.old, c.new)
+            repo.move_work(c.year, c.month, src, dst, c.work)
+        else:
+            repo.set_field(
+                c.year, c.month, c.day, c.work, c.field, c.old if reverse else c.new
+            )
+
+
+__all__ = ["Command", "LIMIT", "MERGE_INTERVAL", "UndoStack"]
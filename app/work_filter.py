@@ -0,0 +1,284 @@
+"""Filter expressions for works.
+
+A small language to select works, for example::
+
+    priority<=2 and not adult and done<plan and name~"Dragon"
+
+Fields are ``name``, ``plan``, ``done``, ``priority``, ``adult`` (alias
+``is_adult``) and ``comment``; operators are ``= == != < <= > >=``, ``~``
+and ``!~`` (case-insensitive regular expression search), ``and``, ``or``,
+``not`` and parentheses.  A bare field is a truth test (``adult``).
+
+:func:`compile_filter` parses an expression once into a :class:`WorkFilter`
+whose call is a single generated lambda, so re-filtering a month on every
+keystroke stays cheap.  Named expressions are kept in
+``filter_presets.json`` by :class:`FilterPresets`.
+
+Run ``python -m app.work_filter EXPR --year Y --month M`` to list the
+matching works of a month from the command line.
+"""
+from __future__ import annotations
+
+import argparse
+import re
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from .storage import Storage
+
+PRESETS_FILE = "filter_presets.json"
+
+FIELDS = {
+    "name": "name",
+    "plan": "plan",
+    "done": "done",
+    "priority": "priority",
+    "adult": "is_adult",
+    "is_adult": "is_adult",
+    "comment": "comment",
+}
+# fields compared as text; the others are numbers (adult is 0/1)
+_TEXT_FIELDS = {"name", "comment"}
+_COMPARISONS = {"=": "==", "==": "==", "!=": "!=", "<": "<", "<=": "<=", ">": ">", ">=": ">="}
+_MATCHES = ("~", "!~")
+
+_TOKEN_RE = re.compile(
+    r"""\s*(?:
+        (?P<num>-?\d+)
+      | (?P<str>"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')
+      | (?P<op><=|>=|==|!=|!~|=|<|>|~)
+      | (?P<paren>[()])
+      | (?P<word>\w+)
+    )""",
+    re.X,
+)
+
+
+class FilterError(ValueError):
+    """Syntax error in a filter expression; ``pos`` is the character offset."""
+
+    def __init__(self, message: str, pos: int):
+        super().__init__(f"{message} (позиция {pos + 1})")
+        self.pos = pos
+
+
+def _tokenize(text: str) -> List[Tuple[str, str, int]]:
+    tokens = []
+    pos = 0
+    while pos < len(text):
+        if text[pos:].isspace():
+            break
+        m = _TOKEN_RE.match(text, pos)
+        if not m or m.end() == pos:
+            rest = text[pos:].lstrip()
+            raise FilterError(f"непонятный символ «{rest[:1]}»", len(text) - len(rest))
+        kind = m.lastgroup
+        tokens.append((kind, m.group(kind), m.start(kind)))
+        pos = m.end()
+    return tokens
+
+
+class _Parser:
+    """Recursive-descent parser emitting Python source for the predicate."""
+
+    def __init__(self, text: str):
+        self.text = text
+        self.tokens = _tokenize(text)
+        self.i = 0
+        # constants and compiled patterns referenced by the generated code
+        self.env: Dict[str, Any] = {}
+
+    def _peek(self) -> Optional[Tuple[str, str, int]]:
+        return self.tokens[self.i] if self.i < len(self.tokens) else None
+
+    def _take(self) -> Tuple[str, str, int]:
+        token = self._peek()
+        if token is None:
+            raise FilterError("неожиданный конец выражения", len(self.text))
+        self.i += 1
+        return token
+
+    def _keyword(self, word: str) -> bool:
+        token = self._peek()
+        if token and token[0] == "word" and token[1].lower() == word:
+            self.i += 1
+            return True
+        return False
+
+    def _const(self, value: Any) -> str:
+        name = f"_c{len(self.env)}"
+        self.env[name] = value
+        return name
+
+    # ------------------------------------------------------------------
+    def parse(self) -> str:
+        if not self.tokens:
+            return "True"
+        code = self._or()
+        token = self._peek()
+        if token is not None:
+            raise FilterError(f"лишнее «{token[1]}»", token[2])
+        return code
+
+    def _or(self) -> str:
+        parts = [self._and()]
+        while self._keyword("or"):
+            parts.append(self._and())
+        return parts[0] if len(parts) == 1 else "(" + " or ".join(parts) + ")"
+
+    def _and(self) -> str:
+        parts = [self._not()]
+        while self._keyword("and"):
+            parts.append(self._not())
+        return parts[0] if len(parts) == 1 else "(" + " and ".join(parts) + ")"
+
+    def _not(self) -> str:
+        if self._keyword("not"):
+            return f"(not {self._not()})"
+        return self._comparison()
+
+    def _comparison(self) -> str:
+        token = self._peek()
+        if token and token[0] == "paren" and token[1] == "(":
+            self.i += 1
+            code = self._or()
+            kind, value, pos = self._take()
+            if value != ")":
+                raise FilterError("ожидалась «)»", pos)
+            return code
+        left, left_pos = self._operand()
+        token = self._peek()
+        if token is None or token[0] != "op":
+            if not left.startswith("w."):
+                raise FilterError("ожидалось условие", left_pos)
+            return f"bool({left})"
+        self.i += 1
+        op = token[1]
+        if op in _MATCHES:
+            kind, value, pos = self._take()
+            if kind != "str" or not left.startswith("w."):
+                raise FilterError("«~» сравнивает поле со строкой", pos)
+            pattern = self._pattern(_unquote(value))
+            test = f"{self._const(pattern)}.search(str({left})) is not None"
+            return f"({test})" if op == "~" else f"(not {test})"
+        right, right_pos = self._operand()
+        if self._is_text(left) != self._is_text(right):
+            raise FilterError("нельзя сравнивать текст с числом", right_pos)
+        return f"({left} {_COMPARISONS[op]} {right})"
+
+    def _is_text(self, code: str) -> bool:
+        if code.startswith("w."):
+            return code[2:] in _TEXT_FIELDS
+        return not code[0].isdigit() and code[0] != "-"
+
+    def _operand(self) -> Tuple[str, int]:
+        kind, value, pos = self._take()
+        if kind == "num":
+            return repr(int(value)), pos
+        if kind == "str":
+            return self._const(_unquote(value)), pos
+        if kind == "word":
+            field = FIELDS.get(value.lower())
+            if field is None:
+                raise FilterError(f"неизвестное поле «{value}»", pos)
+            return f"w.{field}", pos
+        raise FilterError(f"неожиданное «{value}»", pos)
+
+    @staticmethod
+    def _pattern(text: str) -> re.Pattern:
+        try:
+            return re.compile(text, re.IGNORECASE)
+        except re.error:
+            return re.compile(re.escape(text), re.IGNORECASE)
+
+
+def _unquote(literal: str) -> str:
+    return re.sub(r"\\(.)", r"\1", literal[1:-1])
+
+
+class WorkFilter:
+    """Compiled filter expression; call it with a work to test it."""
+
+    def __init__(self, text: str = ""):
+        self.text = text.strip()
+        parser = _Parser(self.text)
+        code = parser.parse()
+        self.matches_all = code == "True"
+        env = {"__builtins__": {"str": str, "bool": bool}, **parser.env}
+        self._predicate = eval(f"lambda w: {code}", env)
+
+    def __call__(self, work) -> bool:
+        return self._predicate(work)
+
+    def apply(self, works) -> list:
+        if self.matches_all:
+            return list(works)
+        predicate = self._predicate
+        return [w for w in works if predicate(w)]
+
+    def __eq__(self, other):
+        return isinstance(other, WorkFilter) and other.text == self.text
+
+    def __hash__(self):
+        return hash(self.text)
+
+
+def compile_filter(text: str) -> WorkFilter:
+    """Parse ``text``; raises :class:`FilterError` on a syntax error."""
+    return WorkFilter(text)
+
+
+class FilterPresets:
+    """Named filter expressions stored in ``filter_presets.json``."""
+
+    def __init__(self, storage: Storage):
+        self.storage = storage
+        raw = storage.load_json(PRESETS_FILE, {}) or {}
+        self._presets: Dict[str, str] = raw if isinstance(raw, dict) else {}
+
+    def names(self) -> List[str]:
+        return sorted(self._presets)
+
+    def get(self, name: str) -> str:
+        return self._presets.get(name, "")
+
+    def set(self, name: str, text: str):
+        compile_filter(text)
+        self._presets[name] = text
+        self.storage.save_json(PRESETS_FILE, self._presets)
+
+    def remove(self, name: str):
+        if self._presets.pop(name, None) is not None:
+            self.storage.save_json(PRESETS_FILE, self._presets)
+
+
+def main(argv=None) -> int:
+    from .month_repository import MonthRepository
+
+    parser = argparse.ArgumentParser(description="Works of a month matching a filter")
+    parser.add_argument("expression", help='e.g. priority<=2 and name~"Dragon", or @preset')
+    parser.add_argument("--data", default="data", help="data directory")
+    parser.add_argument("--year", type=int, required=True)
+    parser.add_argument("--month", type=int, required=True)
+    args = parser.parse_args(argv)
+
+    storage = Storage(Path(args.data))
+    text = args.expression
+    if text.startswith("@"):
+        preset = FilterPresets(storage).get(text[1:])
+        if not preset:
+            parser.error(f"unknown preset {text[1:]!r}")
+        text = preset
+    try:
+        filt = compile_filter(text)
+    except FilterError as e:
+        parser.error(str(e))
+    month = MonthRepository(storage).get(args.year, args.month)
+    for day in sorted(month):
+        for w in filt.apply(month[day]):
+            print(f"{day:2d}  {w.name}  план {w.plan}  готово {w.done}  приоритет {w.priority}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
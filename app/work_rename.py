@@ -0,0 +1,266 @@
+"""Rename or merge a work across the whole data directory.
+
+:class:`WorkRenamer` asks the :class:`~app.search_index.SearchIndex` which
+month files mention a work, so only those are read and rewritten: the day
+entries (``YYYY/MM.json``), postings, top rows and time sheets, plus the
+posting rules and the chart colours.  Renaming to a name that already
+exists merges the two works: a day holding both keeps one entry with the
+plans and chapters done summed, top rows and time sheets are summed, and
+the target's own texts win over the source's.
+
+The rewrite is a batch: every new payload is computed first, then the
+original contents are written to ``.rename_journal.json`` and the files
+are replaced one by one.  A failure or a cancel from the progress callback
+writes the originals back; a journal left behind by a crash is rolled back
+by :func:`recover_rename` on the next start.  The repository months and
+the postings store are invalidated in the same step; the index and the
+top aggregators follow the storage writes.
+"""
+from __future__ import annotations
+
+import copy
+from typing import Any, Callable, Dict, List, Optional
+
+from .month_repository import MonthRepository
+from .panels.work_charts import COLORS_FILE
+from .posting_rules import RULES_FILE
+from .postings_store import PostingsStore
+from .search_index import SearchIndex
+from .storage import Storage
+
+JOURNAL_FILE = ".rename_journal.json"
+
+# numeric top fields kept as text; merged rows add them up
+_SUMMED_TOP_FIELDS = ("plan", "done", "profit", "ads", "views", "likes", "thanks")
+
+Progress = Callable[[int, int], bool]
+
+
+class RenameCancelled(Exception):
+    """The progress callback asked to stop; nothing was changed."""
+
+
+def _kind(rel: str) -> Optional[str]:
+    """``None`` for day files, else the prefix (``postings``, ``time``...)."""
+    stem = rel.rsplit("/", 1)[-1][: -len(".json")]
+    return stem.rsplit("_", 1)[0] if "_" in stem else None
+
+
+def _number(value: Any) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _sum(a: Any, b: Any) -> Any:
+    """Add two stored numbers keeping the stored type; text if one is not."""
+    x, y = _number(a), _number(b)
+    if x is None or y is None:
+        return a if a not in (None, "") else b
+    total = x + y
+    if isinstance(a, str) or isinstance(b, str):
+        return f"{total:g}"
+    return int(total) if total.is_integer() else total
+
+
+def _merge_work(target: dict, source: dict):
+    """Fold a day entry of the renamed work into the target's entry."""
+    for key in ("plan", "done"):
+        target[key] = _sum(target.get(key, 0), source.get(key, 0))
+    target["is_adult"] = bool(target.get("is_adult")) or bool(source.get("is_adult"))
+    if not target.get("comment"):
+        target["comment"] = source.get("comment", "")
+
+
+def _rename_days(data: dict, old: str, new: str) -> bool:
+    changed = False
+    for works in data.values():
+        if not isinstance(works, list):
+            continue
+        target = next(
+            (w for w in works if isinstance(w, dict) and w.get("name") == new), None
+        )
+        for w in list(works):
+            if isinstance(w, dict) and w.get("name") == old:
+                if target is not None:
+                    _merge_work(target, w)
+                    works.remove(w)
+                else:
+                    w["name"] = new
+                changed = True
+    return changed
+
+
+def _rename_postings(data: dict, old: str, new: str) -> bool:
+    changed = False
+    for entries in data.values():
+        # old layout keeps a single posting dict per day
+        for p in [entries] if isinstance(entries, dict) else entries if isinstance(entries, list) else ():
+            if isinstance(p, dict) and p.get("work") == old:
+                p["work"] = new
+                changed = True
+    return changed
+
+
+def _merge_top_row(target: dict, source: dict) -> dict:
+    merged = dict(target)
+    for key, value in source.items():
+        if key in _SUMMED_TOP_FIELDS:
+            merged[key] = _sum(target.get(key), value)
+        elif key == "is_adult":
+            merged[key] = bool(target.get(key)) or bool(value)
+        elif key == "total_chapters":
+            merged[key] = int(max(_number(target.get(key)) or 0, _number(value) or 0))
+        elif target.get(key) in (None, ""):
+            merged[key] = value
+    return merged
+
+
+def _rename_top(data: dict, old: str, new: str) -> bool:
+    changed = False
+    form = data.get("__form__")
+    if isinstance(form, dict) and form.get("work") == old:
+        form["work"] = new
+        changed = True
+    if old not in data:
+        return changed
+    row = data[old]
+    if new in data:
+        if isinstance(row, dict) and isinstance(data[new], dict):
+            data[new] = _merge_top_row(data[new], row)
+        del data[old]
+    else:
+        # keep the row where it was
+        items = [(new if k == old else k, v) for k, v in data.items()]
+        data.clear()
+        data.update(items)
+    return True
+
+
+def _rename_keys(data: dict, old: str, new: str, merge: Callable[[Any, Any], Any]) -> bool:
+    if old not in data:
+        return False
+    value = data.pop(old)
+    data[new] = merge(data[new], value) if new in data else value
+    return True
+
+
+def _rename_time(data: dict, old: str, new: str) -> bool:
+    return _rename_keys(data, old, new, lambda a, b: round(_sum(a, b), 1))
+
+
+def _rename_colors(data: dict, old: str, new: str) -> bool:
+    # the target keeps its own colour
+    return _rename_keys(data, old, new, lambda a, b: a)
+
+
+def _rename_rules(data: list, old: str, new: str) -> bool:
+    changed = False
+    for rule in data:
+        if isinstance(rule, dict) and rule.get("work") == old:
+            rule["work"] = new
+            changed = True
+    return changed
+
+
+_REWRITERS = {
+    None: _rename_days,
+    "postings": _rename_postings,
+    "top_month": _rename_top,
+    "time": _rename_time,
+}
+_GLOBAL_FILES = {RULES_FILE: _rename_rules, COLORS_FILE: _rename_colors}
+
+
+def recover_rename(storage: Storage) -> bool:
+    """Roll back a rename interrupted by a crash; True if one was found."""
+    journal = storage.load_json(JOURNAL_FILE)
+    if not isinstance(journal, dict):
+        return False
+    for rel, original in (journal.get("files") or {}).items():
+        storage.save_json(rel, original)
+    storage.base_dir.joinpath(JOURNAL_FILE).unlink(missing_ok=True)
+    return True
+
+
+class WorkRenamer:
+    """Indexed, transactional rename of a work over the whole archive."""
+
+    def __init__(
+        self,
+        storage: Storage,
+        repository: MonthRepository,
+        index: SearchIndex,
+        store: Optional[PostingsStore] = None,
+    ):
+        self.storage = storage
+        self.repository = repository
+        self.index = index
+        self.store = store
+
+    def files_of(self, name: str) -> List[str]:
+        """Files that may mention ``name``: indexed months and global files."""
+        return self.index.files_of(name) + [
+            rel for rel in _GLOBAL_FILES if self.storage.version(rel) is not None
+        ]
+
+    def rename(self, old: str, new: str, progress: Optional[Progress] = None) -> List[str]:
+        """Rename (or merge) ``old`` into ``new``; return the files rewritten.
+
+        Unsaved repository edits are written first; panels keeping their
+        own unsaved state must save it before.  ``progress(done, total)``
+        is called per file and may return False to cancel.
+        """
+        new = new.strip()
+        if not old or not new or new == old:
+            return []
+        self.repository.save_dirty()
+        files = self.files_of(old)
+        total = 2 * len(files)
+        originals: Dict[str, Any] = {}
+        updates: Dict[str, Any] = {}
+        for i, rel in enumerate(files, start=1):
+            rewrite = _GLOBAL_FILES.get(rel) or _REWRITERS[_kind(rel)]
+            data = self.storage.load_json(rel)
+            if isinstance(data, (dict, list)):
+                updated = copy.deepcopy(data)
+                if rewrite(updated, old, new):
+                    originals[rel] = data
+                    updates[rel] = updated
+            if progress is not None and progress(i, total) is False:
+                raise RenameCancelled()
+
+        written: List[str] = []
+        if updates:
+            self.storage.save_json(JOURNAL_FILE, {"old": old, "new": new, "files": originals})
+        try:
+            for i, (rel, data) in enumerate(updates.items(), start=1):
+                self.storage.save_json(rel, data)
+                written.append(rel)
+                if progress is not None and progress(len(files) + i, total) is False:
+                    raise RenameCancelled()
+        except BaseException:
+            # if the rollback fails too, the journal stays for recover_rename
+            for rel in written:
+                self.storage.save_json(rel, originals[rel])
+            self._finish(written)
+            raise
+        self._finish(written)
+        if progress is not None:
+            progress(total, total)
+        return written
+
+    def _finish(self, files: List[str]):
+        """Drop the journal and every cached copy of the rewritten files."""
+        self.storage.base_dir.joinpath(JOURNAL_FILE).unlink(missing_ok=True)
+        self.index.save()
+        for rel in files:
+            if rel not in _GLOBAL_FILES and _kind(rel) is None:
+                year, month = rel[: -len(".json")].split("/")
+                self.repository.forget(int(year), int(month))
+        if self.store is not None and files:
+            self.store.invalidate()
+
+
+__all__ = ["JOURNAL_FILE", "RenameCancelled", "WorkRenamer", "recover_rename"]